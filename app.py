@@ -4,19 +4,31 @@ Serves the landing page with three detail pages for Coffee, Machines, and Materi
 Includes SEO sitemap, form validation, CSRF protection, structured data, email notifications, and rate limiting.
 """
 
-from flask import Flask, render_template, request, jsonify, url_for, make_response
-from flask_wtf.csrf import CSRFProtect
-from flask_mail import Mail, Message
+from flask import Flask, render_template, request, jsonify, url_for
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from email_validator import validate_email, EmailNotValidError
-from bleach import clean
+from asset_manifest import AssetManifest
+from compression import Compression
+from csrf_tokens import CSRFTokens
+from email_checks import EmailChecker
+from gallery import Gallery
+from image_index import ImageIndex
+from mail_queue import MailQueue
+from metrics import Metrics
+from page_cache import PageCache
+from preload_hints import PreloadHints
+from responsive_images import ResponsiveImages
+from site_content import SiteContent
+from sitemap import Sitemap
+from static_store import StaticStore
+from warmup import Warmup
+from rate_limit_storage import SQLiteStorage  # noqa: F401  (registers sqlite:// for Flask-Limiter)
 import os
 from datetime import datetime
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
-# Secret key for CSRF protection (use environment variable in production)
+# Secret key for signing CSRF tokens (use environment variable in production)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
 
 # Email configuration (using environment variables for security)
@@ -29,114 +41,160 @@ app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'info@himmagroup.com')
 app.config['MAIL_MAX_EMAILS'] = int(os.getenv('MAIL_MAX_EMAILS', 10))
 
+# Outbound mail queue (spooled to SQLite, delivered by a background thread)
+app.config['MAIL_QUEUE_PATH'] = os.getenv('MAIL_QUEUE_PATH', os.path.join(app.instance_path, 'mail_queue.sqlite3'))
+app.config['MAIL_QUEUE_MAX_ATTEMPTS'] = int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', 6))
+app.config['MAIL_QUEUE_RETRY_DELAY'] = int(os.getenv('MAIL_QUEUE_RETRY_DELAY', 30))
+# Admin digest: 0 = one notification per submission; otherwise one summary every
+# MAIL_DIGEST_INTERVAL seconds or MAIL_DIGEST_MAX_ITEMS submissions
+app.config['MAIL_DIGEST_INTERVAL'] = int(os.getenv('MAIL_DIGEST_INTERVAL', 0))
+app.config['MAIL_DIGEST_MAX_ITEMS'] = int(os.getenv('MAIL_DIGEST_MAX_ITEMS', 50))
+
+# Contact form email checks ('dns' = cached MX lookups, 'syntax' = no DNS)
+app.config['EMAIL_CHECK_MODE'] = os.getenv('EMAIL_CHECK_MODE', 'dns')
+app.config['EMAIL_CHECK_TIMEOUT'] = float(os.getenv('EMAIL_CHECK_TIMEOUT', 2.0))
+
+# Instrumentation (/metrics); registered first so request timings cover every other hook
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+app.config['METRICS_PROFILE_THRESHOLD'] = float(os.getenv('METRICS_PROFILE_THRESHOLD', 0))
+app.config['METRICS_PROFILE_SAMPLE_RATE'] = float(os.getenv('METRICS_PROFILE_SAMPLE_RATE', 0.1))
+
+# In-memory static store: up to 32 MB per process, so off by default (each
+# Passenger worker would hold its own copy); serve.py turns it on, as its
+# workers share the master's copy
+if os.getenv('STATIC_STORE_ENABLED'):
+    app.config['STATIC_STORE_ENABLED'] = os.getenv('STATIC_STORE_ENABLED') == 'True'
+
 # Initialize extensions
-csrf = CSRFProtect(app)
-mail = Mail(app)
+metrics = Metrics(app)
+csrf = CSRFTokens(app)
+mail_queue = MailQueue(app)  # creates the Flask-Mail instance on first use
+email_checker = EmailChecker(app)
+asset_manifest = AssetManifest(app)
+compression = Compression(app)  # after AssetManifest: wraps its static view
+static_store = StaticStore(app)  # after Compression: wraps its static view
+page_cache = PageCache(app)
+preload_hints = PreloadHints(app)  # after Compression: scans pages before they are compressed
+page_cache.watch(asset_manifest.version)
+responsive_images = ResponsiveImages(app)
+page_cache.watch(responsive_images.version)
+gallery = Gallery(app)
+page_cache.watch(gallery.version)
+image_index = ImageIndex(app)
+page_cache.watch(image_index.version)
+site_content = SiteContent(app)
+page_cache.watch(site_content.version)
+app.config['SITEMAP_EXCLUDE_PREFIXES'] = ('/api/', '/metrics')
+sitemap = Sitemap(app)
 
 # Rate limiting configuration
+# Counters live in a SQLite file shared by all worker processes on the host
+app.config['RATELIMIT_STORAGE_URI'] = os.getenv(
+    'RATELIMIT_STORAGE_URI',
+    'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.sqlite3')
+)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=app.config['RATELIMIT_STORAGE_URI'],
+    storage_options={'compact_interval': int(os.getenv('RATELIMIT_COMPACT_INTERVAL', 60))}
 )
-
-# Content configuration (mirrors content/data.js)
-SITE_CONFIG = {
-    'site': {
-        'name': 'Himma Group',
-        'email': 'info@himmagroup.com',
-        'phone': '+251 93 598 8288',
-        'whatsapp': '+251 93 598 8288',
-        'whatsappMessage': 'Hello Himma Group, I would like to know more about your services.'
-    },
-    'links': {
-        'coffeeApp': '',
-        'machinesApp': '',
-        'materialsApp': ''
-    }
-}
+limiter.exempt(app.view_functions['metrics'])
+metrics.instrument_limiter(limiter)
+
+# Preloading for new worker processes (run by passenger_wsgi.py)
+warmup = Warmup(app)
+warmup.task(asset_manifest.assets)
+warmup.task(responsive_images.index)
+warmup.task(gallery.items)
+warmup.task(image_index.entries)
+warmup.task(site_content.snapshot)
+warmup.task(page_cache.version)
+warmup.task(static_store.load)
+
+@sitemap.source
+def gallery_sitemap_entries():
+    """List the machines gallery images under the Machines page."""
+    items = gallery.items()
+    if not items:
+        return []
+    return [{
+        'loc': url_for('machines', _external=True),
+        'lastmod': gallery.version() / 1e9,
+        'images': [url_for('static', filename=item['path'], _external=True) for item in items],
+    }]
 
 @app.context_processor
 def inject_config():
-    """Make SITE_CONFIG available to all templates."""
-    return {
-        'site': SITE_CONFIG['site'],
-        'links': SITE_CONFIG['links']
-    }
-
-@app.route('/sitemap.xml')
-def sitemap():
-    """Generate sitemap.xml dynamically."""
-    routes = [
-        ('index', {}, 1.0),
-        ('coffee', {}, 0.8),
-        ('machines', {}, 0.8),
-        ('materials', {}, 0.8)
-    ]
-    
-    sitemap_xml = '''<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-'''
-    
-    for route_name, args, priority in routes:
-        url = url_for(route_name, _external=True, **args)
-        sitemap_xml += f'''  <url>
-    <loc>{url}</loc>
-    <priority>{priority}</priority>
-  </url>
-'''
-    
-    sitemap_xml += '</urlset>'
-    
-    response = make_response(sitemap_xml)
-    response.headers['Content-Type'] = 'application/xml'
-    return response
+    """Make the site content (content/site.json) available to all templates."""
+    return site_content.context()
 
 @app.route('/api/csrf-token', methods=['GET'])
 def get_csrf_token():
-    """Return CSRF token for JavaScript forms."""
-    from flask_wtf.csrf import generate_csrf
-    return jsonify({'csrf_token': generate_csrf()})
+    """Return CSRF token for JavaScript forms (pages normally set it as a cookie)."""
+    return csrf.token_response()
 
 @app.route('/')
+@sitemap.page(priority=1.0, template='index.html')
+@page_cache.cached()
 def index():
     """Render the landing page."""
     return render_template('index.html')
 
 @app.route('/company/coffee')
+@sitemap.page(priority=0.8, template='company/coffee.html')
+@page_cache.cached('url')
 def coffee():
     """Render the Coffee page with embedded app."""
-    embed_url = request.args.get('url', SITE_CONFIG['links'].get('coffeeApp', ''))
+    embed_url = request.args.get('url', site_content.data()['links'].get('coffeeApp', ''))
     return render_template('company/coffee.html', embed_url=embed_url)
 
 @app.route('/company/machines')
+@sitemap.page(priority=0.8, template='company/machines.html')
+@page_cache.cached('url')
 def machines():
     """Render the Machines page with embedded app."""
-    embed_url = request.args.get('url', SITE_CONFIG['links'].get('machinesApp', ''))
-    return render_template('company/machines.html', embed_url=embed_url)
+    embed_url = request.args.get('url', site_content.data()['links'].get('machinesApp', ''))
+    # First slides are rendered here; main.js fetches the rest of the manifest
+    slides = gallery.items()
+    initial = app.config['GALLERY_INITIAL_SLIDES']
+    return render_template(
+        'company/machines.html',
+        embed_url=embed_url,
+        gallery_slides=slides[:initial],
+        gallery_total=len(slides),
+        gallery_preload=slides[:app.config['GALLERY_PRELOAD_SLIDES']],
+    )
 
 @app.route('/company/materials')
+@sitemap.page(priority=0.8, template='company/materials.html')
+@page_cache.cached('url')
 def materials():
     """Render the Materials page with embedded app."""
-    embed_url = request.args.get('url', SITE_CONFIG['links'].get('materialsApp', ''))
+    embed_url = request.args.get('url', site_content.data()['links'].get('materialsApp', ''))
     return render_template('company/materials.html', embed_url=embed_url)
 
 @app.route('/api/config')
 def get_config():
     """API endpoint to retrieve site configuration (for JS use)."""
-    return jsonify(SITE_CONFIG)
+    return site_content.response()
 
 def sanitize_input(value, max_length=500):
     """Sanitize and validate user input."""
     if not value or not isinstance(value, str):
         return None
+    from bleach import clean  # imported on first use; warmup preloads it
     # Strip tags and limit length
-    sanitized = clean(value.strip(), tags=[], strip=True)
+    with metrics.timer('bleach.clean'):
+        sanitized = clean(value.strip(), tags=[], strip=True)
     return sanitized[:max_length] if sanitized else None
 
+@metrics.timer('validate_form_data')
 def validate_form_data(data):
     """Validate contact form data."""
+    from email_validator import EmailNotValidError
+
     errors = {}
     
     # Name validation
@@ -150,7 +208,8 @@ def validate_form_data(data):
         errors['email'] = 'Email is required.'
     else:
         try:
-            validate_email(email)
+            with metrics.timer('validate_email'):
+                email_checker.validate(email)
         except EmailNotValidError as e:
             errors['email'] = f'Invalid email address: {str(e)}'
     
@@ -174,120 +233,63 @@ def validate_form_data(data):
     }
 
 def send_contact_email(form_data):
-    """Send email notification for contact form submission."""
+    """Queue email notification and auto-reply for a contact form submission."""
     try:
-        # Email to admin
-        admin_msg = Message(
-            subject=f"New Contact Form Submission: {form_data['subject']}",
-            recipients=[SITE_CONFIG['site']['email']],
-            body=f"""
-New contact form submission received at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-From: {form_data['name']}
-Email: {form_data['email']}
-Subject: {form_data['subject']}
-
-Message:
-{form_data['message']}
-
----
-This email was sent from the Himma Group contact form.
-            """,
-            html=f"""
-<html>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 8px;">
-        <h2 style="color: #1f8a4c; border-bottom: 2px solid #1f8a4c; padding-bottom: 10px;">New Contact Form Submission</h2>
-
-        <p style="background-color: #f6f7f5; padding: 10px; border-left: 4px solid #1f8a4c;">
-            <strong>Received:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        </p>
-
-        <table style="width: 100%; margin-top: 20px;">
-            <tr>
-                <td style="padding: 8px; background-color: #f6f7f5;"><strong>Name:</strong></td>
-                <td style="padding: 8px;">{form_data['name']}</td>
-            </tr>
-            <tr>
-                <td style="padding: 8px; background-color: #f6f7f5;"><strong>Email:</strong></td>
-                <td style="padding: 8px;"><a href="mailto:{form_data['email']}">{form_data['email']}</a></td>
-            </tr>
-            <tr>
-                <td style="padding: 8px; background-color: #f6f7f5;"><strong>Subject:</strong></td>
-                <td style="padding: 8px;">{form_data['subject']}</td>
-            </tr>
-        </table>
-
-        <div style="margin-top: 20px; padding: 15px; background-color: #f9f9f9; border-radius: 4px;">
-            <strong>Message:</strong>
-            <p style="margin-top: 10px; white-space: pre-wrap;">{form_data['message']}</p>
-        </div>
-
-        <hr style="margin: 20px 0; border: none; border-top: 1px solid #ddd;">
-        <p style="font-size: 12px; color: #666;">This email was sent from the Himma Group contact form.</p>
-    </div>
-</body>
-</html>
-            """
-        )
-
-        # Auto-reply to customer
-        customer_msg = Message(
+        # Auto-reply to customer (always sent individually)
+        customer_msg = mail_queue.message(
             subject="Thank you for contacting Himma Group",
             recipients=[form_data['email']],
-            body=f"""
-Dear {form_data['name']},
-
-Thank you for reaching out to Himma Group. We have received your message and will get back to you as soon as possible.
-
-Your message:
-{form_data['message']}
-
-Best regards,
-Himma Group Team
-
----
-This is an automated message. Please do not reply to this email.
-            """,
-            html=f"""
-<html>
-<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-    <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 1px solid #ddd; border-radius: 8px;">
-        <h2 style="color: #1f8a4c;">Thank you for contacting Himma Group</h2>
-
-        <p>Dear {form_data['name']},</p>
-
-        <p>Thank you for reaching out to us. We have received your message and will get back to you as soon as possible.</p>
-
-        <div style="margin: 20px 0; padding: 15px; background-color: #f6f7f5; border-left: 4px solid #1f8a4c;">
-            <strong>Your message:</strong>
-            <p style="margin-top: 10px; white-space: pre-wrap;">{form_data['message']}</p>
-        </div>
-
-        <p>Best regards,<br><strong>Himma Group Team</strong></p>
-
-        <hr style="margin: 20px 0; border: none; border-top: 1px solid #ddd;">
-        <p style="font-size: 12px; color: #666;">This is an automated message. Please do not reply to this email.</p>
-    </div>
-</body>
-</html>
-            """
+            body=render_template('email/contact_reply.txt', submission=form_data),
+            html=render_template('email/contact_reply.html', submission=form_data),
         )
 
-        # Send both emails
-        if app.config['MAIL_USERNAME']:  # Only send if email is configured
-            mail.send(admin_msg)
-            mail.send(customer_msg)
-            return True
-        else:
+        if not app.config['MAIL_USERNAME']:  # Only send if email is configured
             print("Email not configured. Skipping email send.")
             print(f"Contact form data: {form_data}")
             return True  # Still return success for development
 
+        if mail_queue.digest_enabled:
+            # The admin copy goes into the next digest
+            mail_queue.collect(form_data)
+            mail_queue.enqueue([customer_msg])
+            return True
+
+        # Email to admin; queued with the auto-reply so both share one SMTP session
+        received = datetime.now()
+        admin_msg = mail_queue.message(
+            subject=f"New Contact Form Submission: {form_data['subject']}",
+            recipients=[site_content.data()['site']['email']],
+            body=render_template('email/contact_admin.txt', submission=form_data, received=received),
+            html=render_template('email/contact_admin.html', submission=form_data, received=received),
+        )
+        mail_queue.enqueue([admin_msg, customer_msg])
+        return True
+
     except Exception as e:
-        print(f"Error sending email: {str(e)}")
+        print(f"Error queueing email: {str(e)}")
         return False
 
+@mail_queue.digest
+def contact_digest(items):
+    """Build the admin summary for contact submissions collected in digest mode."""
+    submissions = [
+        dict(item, first_seen=datetime.fromtimestamp(item['first_seen']),
+             last_seen=datetime.fromtimestamp(item['last_seen']))
+        for item in items
+    ]
+    context = {
+        'submissions': submissions,
+        'total': sum(item['count'] for item in items),
+        'first': min(s['first_seen'] for s in submissions),
+        'last': max(s['last_seen'] for s in submissions),
+    }
+    return [mail_queue.message(
+        subject=f"Contact form digest: {context['total']} new submission{'s' if context['total'] != 1 else ''}",
+        recipients=[site_content.data()['site']['email']],
+        body=render_template('email/contact_digest.txt', **context),
+        html=render_template('email/contact_digest.html', **context),
+    )]
+
 @app.route('/api/contact', methods=['POST'])
 @limiter.limit("5 per hour")  # Rate limit: 5 submissions per hour per IP
 def contact():
@@ -306,14 +308,14 @@ def contact():
                 'errors': validation_result['errors']
             }), 400
 
-        # Send email notification
-        email_sent = send_contact_email(validation_result['data'])
+        # Queue email notification; delivery happens off the request path
+        email_queued = send_contact_email(validation_result['data'])
 
-        if email_sent:
+        if email_queued:
             return jsonify({
                 'status': 'success',
                 'message': 'Thank you for your message. We will get back to you shortly!'
-            }), 200
+            }), 202
         else:
             return jsonify({
                 'status': 'error',
@@ -0,0 +1,101 @@
+"""
+Content-hashed static URLs.
+
+tools/fingerprint_static.py writes static/asset-manifest.json, mapping each
+file under static/ to a fingerprinted name (``css/styles.css`` ->
+``css/styles.3f2a9c1b0d.css``). With the manifest loaded:
+
+* ``url_for('static', filename='css/styles.css')`` returns the fingerprinted
+  URL, so templates never need hand-bumped ``?v=`` query strings;
+* requests for a fingerprinted name are served from the original file with
+  ``Cache-Control: public, max-age=31536000, immutable``;
+* plain names keep working with Flask's default caching.
+
+Fingerprinting is off in debug mode so edited files show up immediately.
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class AssetManifest:
+    """Resolves static filenames through the fingerprint manifest."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._assets = {}
+        self._reverse = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSET_MANIFEST', os.path.join(app.static_folder, 'asset-manifest.json'))
+        app.config.setdefault('ASSET_FINGERPRINTS', not app.debug)
+        app.config.setdefault('ASSET_MANIFEST_CHECK_INTERVAL', 2.0)
+        self.app = app
+        app.extensions['asset_manifest'] = self
+        app.url_defaults(self._url_defaults)
+        app.view_functions['static'] = self.send_static_file
+
+    @property
+    def enabled(self):
+        return self.app.config['ASSET_FINGERPRINTS'] and not self.app.debug
+
+    def version(self):
+        """Modification time of the manifest (None if it does not exist)."""
+        try:
+            return os.stat(self.app.config['ASSET_MANIFEST']).st_mtime_ns
+        except OSError:
+            return None
+
+    def assets(self):
+        """Return {logical name: fingerprinted name}, reloading on change."""
+        now = time.monotonic()
+        if now - self._checked < self.app.config['ASSET_MANIFEST_CHECK_INTERVAL']:
+            return self._assets
+        self._checked = now
+        mtime = self.version()
+        if mtime != self._mtime:
+            with self._lock:
+                try:
+                    with open(self.app.config['ASSET_MANIFEST'], encoding='utf-8') as f:
+                        assets = json.load(f).get('assets', {})
+                except (OSError, ValueError):
+                    assets = {}
+                self._assets = assets
+                self._reverse = {hashed: name for name, hashed in assets.items()}
+                self._mtime = mtime
+        return self._assets
+
+    def resolve(self, filename):
+        """Fingerprinted name for ``filename``, or ``filename`` itself."""
+        if not self.enabled:
+            return filename
+        return self.assets().get(filename, filename)
+
+    def original(self, filename):
+        """Logical name for a fingerprinted ``filename`` (or ``filename``)."""
+        self.assets()
+        return self._reverse.get(filename, filename)
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.resolve(values['filename'])
+
+    def send_static_file(self, filename):
+        """Static view: serve fingerprinted names as immutable, others as usual."""
+        original = self.original(filename)
+        if original == filename:
+            return current_app.send_static_file(filename)
+        response = current_app.send_static_file(original)
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
@@ -216,7 +216,7 @@
       a.href = '#';
       a.addEventListener('click', function(e){
         e.preventDefault();
-        alert('WhatsApp number not configured. Set site.whatsapp in content/data.js');
+        alert('WhatsApp number not configured. Set site.whatsapp in content/site.json');
       });
     }
     a.innerHTML = '<svg viewBox="0 0 24 24" aria-hidden="true"><path d="M20.52 3.48A11.86 11.86 0 0 0 12.02 0C5.41 0 .06 5.35.06 11.96c0 2.1.56 4.16 1.62 5.97L0 24l6.24-1.64a11.95 11.95 0 0 0 5.78 1.48h.01c6.6 0 11.96-5.35 11.96-11.96 0-3.2-1.25-6.2-3.47-8.4Zm-8.5 18.5h-.01a9.9 9.9 0 0 1-5.05-1.39l-.36-.21-3.7.97.99-3.61-.23-.37a9.92 9.92 0 0 1-1.52-5.29c0-5.48 4.46-9.93 9.95-9.93 2.65 0 5.15 1.03 7.03 2.9a9.86 9.86 0 0 1 2.9 7.03c0 5.48-4.46 9.93-9.95 9.93Zm5.67-7.44c-.31-.16-1.84-.9-2.13-1-.29-.11-.5-.16-.71.16-.21.32-.81 1-.99 1.21-.18.21-.37.24-.68.08-.31-.16-1.32-.49-2.51-1.56-.93-.83-1.55-1.86-1.73-2.17-.18-.31-.02-.48.14-.63.14-.14.31-.37.47-.55.16-.18.21-.32.32-.53.11-.21.05-.4-.03-.56-.08-.16-.71-1.72-.98-2.36-.26-.63-.53-.54-.71-.55-.18-.01-.39-.01-.6-.01-.21 0-.55.08-.84.4-.29.32-1.1 1.08-1.1 2.63 0 1.55 1.12 3.05 1.28 3.26.16.21 2.2 3.36 5.33 4.71.75.33 1.34.53 1.8.68.76.24 1.46.21 2.01.13.61-.09 1.84-.75 2.1-1.48.26-.73.26-1.35.18-1.48-.08-.13-.29-.21-.6-.37Z"/></svg>';
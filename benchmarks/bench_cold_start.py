@@ -0,0 +1,160 @@
+"""
+Measure what a freshly spawned worker costs its first visitors.
+
+Usage:
+  python benchmarks/bench_cold_start.py [--runs 5] [--output run.json]
+                                        [--baseline base.json] [--tolerance 0.25]
+
+Every run starts a new Python process (as Passenger does when it spawns
+an application process) and records:
+  import      time to import app.py
+  warmup      time spent in warmup.run() (passenger_wsgi.py preload)
+  first /     the first request for the landing page
+  machines    the first request for /company/machines
+  contact     the first contact form submission (CSRF and rate limiting
+              off, EMAIL_CHECK_MODE=syntax so no DNS is involved); in warm
+              mode it is sent once the background imports have finished
+  spawn->/    import + warmup + first / (what the visitor that triggered
+              the spawn waits for, minus interpreter start-up)
+
+in three modes:
+  eager       optional dependencies imported up front and no template
+              bytecode cache (how app.py started before lazy imports)
+  lazy        lazy imports, no preload, no bytecode cache
+  warm        lazy imports plus warmup.run() with the on-disk template
+              bytecode cache populated by a previous process
+
+Medians over --runs processes are reported in milliseconds. --output saves
+them as JSON; --baseline compares spawn->/ and contact against a saved
+run and exits with status 1 if either grew by more than --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+MODES = ('eager', 'lazy', 'warm')
+COLUMNS = ('import', 'warmup', 'first /', 'machines', 'contact', 'spawn->/')
+COMPARED = ('spawn->/', 'contact')
+
+
+def child(mode: str) -> None:
+    """Runs inside the spawned process; prints its timings as JSON."""
+    timings = {}
+    start = time.perf_counter()
+    if mode == 'eager':
+        from warmup import DEFAULT_IMPORTS
+        for name in DEFAULT_IMPORTS:
+            __import__(name)
+    import app as site
+    timings['import'] = time.perf_counter() - start
+
+    if mode != 'warm':
+        site.app.jinja_env.bytecode_cache = None
+    start = time.perf_counter()
+    if mode == 'warm':
+        site.warmup.run()
+    timings['warmup'] = time.perf_counter() - start
+
+    site.limiter.enabled = False
+    site.app.config['CSRF_ENABLED'] = False
+    client = site.app.test_client()
+    requests = (
+        ('first /', 'GET', '/', None),
+        ('machines', 'GET', '/company/machines', None),
+        ('contact', 'POST', '/api/contact', 'form'),
+    )
+    from bench_mail_queue import FORM
+    with contextlib.redirect_stdout(io.StringIO()):  # "Email not configured" notices
+        for label, method, path, body in requests:
+            if body:
+                for thread in threading.enumerate():
+                    if thread.name == 'warmup-imports':
+                        thread.join()
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=FORM if body else None)
+            timings[label] = time.perf_counter() - start
+            assert response.status_code in (200, 202), (path, response.status_code)
+    timings['spawn->/'] = timings['import'] + timings['warmup'] + timings['first /']
+    print(json.dumps({k: v * 1000 for k, v in timings.items()}))
+
+
+def spawn(mode: str, env: dict) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', mode],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, EMAIL_CHECK_MODE='syntax',
+                   MAIL_USERNAME='', MAIL_QUEUE_PATH=os.path.join(tmp, 'mail.sqlite3'))
+        spawn('warm', env)  # populate the template bytecode cache
+        for mode in MODES:
+            samples = [spawn(mode, env) for _ in range(runs)]
+            results[mode] = {column: statistics.median(s[column] for s in samples) for column in COLUMNS}
+    return results
+
+
+def report(results: dict) -> None:
+    print(f"{'mode':<8}" + ''.join(f'{c:>11}' for c in COLUMNS))
+    for mode, row in results.items():
+        print(f'{mode:<8}' + ''.join(f'{row[c]:>11.1f}' for c in COLUMNS))
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    for mode, row in results.items():
+        for column in COMPARED:
+            before = baseline.get(mode, {}).get(column)
+            if not before:
+                continue
+            change = row[column] / before - 1
+            flag = 'REGRESSION' if change > tolerance else 'ok'
+            ok = ok and flag == 'ok'
+            print(f'{mode:<8}{column:<10}{before:>9.1f} -> {row[column]:>9.1f} ms  {change * 100:+6.1f}%  {flag}')
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return 0
+
+    results = measure(args.runs)
+    report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        return 0 if compare(results, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Measure bytes on the wire and CPU time per request with response compression.
+
+Usage:
+  python benchmarks/bench_compression.py [requests_per_url]
+
+For each URL (rendered pages, /api/config, /sitemap.xml, styles.css and
+main.js) the Flask test client requests it with:
+  identity    no Accept-Encoding
+  gzip        Accept-Encoding: gzip
+  br          Accept-Encoding: br (when the brotli package is installed)
+
+and reports the body size plus the mean process CPU time per request. For
+compressed encodings two CPU figures are shown:
+  cold        compressed-body cache cleared before every request and
+              precompressed static siblings ignored (worst case)
+  warm        normal operation (page cache + compressed-body cache hit, or
+              the .br/.gz sibling from tools/fingerprint_static.py)
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+URLS = [
+    '/',
+    '/company/coffee',
+    '/company/machines',
+    '/company/materials',
+    '/api/config',
+    '/sitemap.xml',
+    '/static/css/styles.css',
+    '/static/js/main.js',
+]
+
+
+def cpu_per_request(client, url: str, headers: dict, count: int, before=None) -> float:
+    total = 0.0
+    for _ in range(count):
+        if before:
+            before()
+        start = time.process_time()
+        client.get(url, headers=headers).close()
+        total += time.process_time() - start
+    return total / count * 1000
+
+
+def main(count: int) -> None:
+    import app as site
+
+    site.limiter.enabled = False
+    client = site.app.test_client()
+    comp = site.compression
+    encodings = comp.encodings[::-1]  # gzip, then br
+
+    header = f"{'url':<24}{'identity':>10}"
+    for enc in encodings:
+        header += f"{enc:>9}{'saved':>7}{'cold ms':>9}{'warm ms':>9}"
+    print(header + f"{'id ms':>8}")
+
+    totals = {enc: 0 for enc in ['identity'] + encodings}
+    for url in URLS:
+        identity = client.get(url, headers={'Accept-Encoding': 'identity'})
+        size = len(identity.data)
+        totals['identity'] += size
+        row = f"{url:<24}{size:>10}"
+        for enc in encodings:
+            headers = {'Accept-Encoding': enc}
+            body = len(client.get(url, headers=headers).data)
+            totals[enc] += body
+
+            site.app.config['COMPRESS_PRECOMPRESSED'] = False
+            cold = cpu_per_request(client, url, headers, count, comp.clear)
+            site.app.config['COMPRESS_PRECOMPRESSED'] = True
+            client.get(url, headers=headers)  # warm the caches
+            warm = cpu_per_request(client, url, headers, count)
+            row += f"{body:>9}{(1 - body / size) * 100:>6.0f}%{cold:>9.3f}{warm:>9.3f}"
+        plain = cpu_per_request(client, url, {'Accept-Encoding': 'identity'}, count)
+        print(row + f"{plain:>8.3f}")
+
+    summary = f"{'total':<24}{totals['identity']:>10}"
+    for enc in encodings:
+        summary += f"{totals[enc]:>9}{(1 - totals[enc] / totals['identity']) * 100:>6.0f}%{'':>18}"
+    print(summary)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
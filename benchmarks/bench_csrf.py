@@ -0,0 +1,145 @@
+"""
+Benchmark contact form submission with and without a CSRF token round trip.
+
+Usage:
+  python benchmarks/bench_csrf.py [--submissions 200] [--rtt 50]
+
+Each submission is timed end to end over HTTP against a local server, the
+way the page script performs it:
+
+  fetch    GET /api/csrf-token, then POST /api/contact: what the form did
+           before tokens came with the page (and still does when the cookie
+           is missing)
+  cookie   POST /api/contact with the token from the cookie the page set
+
+--rtt adds that many milliseconds per request to model the network (the
+local server answers in well under one). The token cost in-process is
+also reported: signing and checking a stateless token against Flask-WTF's
+session-based generate_csrf()/validate_csrf() (when Flask-WTF is
+installed).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from bench_mail_queue import FORM, configure  # noqa: E402
+from fake_smtp import FakeSMTPServer  # noqa: E402
+from load_test import HTTPSession, LocalServer, percentile  # noqa: E402
+from stub_resolver import StubResolver  # noqa: E402
+
+TOKEN_ROUNDS = 5000
+
+
+class DelayedSession(HTTPSession):
+    """HTTPSession that waits ``rtt`` seconds per request, like a network would."""
+
+    def __init__(self, port: int, rtt: float):
+        super().__init__(port)
+        self.rtt = rtt
+
+    def request(self, *args, **kwargs):
+        time.sleep(self.rtt)
+        return super().request(*args, **kwargs)
+
+
+def submit(session: HTTPSession, fetch: bool) -> int:
+    if fetch:
+        _, data = session.request('GET', '/api/csrf-token')
+        token = json.loads(data)['csrf_token']
+    else:
+        token = session.cookies['csrf_token']
+    headers = {'Content-Type': 'application/json', 'X-CSRFToken': token}
+    status, _ = session.request('POST', '/api/contact', json.dumps(FORM).encode(), headers)
+    return status
+
+
+def measure(port: int, rtt: float, fetch: bool, submissions: int) -> dict:
+    session = DelayedSession(port, rtt)
+    session.request('GET', '/')  # the page visit that sets the cookie
+    submit(session, fetch)  # warm-up
+    latencies, errors = [], 0
+    for _ in range(submissions):
+        start = time.perf_counter()
+        errors += submit(session, fetch) != 202
+        latencies.append(time.perf_counter() - start)
+    ordered = sorted(latencies)
+    return {
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'errors': errors,
+    }
+
+
+def token_costs(app) -> dict[str, float]:
+    """Microseconds to issue plus check one token, per scheme."""
+    csrf = app.extensions['csrf_tokens']
+    costs = {}
+    # A request context per round for both, as each token is issued in its own request
+    start = time.perf_counter()
+    for _ in range(TOKEN_ROUNDS):
+        with app.test_request_context('/'):
+            csrf.age(csrf.generate())
+    costs['stateless HMAC'] = (time.perf_counter() - start) / TOKEN_ROUNDS * 1e6
+    try:
+        from flask import session
+        from flask_wtf.csrf import generate_csrf, validate_csrf
+    except ImportError:
+        return costs
+    start = time.perf_counter()
+    for _ in range(TOKEN_ROUNDS):
+        with app.test_request_context('/'):
+            validate_csrf(generate_csrf())
+            app.session_interface.save_session(app, session, app.response_class())
+    costs['Flask-WTF session'] = (time.perf_counter() - start) / TOKEN_ROUNDS * 1e6
+    return costs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--rtt', type=float, default=0.0, help='simulated network round trip, ms')
+    args = parser.parse_args()
+
+    import app as site
+
+    site.limiter.enabled = False
+    # Answer deliverability checks from a local stub instead of DNS
+    site.email_checker.resolver = StubResolver()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeSMTPServer() as smtp:
+        configure(site.app, smtp, os.path.join(tmp, 'queue.sqlite3'))
+        site.app.config['CSRF_ENABLED'] = True
+        with LocalServer(site.app) as server:
+            results = {
+                'fetch': measure(server.port, args.rtt / 1000, True, args.submissions),
+                'cookie': measure(server.port, args.rtt / 1000, False, args.submissions),
+            }
+        site.mail_queue.stop()
+
+    print(f'submissions: {args.submissions}  simulated rtt: {args.rtt:g} ms')
+    print(f"{'flow':<8}{'mean':>10}{'p50':>10}{'p95':>10}{'errors':>8}   (ms)")
+    for flow, r in results.items():
+        print(f"{flow:<8}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['errors']:>8}")
+    saved = results['fetch']['mean_ms'] - results['cookie']['mean_ms']
+    print(f'cookie saves {saved:.2f} ms per submission '
+          f"({saved / results['fetch']['mean_ms'] * 100:.0f}%)")
+    print('\nissue + check one token:')
+    for scheme, us in token_costs(site.app).items():
+        print(f'  {scheme:<20}{us:>8.1f} us')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Measure contact-form email validation against a slow resolver.
+
+Usage:
+  python benchmarks/bench_email_checks.py [submissions] [resolver_delay_seconds]
+
+Runs ``submissions`` validations spread over 16 threads and 4 domains
+against a StubResolver that takes ``resolver_delay_seconds`` per lookup:
+
+  uncached   a DNS lookup on every submission (what validate_email() did)
+  cached     EmailChecker: one shared lookup per domain, then cache hits
+  timeout    a resolver slower than EMAIL_CHECK_TIMEOUT; requests fall back
+             to syntax-only validation after the timeout
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from stub_resolver import StubResolver  # noqa: E402
+
+DOMAINS = ['example.com', 'example.org', 'example.net', 'himmagroup.com']
+
+
+def run(label: str, validate, submissions: int, resolver: StubResolver) -> None:
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        validate(f'user{i}@{DOMAINS[i % len(DOMAINS)]}')
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        latencies = sorted(pool.map(one, range(submissions)))
+    wall = time.perf_counter() - started
+    print(f"{label:<10} mean={statistics.mean(latencies) * 1000:8.2f} ms"
+          f"  p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:8.2f} ms"
+          f"  max={latencies[-1] * 1000:8.2f} ms  wall={wall:6.2f} s  lookups={resolver.calls}")
+
+
+def main(submissions: int, delay: float) -> None:
+    import app as site
+    from email_checks import EmailChecker
+    from email_validator import validate_email
+
+    resolver = StubResolver(delay=delay)
+
+    def uncached(email: str) -> None:
+        result = validate_email(email, check_deliverability=False)
+        resolver(result.ascii_domain, result.domain, 2.0)
+
+    run('uncached', uncached, submissions, resolver)
+
+    resolver = StubResolver(delay=delay)
+    checker = EmailChecker(site.app, resolver=resolver)
+    run('cached', checker.validate, submissions, resolver)
+
+    resolver = StubResolver(delay=delay * 10)
+    checker = EmailChecker(site.app, resolver=resolver)
+    site.app.config['EMAIL_CHECK_TIMEOUT'] = delay * 2
+    run('timeout', checker.validate, submissions, resolver)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 0.2)
@@ -0,0 +1,131 @@
+"""
+Benchmark the contact endpoint with inline SMTP delivery vs the mail queue.
+
+Usage:
+  python benchmarks/bench_mail_queue.py [submissions] [smtp_delay_seconds]
+
+All modes talk to a local FakeSMTPServer:
+  inline    SMTP delivery inside the request
+  queued    the mail queue, one admin notification per submission
+  digest    the mail queue in digest mode; the burst repeats 10 distinct
+            messages, so the admin gets one summary of 10 entries
+
+The report shows request latency for /api/contact, how long the queue
+takes to drain, and how many SMTP connections and messages the run cost.
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from fake_smtp import FakeSMTPServer  # noqa: E402
+from stub_resolver import StubResolver  # noqa: E402
+
+FORM = {
+    'name': 'Benchmark User',
+    'email': 'bench@example.com',
+    'subject': 'Throughput test',
+    'message': 'Please send a quote for a deck oven and a spiral mixer.',
+}
+
+
+def configure(app, smtp: FakeSMTPServer, spool: str) -> None:
+    app.config.update(
+        TESTING=False,
+        CSRF_ENABLED=False,
+        MAIL_SERVER=smtp.host,
+        MAIL_PORT=smtp.port,
+        MAIL_USE_TLS=False,
+        MAIL_USE_SSL=False,
+        MAIL_USERNAME='bench@example.com',
+        MAIL_PASSWORD=None,
+        MAIL_QUEUE_PATH=spool,
+        MAIL_QUEUE_POLL_INTERVAL=0.05,
+    )
+    # Flask-Mail copies its settings when it is created
+    mail = app.extensions['mail_queue'].mail.state
+    mail.server, mail.port, mail.use_tls, mail.use_ssl = smtp.host, smtp.port, False, False
+    mail.username, mail.password, mail.suppress = 'bench@example.com', None, False
+
+
+def summarize(label: str, latencies: list[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) > 1 else ordered[0]
+    print(f"{label:<10} requests={len(ordered):<4} mean={statistics.mean(ordered) * 1000:8.2f} ms"
+          f"  p95={p95 * 1000:8.2f} ms  max={ordered[-1] * 1000:8.2f} ms")
+
+
+def run(submissions: int, delay: float) -> None:
+    import app as site
+
+    site.limiter.enabled = False
+    # Answer deliverability checks from a local stub instead of DNS
+    site.email_checker.resolver = StubResolver()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Inline delivery: what contact() did before the queue existed
+        with FakeSMTPServer(delay=delay) as smtp:
+            configure(site.app, smtp, os.path.join(tmp, 'inline.sqlite3'))
+            original = site.mail_queue.enqueue
+
+            def send_inline(messages):
+                for msg in messages:
+                    site.mail_queue.mail.send(msg)
+
+            site.mail_queue.enqueue = send_inline
+            latencies = []
+            with site.app.test_client() as client:
+                for _ in range(submissions):
+                    start = time.perf_counter()
+                    client.post('/api/contact', json=FORM)
+                    latencies.append(time.perf_counter() - start)
+            site.mail_queue.enqueue = original
+            summarize('inline', latencies)
+            print(f"{'':<10} smtp connections={smtp.connections} messages={len(smtp.messages)}")
+
+        # Queued delivery with the pooled background sender
+        site.app.config['MAIL_DIGEST_INTERVAL'] = 0
+        drive(site, 'queued', submissions, delay, os.path.join(tmp, 'queue.sqlite3'),
+              expected=submissions * 2, form=lambda i: FORM)
+
+        # Digest mode: auto-replies as before, one admin summary for the burst
+        site.app.config.update(MAIL_DIGEST_INTERVAL=3600, MAIL_DIGEST_MAX_ITEMS=submissions)
+        drive(site, 'digest', submissions, delay, os.path.join(tmp, 'digest.sqlite3'),
+              expected=submissions + 1,
+              form=lambda i: dict(FORM, message=f"{FORM['message']} (variant {i % 10})"))
+
+
+def drive(site, label: str, submissions: int, delay: float, spool: str, expected: int, form) -> None:
+    with FakeSMTPServer(delay=delay) as smtp:
+        configure(site.app, smtp, spool)
+        latencies = []
+        started = time.perf_counter()
+        with site.app.test_client() as client:
+            for i in range(submissions):
+                start = time.perf_counter()
+                resp = client.post('/api/contact', json=form(i))
+                latencies.append(time.perf_counter() - start)
+                assert resp.status_code == 202, resp.status_code
+        summarize(label, latencies)
+
+        deadline = time.perf_counter() + 60 + expected * delay
+        while len(smtp.messages) < expected and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        drained = time.perf_counter() - started
+        print(f"{'':<10} smtp connections={smtp.connections} messages={len(smtp.messages)}"
+              f"  drained in {drained:.2f} s ({len(smtp.messages) / drained:.1f} msg/s)")
+        site.mail_queue.stop()
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    smtp_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    run(count, smtp_delay)
@@ -0,0 +1,56 @@
+"""
+Measure the overhead of the instrumentation layer (metrics.py).
+
+Usage:
+  python benchmarks/bench_metrics.py [requests_per_route]
+
+Requests each cached page through the Flask test client with
+METRICS_ENABLED off and on and reports requests/sec plus the added
+time per request. A third pass enables sampled profiling at the default
+10% sample rate with a threshold no request reaches, i.e. the cost of
+leaving the profiler mode on.
+"""
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+ROUTES = ['/', '/company/coffee', '/company/machines', '/api/config']
+
+
+def rate(client, route: str, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(route)
+    return count / (time.perf_counter() - start)
+
+
+def main(count: int) -> None:
+    import app as site
+
+    site.limiter.enabled = False
+    site.app.config['METRICS_PROFILE_DIR'] = tempfile.mkdtemp()
+    client = site.app.test_client()
+
+    print(f"{'route':<22}{'off':>10}{'on':>10}{'profiling':>11}{'overhead':>12}   (req/s)")
+    for route in ROUTES:
+        client.get(route)  # warm the page cache
+        site.app.config['METRICS_ENABLED'] = False
+        off = rate(client, route, count)
+        site.app.config['METRICS_ENABLED'] = True
+        on = rate(client, route, count)
+        site.app.config['METRICS_PROFILE_THRESHOLD'] = 60
+        profiling = rate(client, route, count)
+        site.app.config['METRICS_PROFILE_THRESHOLD'] = 0
+        overhead = (1 / on - 1 / off) * 1e6
+        print(f"{route:<22}{off:>10.0f}{on:>10.0f}{profiling:>11.0f}{overhead:>9.1f} µs")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
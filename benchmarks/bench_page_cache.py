@@ -0,0 +1,52 @@
+"""
+Measure requests/sec for the rendered pages with and without the page cache.
+
+Usage:
+  python benchmarks/bench_page_cache.py [requests_per_route]
+
+Three passes per route through the Flask test client:
+  uncached    PAGE_CACHE_ENABLED = False (render_template on every hit)
+  cached      warm cache, full 200 responses
+  revalidate  warm cache, If-None-Match with the page's ETag (304)
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+ROUTES = ['/', '/company/coffee', '/company/machines', '/company/materials']
+
+
+def rate(client, route: str, count: int, headers: dict | None = None) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(route, headers=headers)
+    return count / (time.perf_counter() - start)
+
+
+def main(count: int) -> None:
+    import app as site
+
+    site.limiter.enabled = False
+    client = site.app.test_client()
+
+    print(f"{'route':<22}{'uncached':>12}{'cached':>12}{'revalidate':>12}   (req/s)")
+    for route in ROUTES:
+        site.app.config['PAGE_CACHE_ENABLED'] = False
+        uncached = rate(client, route, count)
+
+        site.app.config['PAGE_CACHE_ENABLED'] = True
+        etag = client.get(route).headers['ETag']
+        cached = rate(client, route, count)
+        revalidate = rate(client, route, count, {'If-None-Match': etag})
+        print(f"{route:<22}{uncached:>12.0f}{cached:>12.0f}{revalidate:>12.0f}   "
+              f"x{cached / uncached:.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,78 @@
+"""
+Multi-process correctness and overhead check for the rate-limit storage.
+
+Usage:
+  python benchmarks/bench_rate_limit.py [processes] [hits_per_process]
+
+Every process hammers the same "N per hour" limit through the limits
+library, the way Flask-Limiter does in each Passenger worker. With a
+shared backend the total number of allowed hits across all processes
+must equal N exactly; with memory:// each process allows N on its own.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+LIMIT = '100 per hour'
+
+
+def worker(uri: str, hits: int, queue) -> None:
+    import rate_limit_storage  # noqa: F401
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import FixedWindowRateLimiter
+
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = parse(LIMIT)
+    allowed = 0
+    start = time.perf_counter()
+    for _ in range(hits):
+        if limiter.hit(item, 'bench', '203.0.113.7'):
+            allowed += 1
+    queue.put((allowed, time.perf_counter() - start))
+
+
+def run(uri: str, processes: int, hits: int) -> None:
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(uri, hits, queue)) for _ in range(processes)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    allowed = sum(r[0] for r in results)
+    per_check = sum(r[1] for r in results) / (processes * hits) * 1e6
+    expected = int(LIMIT.split()[0])
+    verdict = 'OK' if allowed == expected else f'WRONG (expected {expected})'
+    print(f"{uri.split(':')[0]:<8} processes={processes} hits={processes * hits:<6} "
+          f"allowed={allowed:<5} {verdict:<22} {per_check:7.1f} us/check")
+
+
+def compaction(uri: str) -> None:
+    from rate_limit_storage import SQLiteStorage
+
+    storage = SQLiteStorage(uri)
+    for i in range(5000):
+        storage.incr(f'expired-{i}', 0)
+    start = time.perf_counter()
+    removed = storage.compact()
+    print(f"compact  removed={removed} expired keys in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    nprocs = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 4
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        run('memory://', nprocs, count)
+        run('sqlite:///' + os.path.join(tmp, 'ratelimit.sqlite3'), nprocs, count)
+        compaction('sqlite:///' + os.path.join(tmp, 'compact.sqlite3'))
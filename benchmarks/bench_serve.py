@@ -0,0 +1,218 @@
+"""
+Compare the prefork server (serve.py) with a single-process threaded server.
+
+Usage:
+  python benchmarks/bench_serve.py [--workers 4] [--threads 8] [--clients 16]
+                                   [--requests 4000]
+
+Each mode runs the app in a fresh server process on a local port:
+
+  single      one process, werkzeug's threaded server (what app.py's
+              __main__ block runs, without the reloader and debugger)
+  prefork     serve.py: warm-up in the master, --workers forked workers
+              with --threads threads each
+  no-preload  serve.py --no-preload: every worker warms itself after the
+              fork, so nothing it loads is shared
+
+--clients client processes then send --requests GETs in total, cycling
+through the pages, /api/config and a stylesheet (a new connection per
+request, as the server closes each one). Reported per mode: requests per
+second, p50/p95 latency, and memory from /proc/<pid>/smaps_rollup for
+each server process -- RSS, PSS (shared pages split between the processes
+that map them) and USS (pages only that process has) -- as the mean per
+worker and the total over master plus workers. Linux only. Rate limiting
+is off in the server processes.
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.client import HTTPConnection
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+MODES = ('single', 'prefork', 'no-preload')
+URLS = (
+    '/',
+    '/company/coffee',
+    '/company/machines',
+    '/company/materials',
+    '/api/config',
+    '/static/css/styles.css',
+)
+
+
+def child(mode: str, port: int, workers: int, threads: int) -> None:
+    """Runs inside the server process."""
+    import app as site
+
+    site.limiter.enabled = False
+    if mode == 'single':
+        import logging
+
+        from werkzeug.serving import make_server
+
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        site.warmup.run(background_imports=False)
+        make_server('127.0.0.1', port, site.app, threaded=True).serve_forever()
+        return
+    import serve
+
+    argv = ['--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+            '--max-requests', '0']
+    if mode == 'no-preload':
+        argv.append('--no-preload')
+    serve.serve(site.app, serve.parse_args(argv))
+
+
+def free_port() -> int:
+    import socket
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def get(port: int, path: str) -> int:
+    conn = HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if get(port, '/') == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+
+def client(port: int, offset: int, count: int) -> tuple[list[float], int]:
+    latencies, errors = [], 0
+    for i in range(count):
+        start = time.perf_counter()
+        try:
+            errors += get(port, URLS[(offset + i) % len(URLS)]) != 200
+        except OSError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def load(port: int, clients: int, total: int) -> dict:
+    per_client = max(1, total // clients)
+    with ProcessPoolExecutor(max_workers=clients) as pool:
+        # Start the client processes before the clock does
+        list(pool.map(int, range(clients)))
+        started = time.perf_counter()
+        outcomes = list(pool.map(client, [port] * clients, range(clients), [per_client] * clients))
+        elapsed = time.perf_counter() - started
+    latencies = sorted(lat for lats, _ in outcomes for lat in lats)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, max(0, math.ceil(p * len(latencies)) - 1))] * 1000
+
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'errors': sum(errors for _, errors in outcomes),
+    }
+
+
+def children(pid: int) -> list[int]:
+    found = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            found.extend(int(p) for p in f.read().split())
+    return found
+
+
+def memory(pid: int) -> dict[str, float]:
+    """RSS, PSS and USS of a process in MiB."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'uss': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, '--child', mode, '--port', str(port),
+         '--workers', str(args.workers), '--threads', str(args.threads)],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        load(port, args.clients, args.clients * 20)  # warm every worker's page cache
+        result = load(port, args.clients, args.requests)
+        workers = children(proc.pid) or [proc.pid]
+        per_worker = [memory(pid) for pid in workers]
+        result['processes'] = len(workers) + (mode != 'single')
+        for key in ('rss', 'pss', 'uss'):
+            result[f'worker_{key}'] = statistics.mean(m[key] for m in per_worker)
+        total = sum(m['pss'] for m in per_worker)
+        if mode != 'single':
+            total += memory(proc.pid)['pss']
+        result['total_pss'] = total
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.port, args.workers, args.threads)
+        return 0
+
+    results = {mode: run_mode(mode, args) for mode in args.modes}
+    print(f'workers: {args.workers}  threads: {args.threads}  clients: {args.clients}  '
+          f'requests: {args.requests}')
+    print(f"{'mode':<12}{'req/s':>8}{'p50 ms':>8}{'p95 ms':>8}{'errors':>8}{'procs':>7}"
+          f"{'RSS/w':>8}{'PSS/w':>8}{'USS/w':>8}{'PSS all':>9}   (MiB)")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['rps']:>8.0f}{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['errors']:>8}"
+              f"{r['processes']:>7}{r['worker_rss']:>8.1f}{r['worker_pss']:>8.1f}{r['worker_uss']:>8.1f}"
+              f"{r['total_pss']:>9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
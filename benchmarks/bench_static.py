@@ -0,0 +1,83 @@
+"""
+Benchmark static file serving with and without the in-memory static store.
+
+Usage:
+  python benchmarks/bench_static.py [requests_per_case]
+
+Each case is requested through the Flask test client with
+STATIC_STORE_ENABLED on (hot files from memory, ranges from a shared mmap)
+and off (send_file from disk, via Compression's sibling lookup), and the
+mean wall time per request and the resulting requests per second are
+reported:
+
+  styles.css br     hot stylesheet, Brotli-encoded
+  main.js gzip      hot script, gzip-encoded
+  logo              small image, identity
+  materials range   a 64 KiB Range from the end of a large image, the
+                    way a resumed download or media seek asks for it
+  materials full    the same large image in full
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+LARGE = 'img/materials.png'
+
+
+def cases(static_url) -> list[tuple[str, str, dict, int]]:
+    size = (BASE_DIR / 'static' / LARGE).stat().st_size
+    return [
+        ('styles.css br', static_url('css/styles.css'), {'Accept-Encoding': 'br'}, 200),
+        ('main.js gzip', static_url('js/main.js'), {'Accept-Encoding': 'gzip'}, 200),
+        ('logo', static_url('img/logo.png'), {}, 200),
+        ('materials range', static_url(LARGE), {'Range': f'bytes={size - 65536}-'}, 206),
+        ('materials full', static_url(LARGE), {}, 200),
+    ]
+
+
+def time_case(client, url: str, headers: dict, expect: int, count: int) -> float:
+    response = client.get(url, headers=headers)  # warm-up
+    assert response.status_code == expect, (url, response.status_code)
+    response.close()
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.get(url, headers=headers)
+        response.get_data()
+        response.close()
+    return (time.perf_counter() - start) / count
+
+
+def main(count: int) -> None:
+    import app as site
+    from flask import url_for
+
+    site.limiter.enabled = False
+    app = site.app
+    with app.test_request_context():
+        urls = cases(lambda filename: url_for('static', filename=filename))
+    client = app.test_client()
+
+    results = {}
+    for enabled in (False, True):
+        app.config['STATIC_STORE_ENABLED'] = enabled
+        if enabled:
+            site.static_store.load()
+        for name, url, headers, expect in urls:
+            results[name, enabled] = time_case(client, url, headers, expect, count)
+
+    print(f'requests per case: {count}  store: {site.static_store.memory_used / 1024 / 1024:.1f} MiB in memory')
+    print(f"{'case':<18}{'disk us':>10}{'store us':>10}{'disk rps':>10}{'store rps':>11}{'speedup':>9}")
+    for name, *_ in urls:
+        disk, store = results[name, False], results[name, True]
+        print(f'{name:<18}{disk * 1e6:>10.0f}{store * 1e6:>10.0f}{1 / disk:>10.0f}{1 / store:>11.0f}'
+              f'{disk / store:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
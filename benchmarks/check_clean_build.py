@@ -0,0 +1,65 @@
+"""
+Check that building a fresh clone leaves the committed files untouched.
+
+Usage:
+  python benchmarks/check_clean_build.py [--jobs N] [--font-source DIR] [--keep]
+
+Clones HEAD into a temporary directory (so there is no .build-cache/ and
+every step runs), runs tools/build.py there and prints `git status` of the
+clone. Generated files whose inputs did not change must come out identical
+or be left alone, so the status should be empty; uncommitted changes in
+this checkout are not part of the clone. A full build re-encodes every
+responsive image and takes a few minutes.
+
+Exits with status 1 if the build fails or the clone is not clean. --keep
+leaves the clone in place to inspect the differences.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--font-source', type=Path, help='passed on to tools/build.py')
+    parser.add_argument('--keep', action='store_true', help='do not delete the clone')
+    args = parser.parse_args()
+
+    clone = Path(tempfile.mkdtemp(prefix='clean-build-'))
+    try:
+        subprocess.run(['git', 'clone', '--quiet', str(BASE_DIR), str(clone)], check=True)
+        command = [sys.executable, 'tools/build.py', '--jobs', str(args.jobs)]
+        if args.font_source:
+            command += ['--font-source', str(args.font_source.resolve())]
+        started = time.perf_counter()
+        build = subprocess.run(command, cwd=clone, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        summary = [line for line in build.stdout.splitlines() if line.startswith(('[', 'built:'))]
+        print('\n'.join(line for line in summary if 'running' not in line))
+        status = subprocess.run(['git', 'status', '--porcelain'], cwd=clone,
+                                capture_output=True, text=True, check=True).stdout
+        print(f'\nbuild exit status {build.returncode} in {elapsed:.0f} s')
+        if status:
+            print(f'clone is not clean:\n{status}', end='')
+        else:
+            print('clone is clean')
+        if args.keep:
+            print(f'clone kept at {clone}')
+        return 1 if build.returncode or status else 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(clone, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Check the mail queue's retry, lease and restart paths against FakeSMTPServer.
+
+Usage:
+  python benchmarks/check_mail_queue.py
+
+  retry     the server refuses the first delivery with a 451; the message
+            stays queued with attempts=1 and is delivered after the
+            retry delay
+  lease     a claimed message is not claimed again until its lease runs out
+  resume    mail spooled without a running sender (as after a restart) is
+            delivered once the process serves its first request
+
+Prints one line per check and exits with status 1 if any failed.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from bench_mail_queue import configure  # noqa: E402
+from fake_smtp import FakeSMTPServer  # noqa: E402
+
+RETRY_DELAY = 0.3
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def message(queue, subject: str):
+    with queue.app.app_context():
+        return queue.message(subject=subject, recipients=['admin@example.com'], body='check')
+
+
+def check_retry(queue, smtp: FakeSMTPServer) -> str | None:
+    smtp.fail = 1
+    start = time.monotonic()
+    queue.enqueue([message(queue, 'retry')])
+    if not wait_for(lambda: smtp.refused == 1):
+        return 'first attempt was not refused'
+    attempts = queue._db().execute('SELECT attempts, status FROM outbox').fetchall()
+    if attempts != [(1, 'queued')]:
+        return f'expected one queued row with attempts=1, got {attempts}'
+    if not wait_for(lambda: len(smtp.messages) == 1):
+        return 'message was not delivered after the retry'
+    if time.monotonic() - start < RETRY_DELAY:
+        return 'retried before the retry delay'
+    if queue.stats():
+        return f'spool not empty: {queue.stats()}'
+    return None
+
+
+def check_lease(queue) -> str | None:
+    queue.stop()
+    queue._insert(queue._db(), [message(queue, 'lease')], time.time())
+    now = time.time()
+    first = queue._claim(now)
+    again = queue._claim(now + 1)
+    expired = queue._claim(now + queue.app.config['MAIL_QUEUE_LEASE'] + 1)
+    queue._db().execute('DELETE FROM outbox')
+    if len(first) != 1 or again or len(expired) != 1:
+        return f'claims: first={len(first)} within lease={len(again)} after lease={len(expired)}'
+    return None
+
+
+def check_resume(site, queue, smtp: FakeSMTPServer) -> str | None:
+    queue.stop()
+    delivered = len(smtp.messages)
+    queue._insert(queue._db(), [message(queue, 'resume')], time.time())
+    queue._resumed = None  # as in a freshly started process
+    site.app.test_client().get('/api/config')
+    if not wait_for(lambda: len(smtp.messages) == delivered + 1):
+        return 'spooled message was not delivered after the first request'
+    return None
+
+
+def main() -> int:
+    import app as site
+
+    site.limiter.enabled = False
+    queue = site.mail_queue
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp, FakeSMTPServer() as smtp:
+        configure(site.app, smtp, os.path.join(tmp, 'queue.sqlite3'))
+        site.app.config['MAIL_QUEUE_RETRY_DELAY'] = RETRY_DELAY
+        checks = (
+            ('retry', lambda: check_retry(queue, smtp)),
+            ('lease', lambda: check_lease(queue)),
+            ('resume', lambda: check_resume(site, queue, smtp)),
+        )
+        for name, check in checks:
+            error = check()
+            failures += error is not None
+            print(f"{name:<8}{'ok' if error is None else 'FAILED: ' + error}")
+        queue.stop()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Minimal in-process SMTP server used by the benchmarks.
+
+It speaks just enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT), records every delivered message and can add an
+artificial per-message delay to simulate a slow upstream server. With
+``fail`` set, that many messages are refused with a temporary 451 error
+before delivery succeeds.
+
+Usage:
+  with FakeSMTPServer(delay=0.2) as server:
+      app.config['MAIL_PORT'] = server.port
+      ...
+      print(server.messages, server.connections)
+"""
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self) -> None:
+        server = self.server.owner
+        with server.lock:
+            server.connections += 1
+        self._reply('220 fake-smtp ready')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.wfile.write(b'250-fake-smtp\r\n250 8BITMIME\r\n')
+            elif verb == 'HELO':
+                self._reply('250 fake-smtp')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data == b'.\r\n':
+                        break
+                    chunks.append(data)
+                if server.delay:
+                    time.sleep(server.delay)
+                with server.lock:
+                    refuse = server.fail > 0
+                    server.fail -= refuse
+                    server.refused += refuse
+                if refuse:
+                    self._reply('451 Try again later')
+                    continue
+                with server.lock:
+                    server.messages.append({
+                        'from': mail_from,
+                        'to': rcpt_to,
+                        'data': b''.join(chunks),
+                        'received': time.perf_counter(),
+                    })
+                self._reply('250 OK queued')
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self._reply('250 OK')
+            elif verb == 'NOOP':
+                self._reply('250 OK')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeSMTPServer:
+    """Threaded fake SMTP server bound to an ephemeral localhost port."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, delay: float = 0.0, fail: int = 0):
+        self.delay = delay
+        self.fail = fail
+        self.refused = 0
+        self.messages: list[dict] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.owner = self
+        self.host, self.port = self._server.server_address
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> 'FakeSMTPServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeSMTPServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,342 @@
+"""
+Load-test every route in app.py and compare the run against a baseline.
+
+Usage:
+  python benchmarks/load_test.py [--mode client|server|both]
+                                 [--concurrency 1,8,32] [--requests 200]
+                                 [--routes index,contact,...]
+                                 [--output run.json] [--baseline base.json]
+                                 [--tolerance 0.15]
+
+Each route is driven at every concurrency level by that many worker
+threads, either through the Flask test client (``client``: the WSGI app
+alone) or over HTTP/1.1 keep-alive against a real threaded local server
+(``server``: adds sockets, parsing and the server's thread per request).
+Reported per route and level: requests/sec, mean/p50/p95/p99 latency and
+errors (responses other than the expected status). Per-request memory
+(peak and retained allocations, via tracemalloc) is measured separately
+with sequential test-client requests.
+
+The contact route goes through the real CSRF flow (each worker fetches a
+token from /api/csrf-token first) and the mail queue, which delivers to
+a local FakeSMTPServer. Rate limiting is disabled and email
+deliverability checks are answered by a local StubResolver, so the
+numbers measure the app, not the limits or the network.
+
+--output saves the run as JSON. --baseline compares against a saved run
+(same route, mode and concurrency) and exits with status 1 if
+requests/sec dropped, or p95 latency or peak memory grew, by more than
+--tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.client import HTTPConnection
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from bench_mail_queue import FORM, configure  # noqa: E402
+from fake_smtp import FakeSMTPServer  # noqa: E402
+from stub_resolver import StubResolver  # noqa: E402
+
+
+@dataclass
+class Route:
+    name: str
+    path: str
+    method: str = 'GET'
+    expect: int = 200
+    headers: dict = field(default_factory=dict)
+
+
+ROUTES = [
+    Route('index', '/'),
+    Route('coffee', '/company/coffee'),
+    Route('machines', '/company/machines'),
+    Route('materials', '/company/materials'),
+    Route('sitemap', '/sitemap.xml'),
+    Route('config', '/api/config'),
+    Route('csrf_token', '/api/csrf-token'),
+    Route('contact', '/api/contact', method='POST', expect=202),
+]
+MEMORY_SAMPLES = 20
+
+
+# -- sessions (one per worker thread) -------------------------------------
+
+class ClientSession:
+    """Flask test client; keeps the session cookie like a browser would."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method: str, path: str, body: bytes | None = None,
+                headers: dict | None = None) -> tuple[int, bytes]:
+        resp = self.client.open(path, method=method, data=body, headers=headers)
+        return resp.status_code, resp.data
+
+
+class HTTPSession:
+    """Keep-alive HTTP/1.1 connection with a minimal cookie jar."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.conn = HTTPConnection('127.0.0.1', port, timeout=30)
+        self.cookies: dict[str, str] = {}
+
+    def request(self, method: str, path: str, body: bytes | None = None,
+                headers: dict | None = None) -> tuple[int, bytes]:
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (OSError, ConnectionError):
+            self.conn.close()
+            self.conn = HTTPConnection('127.0.0.1', self.port, timeout=30)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        data = resp.read()
+        for header in resp.msg.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return resp.status, data
+
+
+def prepare(session, route: Route) -> tuple[bytes | None, dict]:
+    """Request body and headers for ``route`` (fetches a CSRF token for POSTs)."""
+    headers = dict(route.headers)
+    if route.method != 'POST':
+        return None, headers
+    status, data = session.request('GET', '/api/csrf-token')
+    if status != 200:
+        raise RuntimeError(f'/api/csrf-token returned {status}')
+    headers['X-CSRFToken'] = json.loads(data)['csrf_token']
+    headers['Content-Type'] = 'application/json'
+    return json.dumps(FORM).encode(), headers
+
+
+# -- measurement ------------------------------------------------------------
+
+def percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))]
+
+
+def run_level(make_session, route: Route, concurrency: int, total: int) -> dict:
+    per_worker = max(1, total // concurrency)
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker() -> tuple[list[float], int]:
+        session = make_session()
+        body, headers = prepare(session, route)
+        session.request(route.method, route.path, body, headers)  # warm-up
+        latencies, errors = [], 0
+        barrier.wait()
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            status, _ = session.request(route.method, route.path, body, headers)
+            latencies.append(time.perf_counter() - start)
+            errors += status != route.expect
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker) for _ in range(concurrency)]
+        barrier.wait()
+        started = time.perf_counter()
+        outcomes = [f.result() for f in futures]
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(lat for lats, _ in outcomes for lat in lats)
+    return {
+        'route': route.name,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def measure_memory(app, route: Route) -> dict:
+    session = ClientSession(app)
+    body, headers = prepare(session, route)
+    session.request(route.method, route.path, body, headers)
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(MEMORY_SAMPLES):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            session.request(route.method, route.path, body, headers)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        'peak_kb': round(statistics.median(peaks) / 1024, 1),
+        'retained_kb': round(statistics.median(retained) / 1024, 1),
+    }
+
+
+class LocalServer:
+    """Threaded werkzeug server on a free local port, in a background thread."""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> LocalServer:
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.thread.join()
+
+
+# -- reporting ----------------------------------------------------------------
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: list[dict]) -> None:
+    print(f"{'mode':<8}{'route':<12}{'conc':>5}{'req/s':>10}{'mean':>9}{'p50':>9}{'p95':>9}"
+          f"{'p99':>9}{'errors':>8}   (ms)")
+    for r in results:
+        print(f"{r['mode']:<8}{r['route']:<12}{r['concurrency']:>5}{r['rps']:>10.1f}{r['mean_ms']:>9.2f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['errors']:>8}")
+
+
+def compare(run: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of ``run`` against ``baseline``."""
+    regressions = []
+    base = {(r['mode'], r['route'], r['concurrency']): r for r in baseline.get('results', [])}
+    for r in run['results']:
+        old = base.get((r['mode'], r['route'], r['concurrency']))
+        if old is None:
+            continue
+        label = f"{r['mode']} {r['route']} x{r['concurrency']}"
+        if r['rps'] < old['rps'] * (1 - tolerance):
+            regressions.append(f"{label}: {old['rps']:.1f} -> {r['rps']:.1f} req/s")
+        if r['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {old['p95_ms']:.2f} -> {r['p95_ms']:.2f} ms")
+        if r['errors'] > old['errors']:
+            regressions.append(f"{label}: errors {old['errors']} -> {r['errors']}")
+    for name, mem in run['memory'].items():
+        old = baseline.get('memory', {}).get(name)
+        if old and mem['peak_kb'] > old['peak_kb'] * (1 + tolerance):
+            regressions.append(f"memory {name}: peak {old['peak_kb']} -> {mem['peak_kb']} KB/request")
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description='Load-test the Flask app.')
+    ap.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    ap.add_argument('--concurrency', default='1,8,32', help='comma-separated worker counts')
+    ap.add_argument('--requests', type=int, default=200, help='requests per route and level')
+    ap.add_argument('--routes', help='comma-separated subset of: ' + ', '.join(r.name for r in ROUTES))
+    ap.add_argument('--output', type=Path, help='save results as JSON')
+    ap.add_argument('--baseline', type=Path, help='compare against a saved JSON run')
+    ap.add_argument('--tolerance', type=float, default=0.15, help='allowed relative change (0.15 = 15%%)')
+    args = ap.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(',')]
+    modes = ['client', 'server'] if args.mode == 'both' else [args.mode]
+    routes = ROUTES
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        routes = [r for r in ROUTES if r.name in wanted]
+
+    import app as site
+
+    site.limiter.enabled = False
+    # Answer deliverability checks from a local stub instead of DNS
+    site.email_checker.resolver = StubResolver()
+
+    results, memory = [], {}
+    with tempfile.TemporaryDirectory() as tmp, FakeSMTPServer() as smtp:
+        configure(site.app, smtp, os.path.join(tmp, 'queue.sqlite3'))
+        site.app.config['CSRF_ENABLED'] = True
+
+        for route in routes:
+            memory[route.name] = measure_memory(site.app, route)
+        for mode in modes:
+            with LocalServer(site.app) if mode == 'server' else contextlib.nullcontext() as server:
+                if server is None:
+                    make_session = lambda: ClientSession(site.app)  # noqa: E731
+                else:
+                    make_session = lambda: HTTPSession(server.port)  # noqa: E731
+                for route in routes:
+                    for level in levels:
+                        results.append({'mode': mode, **run_level(make_session, route, level, args.requests)})
+        site.mail_queue.stop()
+
+    run = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'requests_per_level': args.requests,
+        },
+        'results': results,
+        'memory': memory,
+    }
+
+    print_results(results)
+    print(f"\n{'route':<12}{'peak KB':>10}{'retained KB':>13}   (per request)")
+    for name, mem in memory.items():
+        print(f"{name:<12}{mem['peak_kb']:>10.1f}{mem['retained_kb']:>13.1f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(run, indent=2), encoding='utf-8')
+        print(f"\nSaved {args.output}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare(run, baseline, args.tolerance)
+        print(f"\nCompared with {args.baseline} ({baseline['meta'].get('revision')}), "
+              f"tolerance {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if regressions:
+            return 1
+        print('  no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Report the page weight of each route with and without responsive images.
+
+Usage:
+  python benchmarks/page_weight.py [--width 720]
+
+Renders every page through the Flask test client and adds up the bytes of
+the HTML and every local stylesheet, script and image it references
+(machines gallery images included: the slides rendered by the server plus
+the ones main.js appends from the manifest).
+
+  original    every image is fetched from its <img src> (pre-variant markup)
+  responsive  browsers with AVIF/WebP support pick the smallest variant at
+              least --width pixels wide (720 = a 360px phone at 2x DPR)
+
+Run tools/build_responsive_images.py first; without variants both columns
+are equal. Third-party assets (fonts, CDN CSS, analytics) are not counted.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+ROUTES = ['/', '/company/coffee', '/company/machines', '/company/materials']
+STATIC = BASE_DIR / 'static'
+PREFERRED_TYPES = ['image/avif', 'image/webp']
+
+
+class AssetParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.assets: list[str] = []
+        self.images: list[tuple[str, list[dict]]] = []  # (fallback src, <source> candidates)
+        self._sources: list[dict] | None = None
+        self.carousel: dict | None = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'link' and (attrs.get('rel') == 'stylesheet' or attrs.get('as') == 'style'):
+            self.assets.append(attrs.get('href', ''))
+        elif tag == 'script' and attrs.get('src'):
+            self.assets.append(attrs['src'])
+        elif 'data-machines-carousel' in attrs:
+            self.carousel = attrs
+        elif tag == 'picture':
+            self._sources = []
+        elif tag == 'source' and self._sources is not None:
+            for candidate in attrs.get('srcset', '').split(','):
+                url, _, width = candidate.strip().partition(' ')
+                self._sources.append({'url': url, 'width': int(width.rstrip('w') or 0),
+                                      'type': attrs.get('type')})
+        elif tag == 'img' and attrs.get('src'):
+            self.images.append((attrs['src'], self._sources or []))
+
+    def handle_endtag(self, tag):
+        if tag == 'picture':
+            self._sources = None
+
+
+def fingerprint_originals() -> dict[str, str]:
+    """Fingerprinted name -> original name, from static/asset-manifest.json."""
+    try:
+        assets = json.loads((STATIC / 'asset-manifest.json').read_text('utf-8')).get('assets', {})
+    except (OSError, ValueError):
+        return {}
+    return {hashed: name for name, hashed in assets.items()}
+
+
+ORIGINALS = fingerprint_originals()
+
+
+def local_size(url: str) -> int:
+    path = url.split('?', 1)[0]
+    if not path.startswith('/static/'):
+        return 0
+    name = unquote(path[len('/static/'):])
+    file = STATIC / ORIGINALS.get(name, name)
+    return file.stat().st_size if file.exists() else 0
+
+
+def pick(sources: list[dict], target: int) -> str | None:
+    for mime in PREFERRED_TYPES:
+        candidates = sorted((s for s in sources if s['type'] == mime), key=lambda s: s['width'])
+        if candidates:
+            wide_enough = [s for s in candidates if s['width'] >= target]
+            return (wide_enough[0] if wide_enough else candidates[-1])['url']
+    return None
+
+
+def gallery_images(route: str, rendered: int) -> list[tuple[str, list[dict]]]:
+    """Slides main.js appends after the ``rendered`` server-side ones."""
+    if route != '/company/machines':
+        return []
+    manifest = json.loads((STATIC / 'img' / 'machines-gallery' / 'manifest.json').read_text('utf-8'))
+    images = []
+    for item in manifest[rendered:]:
+        item = {'file': item} if isinstance(item, str) else item
+        sources = [{'url': f"/static/{v['file']}", 'width': v['width'], 'type': v['type']}
+                   for v in item.get('variants', [])]
+        images.append((f"/static/img/machines-gallery/{item['file']}", sources))
+    return images
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--width', type=int, default=720, help='rendered image width in device pixels')
+    args = ap.parse_args()
+
+    import app as site
+
+    site.limiter.enabled = False
+    client = site.app.test_client()
+
+    print(f"{'route':<22}{'html':>9}{'css+js':>10}{'images':>7}{'original':>12}{'responsive':>12}{'saved':>8}")
+    for route in ROUTES:
+        html = client.get(route).data
+        parser = AssetParser()
+        parser.feed(html.decode('utf-8'))
+        static_bytes = sum(local_size(u) for u in set(parser.assets))
+        rendered = int(parser.carousel.get('data-rendered', 0)) if parser.carousel else 0
+        images = parser.images + gallery_images(route, rendered)
+
+        original = responsive = 0
+        for src, sources in images:
+            original += local_size(src)
+            best = pick(sources, args.width)
+            responsive += local_size(best) if best else local_size(src)
+
+        before = len(html) + static_bytes + original
+        after = len(html) + static_bytes + responsive
+        print(f"{route:<22}{len(html) / 1024:>8.0f}K{static_bytes / 1024:>9.0f}K{len(images):>7}"
+              f"{before / 1024:>11.0f}K{after / 1024:>11.0f}K{(1 - after / before) * 100:>7.0f}%")
+
+
+if __name__ == '__main__':
+    main()
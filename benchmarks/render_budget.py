@@ -0,0 +1,181 @@
+"""
+Report what each page makes the browser download before its first paint.
+
+Usage:
+  python benchmarks/render_budget.py [--output run.json]
+                                     [--baseline base.json] [--tolerance 0.10]
+
+Renders every page through the Flask test client and follows what blocks
+rendering: the HTML itself plus every stylesheet and synchronous script in
+<head> (a stylesheet with media="print" or rel="preload", anything inside
+<noscript>, and async/defer scripts do not block). Columns:
+
+  html        the page, gzip-compressed as compression.py sends it
+  css, js     blocking local stylesheets and scripts at their .gz size
+  3rd-party   blocking third-party requests; their bytes are fetched (as
+              gzip) when the network allows, otherwise shown as '?'
+  origins     distinct third-party origins on the blocking path, each a
+              DNS + TCP + TLS setup before the first paint
+  budget      html + css + js + third-party bytes, in KiB
+
+--output saves the numbers as JSON; --baseline compares budgets against a
+saved run and exits with status 1 if any grew by more than --tolerance.
+To measure an older revision, run a copy of this file inside a checkout
+of it (e.g. a git worktree) with --output and pass that as --baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sys
+from functools import lru_cache
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+from urllib.request import Request, urlopen
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+ROUTES = ['/', '/company/coffee', '/company/machines', '/company/materials']
+STATIC = BASE_DIR / 'static'
+
+
+class BlockingParser(HTMLParser):
+    """Collects the render-blocking stylesheets and scripts of a page."""
+
+    def __init__(self):
+        super().__init__()
+        self.css: list[str] = []
+        self.js: list[str] = []
+        self._in_head = False
+        self._noscript = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'head':
+            self._in_head = True
+        elif tag == 'noscript':
+            self._noscript += 1
+        elif self._noscript:
+            return
+        elif tag == 'link' and attrs.get('rel') == 'stylesheet' and attrs.get('media', 'all') != 'print':
+            self.css.append(attrs.get('href', ''))
+        elif (tag == 'script' and self._in_head and attrs.get('src')
+              and 'async' not in attrs and 'defer' not in attrs and attrs.get('type') != 'module'):
+            self.js.append(attrs['src'])
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self._in_head = False
+        elif tag == 'noscript':
+            self._noscript -= 1
+
+
+def fingerprint_originals() -> dict[str, str]:
+    """Fingerprinted name -> original name, from static/asset-manifest.json."""
+    try:
+        assets = json.loads((STATIC / 'asset-manifest.json').read_text('utf-8')).get('assets', {})
+    except (OSError, ValueError):
+        return {}
+    return {hashed: name for name, hashed in assets.items()}
+
+
+ORIGINALS = fingerprint_originals()
+
+
+def local_wire_size(url: str) -> int:
+    name = unquote(urlsplit(url).path[len('/static/'):])
+    file = STATIC / ORIGINALS.get(name, name)
+    return len(gzip.compress(file.read_bytes(), compresslevel=9)) if file.exists() else 0
+
+
+@lru_cache(maxsize=None)
+def remote_wire_size(url: str) -> int | None:
+    if url.startswith('//'):
+        url = 'https:' + url
+    try:
+        request = Request(url, headers={'Accept-Encoding': 'gzip', 'User-Agent': 'Mozilla/5.0'})
+        with urlopen(request, timeout=5) as response:
+            return len(response.read())
+    except OSError:
+        return None
+
+
+def measure(client) -> dict:
+    results = {}
+    for route in ROUTES:
+        html = client.get(route).data
+        parser = BlockingParser()
+        parser.feed(html.decode('utf-8'))
+        row = {'html': len(gzip.compress(html, compresslevel=9)), 'css': 0, 'js': 0,
+               '3rd-party': 0, '3rd-party bytes': 0, 'origins': 0, 'unknown': 0}
+        origins = set()
+        for kind, urls in (('css', parser.css), ('js', parser.js)):
+            for url in urls:
+                parts = urlsplit(url)
+                if not parts.netloc:
+                    row[kind] += local_wire_size(url)
+                    continue
+                origins.add(parts.netloc)
+                row['3rd-party'] += 1
+                size = remote_wire_size(url)
+                if size is None:
+                    row['unknown'] += 1
+                else:
+                    row['3rd-party bytes'] += size
+        row['origins'] = len(origins)
+        row['budget'] = row['html'] + row['css'] + row['js'] + row['3rd-party bytes']
+        results[route] = row
+    return results
+
+
+def report(results: dict) -> None:
+    print(f"{'route':<22}{'html':>8}{'css':>8}{'js':>7}{'3rd-party':>11}{'origins':>9}{'budget':>9}")
+    for route, row in results.items():
+        third = f"{row['3rd-party']}" + (f" ({row['3rd-party bytes'] / 1024:.0f}K)" if row['3rd-party bytes'] else '')
+        third += '?' * bool(row['unknown'])
+        budget = f"{row['budget'] / 1024:.1f}K" + ('+?' if row['unknown'] else '')
+        print(f"{route:<22}{row['html'] / 1024:>7.1f}K{row['css'] / 1024:>7.1f}K{row['js'] / 1024:>6.1f}K"
+              f"{third:>11}{row['origins']:>9}{budget:>9}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    for route, row in results.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        change = row['budget'] / before['budget'] - 1
+        flag = 'REGRESSION' if change > tolerance else 'ok'
+        ok = ok and flag == 'ok'
+        print(f"{route:<22}{before['budget'] / 1024:>7.1f}K -> {row['budget'] / 1024:>7.1f}K  {change * 100:+6.1f}%  "
+              f"blocking 3rd-party {before['3rd-party']} -> {row['3rd-party']}, "
+              f"origins {before['origins']} -> {row['origins']}  {flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    import app as site
+
+    site.limiter.enabled = False
+    results = measure(site.app.test_client())
+    report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        return 0 if compare(results, baseline, args.tolerance) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
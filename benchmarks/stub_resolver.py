@@ -0,0 +1,35 @@
+"""
+Local stand-in for DNS deliverability lookups (email_checks.EmailChecker).
+
+Usage:
+  resolver = StubResolver(delay=0.2, undeliverable={'nowhere.invalid'})
+  site.email_checker.resolver = resolver
+  ...
+  print(resolver.calls)
+
+Every domain is deliverable (one fake MX) unless listed in
+``undeliverable``; each lookup sleeps ``delay`` seconds to simulate a
+slow resolver and is counted in ``calls``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from email_validator import EmailUndeliverableError
+
+
+class StubResolver:
+    def __init__(self, delay: float = 0.0, undeliverable: set[str] | None = None):
+        self.delay = delay
+        self.undeliverable = set(undeliverable or ())
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, domain: str, domain_i18n: str, timeout: float) -> dict:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if domain in self.undeliverable:
+            raise EmailUndeliverableError(f'The domain name {domain_i18n} does not exist.')
+        return {'mx': [(10, f'mx.{domain}')], 'mx_fallback_type': None}
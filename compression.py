@@ -0,0 +1,192 @@
+"""
+Response compression negotiated on Accept-Encoding.
+
+* Static files: if tools/fingerprint_static.py wrote a ``.br``/``.gz``
+  sibling next to the file under static/, that file is sent as-is with
+  the matching Content-Encoding (fingerprinted names included).
+* Static files without a sibling are sent uncompressed: ``send_file``
+  streams them from disk and streamed responses are left alone.
+* Buffered responses (rendered pages, /api/config, /sitemap.xml) are
+  compressed on the fly when the body is at least ``COMPRESS_MIN_SIZE``
+  bytes and its mimetype is listed in ``COMPRESS_MIMETYPES``.
+
+Responses that carry an ETag (page-cached views, static files) have their
+compressed bodies kept in a small LRU keyed on (ETag, encoding), so a page
+served from the page cache is not recompressed on every hit. The ETag of
+a compressed body is weakened, which keeps If-None-Match revalidation
+working against the identity ETag.
+
+Brotli is used when the optional ``brotli`` package is installed; gzip
+otherwise.
+"""
+
+import gzip
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+from asset_manifest import IMMUTABLE
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+DEFAULT_MIMETYPES = (
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/xml',
+    'application/javascript',
+    'text/javascript',
+    'application/json',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+class Compression:
+    """Compresses responses and serves precompressed static files."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._static_view = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ENABLED', True)
+        app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+        app.config.setdefault('COMPRESS_PRECOMPRESSED', True)
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 5)
+        app.config.setdefault('COMPRESS_CACHE_MAX_ENTRIES', 128)
+        self.app = app
+        app.extensions['compression'] = self
+        # Wrap whichever static view is registered (AssetManifest's, if any)
+        self._static_view = app.view_functions['static']
+        app.view_functions['static'] = self.send_static_file
+        app.after_request(self._after_request)
+
+    @property
+    def encodings(self):
+        return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def negotiate(self):
+        """Best encoding the client accepts, or None for identity."""
+        if not self.app.config['COMPRESS_ENABLED']:
+            return None
+        return request.accept_encodings.best_match(self.encodings)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.app.config['COMPRESS_BR_LEVEL'])
+        return gzip.compress(data, compresslevel=self.app.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+    def _compress_cached(self, data, encoding, etag):
+        if etag is None:
+            return self.compress(data, encoding)
+        key = (etag, encoding)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+                return body
+        body = self.compress(data, encoding)
+        with self._lock:
+            self._cache[key] = body
+            while len(self._cache) > self.app.config['COMPRESS_CACHE_MAX_ENTRIES']:
+                self._cache.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _precompressed(self, filename):
+        """(encoding, sibling name) for a fresh precompressed file, or None."""
+        config = self.app.config
+        if not (config['COMPRESS_ENABLED'] and config['COMPRESS_PRECOMPRESSED']) or request.range:
+            return None
+        path = safe_join(self.app.static_folder, filename)
+        if path is None:
+            return None
+        try:
+            source_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        available = []
+        for encoding in self.encodings:
+            try:
+                if os.stat(path + SUFFIXES[encoding]).st_mtime_ns >= source_mtime:
+                    available.append(encoding)
+            except OSError:
+                continue
+        if not available:
+            return None
+        request.environ['compression.vary'] = True
+        encoding = request.accept_encodings.best_match(available)
+        return (encoding, filename + SUFFIXES[encoding]) if encoding else None
+
+    def send_static_file(self, filename):
+        """Static view: send a precompressed sibling when the client accepts it."""
+        manifest = self.app.extensions.get('asset_manifest')
+        original = manifest.original(filename) if manifest else filename
+        found = self._precompressed(original)
+        if found is None:
+            return self._static_view(filename)
+        encoding, sibling = found
+        response = send_from_directory(
+            self.app.static_folder, sibling,
+            mimetype=mimetypes.guess_type(original)[0] or 'application/octet-stream',
+            max_age=self.app.get_send_file_max_age(original),
+        )
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        if original != filename:
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    def _after_request(self, response):
+        if request.environ.get('compression.vary'):
+            response.vary.add('Accept-Encoding')
+        config = self.app.config
+        if not config['COMPRESS_ENABLED'] or response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (
+            response.status_code != 200
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+
+        length = response.content_length
+        if length is not None and length < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        etag, _ = response.get_etag()
+        response.set_data(self._compress_cached(data, encoding, etag))
+        response.headers['Content-Encoding'] = encoding
+        response.headers.pop('Accept-Ranges', None)
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
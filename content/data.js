@@ -1,18 +1,14 @@
+// Generated from content/site.json by tools/build_content.py - edit that file instead.
 window.HIMMA_CONTENT = window.HIMMA_CONTENT || {};
 window.HIMMA_CONTENT.site = Object.assign({}, window.HIMMA_CONTENT.site || {}, {
-  name: 'Himma Group',
-  email: 'info@himmagroup.com',
-  phone: '+251 93 598 8288',
-  whatsapp: '+251 93 598 8288',
-  whatsappMessage: 'Hello Himma Group, I would like to know more about your services.'
+  "name": "Himma Group",
+  "email": "info@himmagroup.com",
+  "phone": "+251 93 598 8288",
+  "whatsapp": "+251 93 598 8288",
+  "whatsappMessage": "Hello Himma Group, I would like to know more about your services."
 });
-
-// Optional external app links used by embedded pages
 window.HIMMA_CONTENT.links = Object.assign({}, window.HIMMA_CONTENT.links || {}, {
-  // Set this to your VisionWIC Coffee app URL (e.g., 'http://localhost:5173' or a deployed link)
-  coffeeApp: '',
-  // Set this to your VisionWIC Machines app URL
-  machinesApp: '',
-  // Set this to your VisionWIC Materials app URL
-  materialsApp: ''
+  "coffeeApp": "",
+  "machinesApp": "",
+  "materialsApp": ""
 });
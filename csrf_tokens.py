@@ -0,0 +1,140 @@
+"""
+Stateless CSRF protection with signed double-submit cookies.
+
+A token is ``<issued>.<nonce>.<signature>``: the issue time (hex seconds),
+a random nonce and an HMAC-SHA256 of both keyed from ``SECRET_KEY``. It is
+valid for ``CSRF_TIME_LIMIT`` seconds and needs no session or server-side
+storage to check.
+
+* Every HTML response to a visitor without a fresh token sets it in the
+  ``CSRF_COOKIE_NAME`` cookie (readable by scripts, ``SameSite=Lax``).
+  The page body is the same for everyone, so the page cache keeps working;
+  only the responses that set the cookie are marked ``private``.
+* Scripts copy the cookie into the ``X-CSRFToken`` header (or a
+  ``csrf_token`` form field) when they submit. ``GET /api/csrf-token``
+  returns and sets a token for pages that arrived without the cookie.
+* Unsafe requests (POST, PUT, PATCH, DELETE) are rejected with a JSON 400
+  unless the submitted token equals the cookie, its signature checks out
+  and it has not expired. Another site can neither read the cookie nor
+  forge a signature, so it cannot produce a matching pair.
+
+``csrf.exempt(view)`` skips the check for a view. Set
+``CSRF_ENABLED = False`` to turn the check off (tests, benchmarks).
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from flask import g, jsonify, request
+
+UNSAFE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class CSRFTokens:
+    """Issues and checks HMAC-signed, time-limited CSRF tokens."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._key = None
+        self._exempt = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CSRF_ENABLED', True)
+        app.config.setdefault('CSRF_TIME_LIMIT', 24 * 3600)
+        app.config.setdefault('CSRF_COOKIE_NAME', 'csrf_token')
+        app.config.setdefault('CSRF_HEADER_NAME', 'X-CSRFToken')
+        app.config.setdefault('CSRF_FIELD_NAME', 'csrf_token')
+        self.app = app
+        app.extensions['csrf_tokens'] = self
+        app.before_request(self._protect)
+        app.after_request(self._set_cookie)
+
+    @property
+    def key(self):
+        # Derived so the token signature never doubles as a session signature
+        if self._key is None:
+            secret = str(self.app.config['SECRET_KEY']).encode('utf-8')
+            self._key = hmac.new(secret, b'csrf-token', hashlib.sha256).digest()
+        return self._key
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self.key, payload.encode('ascii'), hashlib.sha256).digest())
+
+    def generate(self):
+        """A new token, valid for ``CSRF_TIME_LIMIT`` seconds."""
+        payload = f'{int(time.time()):x}.{_b64(os.urandom(12))}'
+        return f'{payload}.{self._sign(payload)}'
+
+    def age(self, token):
+        """Seconds since ``token`` was issued, or None if it is not ours or has expired."""
+        try:
+            issued, nonce, signature = token.split('.')
+            age = time.time() - int(issued, 16)
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature, self._sign(f'{issued}.{nonce}')):
+            return None
+        if not -60 <= age <= self.app.config['CSRF_TIME_LIMIT']:
+            return None
+        return age
+
+    def current(self):
+        """The request's cookie token if still valid, else a new one."""
+        token = request.cookies.get(self.app.config['CSRF_COOKIE_NAME'])
+        return token if self.age(token) is not None else self.generate()
+
+    def exempt(self, view):
+        """Decorator: do not check CSRF tokens for ``view``."""
+        self._exempt.add(f'{view.__module__}.{view.__name__}')
+        return view
+
+    def _protect(self):
+        if not self.app.config['CSRF_ENABLED'] or request.method not in UNSAFE_METHODS:
+            return None
+        view = self.app.view_functions.get(request.endpoint)
+        if view is None or f'{view.__module__}.{view.__name__}' in self._exempt:
+            return None
+        cookie = request.cookies.get(self.app.config['CSRF_COOKIE_NAME'], '')
+        submitted = (request.headers.get(self.app.config['CSRF_HEADER_NAME'])
+                     or request.form.get(self.app.config['CSRF_FIELD_NAME'], ''))
+        if cookie and hmac.compare_digest(cookie, submitted) and self.age(cookie) is not None:
+            return None
+        return jsonify({
+            'status': 'error',
+            'message': 'Your session expired. Please reload the page and try again.',
+        }), 400
+
+    def _set_cookie(self, response):
+        """Give HTML pages (and explicit token requests) a fresh token cookie."""
+        token = g.pop('csrf_token', None)
+        if token is None:
+            if response.mimetype != 'text/html' or request.method != 'GET':
+                return response
+            cookie = request.cookies.get(self.app.config['CSRF_COOKIE_NAME'])
+            age = self.age(cookie)
+            # Renew once half the lifetime has passed, so an open page keeps a usable token
+            if age is not None and age < self.app.config['CSRF_TIME_LIMIT'] / 2:
+                return response
+            token = self.generate()
+        response.set_cookie(
+            self.app.config['CSRF_COOKIE_NAME'], token,
+            max_age=self.app.config['CSRF_TIME_LIMIT'],
+            secure=request.is_secure, httponly=False, samesite='Lax',
+        )
+        # A shared cache must not hand this visitor's cookie to others
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def token_response(self):
+        """JSON ``{'csrf_token': ...}`` for /api/csrf-token, also set as the cookie."""
+        g.csrf_token = self.current()
+        return jsonify({'csrf_token': g.csrf_token})
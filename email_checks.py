@@ -0,0 +1,157 @@
+"""
+Email address validation with cached, bounded deliverability checks.
+
+``email_checker.validate(address)`` checks the syntax locally, then asks
+whether the domain accepts mail (MX, falling back to A/AAAA), but:
+
+* answers are cached per domain: deliverable domains for
+  ``EMAIL_CHECK_TTL`` seconds, undeliverable ones (negative caching) for
+  ``EMAIL_CHECK_NEGATIVE_TTL``;
+* concurrent submissions for the same domain share one in-flight lookup;
+* a request never waits longer than ``EMAIL_CHECK_TIMEOUT`` seconds. On
+  timeout the address is accepted on syntax alone while the lookup keeps
+  running in the background and fills the cache;
+* ``EMAIL_CHECK_MODE = 'syntax'`` skips DNS entirely.
+
+The resolver is pluggable: any callable ``resolver(domain, domain_i18n,
+timeout)`` that returns a dict (``{'unknown-deliverability': ...}`` when
+it cannot tell) or raises ``EmailUndeliverableError``. See
+benchmarks/stub_resolver.py for a local stub.
+
+email_validator (and dnspython behind it) is imported on first use so
+worker processes start without it.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as LookupTimeout
+
+
+class DNSResolver:
+    """Deliverability lookups through dnspython with a shared resolver."""
+
+    def __init__(self):
+        self._resolver = None
+        self._timeout = None
+
+    def __call__(self, domain, domain_i18n, timeout):
+        from email_validator import caching_resolver
+        from email_validator.deliverability import validate_email_deliverability
+
+        if self._resolver is None or self._timeout != timeout:
+            self._resolver, self._timeout = caching_resolver(timeout=timeout), timeout
+        return validate_email_deliverability(domain, domain_i18n, dns_resolver=self._resolver)
+
+
+class EmailChecker:
+    """Validates addresses; caches and coalesces per-domain DNS checks."""
+
+    def __init__(self, app=None, resolver=None):
+        self.app = None
+        self.resolver = resolver or DNSResolver()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EMAIL_CHECK_MODE', 'dns')
+        app.config.setdefault('EMAIL_CHECK_TIMEOUT', 2.0)
+        app.config.setdefault('EMAIL_CHECK_TTL', 3600)
+        app.config.setdefault('EMAIL_CHECK_NEGATIVE_TTL', 300)
+        app.config.setdefault('EMAIL_CHECK_MAX_ENTRIES', 4096)
+        app.config.setdefault('EMAIL_CHECK_WORKERS', 4)
+        self.app = app
+        app.extensions['email_checker'] = self
+
+    def validate(self, email):
+        """Validate ``email``; raises ``EmailNotValidError`` (or its subclass
+        ``EmailUndeliverableError``) like ``email_validator.validate_email``."""
+        from email_validator import validate_email
+
+        result = validate_email(email, check_deliverability=False)
+        if self.app.config['EMAIL_CHECK_MODE'] != 'syntax':
+            self.check_domain(result.ascii_domain, result.domain)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _executor(self):
+        # Threads do not survive fork(); start a fresh pool in each worker
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.app.config['EMAIL_CHECK_WORKERS'], thread_name_prefix='email-check')
+            self._pid = os.getpid()
+            self._inflight = {}
+        return self._pool
+
+    def _timer(self, operation):
+        metrics = self.app.extensions.get('metrics')
+        return metrics.timer(operation) if metrics else contextlib.nullcontext()
+
+    def _lookup(self, domain, domain_i18n):
+        with self._timer('email.dns_lookup'):
+            return self.resolver(domain, domain_i18n, self.app.config['EMAIL_CHECK_TIMEOUT'])
+
+    def _store(self, domain, future):
+        from email_validator import EmailUndeliverableError
+
+        now = time.monotonic()
+        error = future.exception()
+        with self._lock:
+            self._inflight.pop(domain, None)
+            if isinstance(error, EmailUndeliverableError):
+                entry = (now + self.app.config['EMAIL_CHECK_NEGATIVE_TTL'], None, str(error))
+            elif error is None and 'unknown-deliverability' not in future.result():
+                entry = (now + self.app.config['EMAIL_CHECK_TTL'], future.result(), None)
+            else:
+                return  # timeouts and resolver failures are not cached
+            self._cache[domain] = entry
+            self._cache.move_to_end(domain)
+            while len(self._cache) > self.app.config['EMAIL_CHECK_MAX_ENTRIES']:
+                self._cache.popitem(last=False)
+
+    def check_domain(self, domain, domain_i18n=None):
+        """Return deliverability info for ``domain`` or raise
+        ``EmailUndeliverableError``; answers from cache when possible."""
+        from email_validator import EmailUndeliverableError
+
+        domain_i18n = domain_i18n or domain
+        now = time.monotonic()
+        started = False
+        with self._lock:
+            entry = self._cache.get(domain)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(domain)
+            else:
+                entry = None
+                future = self._inflight.get(domain)
+                if future is None:
+                    future = self._executor().submit(self._lookup, domain, domain_i18n)
+                    self._inflight[domain] = future
+                    started = True
+        if entry is not None:
+            if entry[2] is not None:
+                raise EmailUndeliverableError(entry[2])
+            return entry[1]
+        if started:
+            # Registered outside the lock: the callback may run immediately
+            future.add_done_callback(lambda f: self._store(domain, f))
+
+        try:
+            return future.result(timeout=self.app.config['EMAIL_CHECK_TIMEOUT'])
+        except LookupTimeout:
+            return {'unknown-deliverability': 'timeout'}
+        except EmailUndeliverableError as e:
+            raise EmailUndeliverableError(str(e)) from None
+        except Exception as e:
+            print(f"Email deliverability check failed for {domain}: {str(e)}")
+            return {'unknown-deliverability': 'error'}
@@ -0,0 +1,71 @@
+"""
+Machines gallery manifest, parsed once and shared by the views.
+
+tools/build_machines_gallery.py writes static/img/machines-gallery/
+manifest.json. ``gallery.items()`` returns its entries normalised to
+``{'file', 'path', 'width', 'height', 'variants'}`` (``path`` is relative
+to static/), re-reading the file only when its mtime changes.
+``gallery.version`` is suitable for ``page_cache.watch``.
+"""
+
+import json
+import os
+import threading
+
+
+class Gallery:
+    """mtime-keyed cache of the machines gallery manifest."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._items = []
+        self._mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            'GALLERY_MANIFEST',
+            os.path.join(app.static_folder, 'img', 'machines-gallery', 'manifest.json'),
+        )
+        app.config.setdefault('GALLERY_INITIAL_SLIDES', 6)
+        app.config.setdefault('GALLERY_PRELOAD_SLIDES', 2)
+        self.app = app
+        app.extensions['gallery'] = self
+
+    @property
+    def manifest_path(self):
+        return self.app.config['GALLERY_MANIFEST']
+
+    def version(self):
+        """Modification time of the manifest (None if it does not exist)."""
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def items(self):
+        """Return the normalised entries, re-reading the manifest on change."""
+        mtime = self.version()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.manifest_path, encoding='utf-8') as f:
+                            entries = json.load(f)
+                    except (OSError, ValueError):
+                        entries = []
+                    self._items = [self._normalise(e) for e in entries if e] if isinstance(entries, list) else []
+                    self._mtime = mtime
+        return self._items
+
+    def _normalise(self, entry):
+        # Older manifests list bare filenames
+        item = {'file': entry} if isinstance(entry, str) else dict(entry)
+        folder = os.path.relpath(os.path.dirname(self.manifest_path), self.app.static_folder)
+        item['path'] = os.path.join(folder, item['file']).replace(os.sep, '/')
+        item.setdefault('width', None)
+        item.setdefault('height', None)
+        item.setdefault('variants', [])
+        return item
@@ -0,0 +1,105 @@
+"""
+Intrinsic sizes and loading placeholders for the site's images.
+
+tools/build_image_index.py writes static/img/image-index.json with the
+width, height, dominant colour and a tiny WebP preview (LQIP) of every
+image under static/img/ and the logos. With it loaded:
+
+* ``img('img/usa.svg', 'North America', loading='lazy')`` renders an
+  <img> with ``width``/``height`` (so the browser reserves the box before
+  the file arrives) and, for opaque images, a ``background`` of the
+  dominant colour and preview stretched over that box;
+* ``picture()`` (responsive_images.py) adds the same attributes;
+* keyword names map to attributes with ``_`` as ``-`` (``aria_hidden='true'``);
+* ``img(..., data_src=True)`` renders the ``data-src`` markup main.js
+  lazy-loads, with the placeholder visible until the image is swapped in.
+
+Images missing from the index render without the extra attributes.
+Set ``IMAGE_PLACEHOLDERS = False`` to emit sizes only.
+"""
+
+import json
+import os
+import threading
+
+from flask import url_for
+from markupsafe import Markup
+
+from responsive_images import render_attrs
+
+
+class ImageIndex:
+    """mtime-keyed cache of the image index; exposes ``img()`` to templates."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('IMAGE_INDEX', os.path.join(app.static_folder, 'img', 'image-index.json'))
+        app.config.setdefault('IMAGE_PLACEHOLDERS', True)
+        self.app = app
+        app.extensions['image_index'] = self
+        app.jinja_env.globals['img'] = self.img
+
+    def version(self):
+        """Modification time of the index (None if it does not exist)."""
+        try:
+            return os.stat(self.app.config['IMAGE_INDEX']).st_mtime_ns
+        except OSError:
+            return None
+
+    def entries(self):
+        """Return the parsed index, re-reading it only when the file changes."""
+        mtime = self.version()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.app.config['IMAGE_INDEX'], encoding='utf-8') as f:
+                            self._entries = json.load(f)
+                    except (OSError, ValueError):
+                        self._entries = {}
+                    self._mtime = mtime
+        return self._entries
+
+    def placeholder(self, entry):
+        """CSS ``background`` value showing ``entry``'s colour and preview ('' if none)."""
+        if not self.app.config['IMAGE_PLACEHOLDERS'] or not entry.get('color'):
+            return ''
+        if entry.get('lqip'):
+            return f"{entry['color']} url({entry['lqip']}) center/cover no-repeat"
+        return entry['color']
+
+    def attributes(self, filename, record=None, style=None):
+        """``width``/``height``/``style`` for an <img> of ``filename``.
+
+        ``record`` (e.g. a gallery manifest entry) fills in whatever the
+        index does not know; ``style`` is appended after the placeholder
+        so a template's own background wins.
+        """
+        entry = dict(record or {}, **self.entries().get(filename, {}))
+        attrs = {}
+        if entry.get('width') and entry.get('height'):
+            attrs['width'], attrs['height'] = entry['width'], entry['height']
+        background = self.placeholder(entry)
+        if background:
+            attrs['data-placeholder'] = True
+            style = f'background:{background};{style}' if style else f'background:{background}'
+        if style:
+            attrs['style'] = style
+        return attrs
+
+    def img(self, filename, alt='', data_src=False, **attrs):
+        """Render an <img> for a file under static/ with its size and placeholder."""
+        url = url_for('static', filename=filename)
+        tag = {'data-src': url} if data_src else {'src': url}
+        tag['alt'] = alt
+        tag.update(self.attributes(filename, style=attrs.pop('style', None)))
+        # aria_hidden='true' -> aria-hidden="true" (Jinja keywords cannot contain '-')
+        tag.update({name.replace('_', '-'): value for name, value in attrs.items()})
+        return Markup(f'<img {render_attrs(tag)} />')
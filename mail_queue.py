@@ -0,0 +1,390 @@
+"""
+Durable outbound mail queue for the Himma Group site.
+
+Messages are spooled into a local SQLite database and delivered by a
+background sender thread, so request handlers never wait on SMTP.
+The sender keeps one SMTP connection open across messages, delivers
+every message queued by a single submission in the same session and
+retries failed deliveries with exponential backoff.
+
+Digest mode (``MAIL_DIGEST_INTERVAL`` > 0): items passed to ``collect()``
+are stored in the same database, identical items (same content hash)
+are counted instead of repeated, and the sender turns everything
+collected into one batch of messages -- built by the function registered
+with ``@mail_queue.digest`` -- once the oldest item is
+``MAIL_DIGEST_INTERVAL`` seconds old or ``MAIL_DIGEST_MAX_ITEMS`` items
+have arrived.
+
+The sender starts when mail is queued or collected, and also on the first
+request a process serves when the spool still holds undelivered mail (or
+digest items) from before a restart, so that mail does not wait for the
+next form submission.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    claimed_until REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+CREATE TABLE IF NOT EXISTS digest (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+# Message attributes that survive the trip through the spool
+MESSAGE_FIELDS = ('subject', 'recipients', 'body', 'html', 'sender', 'reply_to')
+
+
+class MailQueue:
+    """SQLite-backed mail spool with a pooled-connection background sender."""
+
+    def __init__(self, app=None, mail=None):
+        self.app = None
+        self._mail = None
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._resumed = None
+        self._connection = None
+        self._connection_used = 0.0
+        self._digest_builder = None
+        if app is not None:
+            self.init_app(app, mail)
+
+    def init_app(self, app, mail=None):
+        app.config.setdefault('MAIL_QUEUE_PATH', os.path.join(app.instance_path, 'mail_queue.sqlite3'))
+        app.config.setdefault('MAIL_QUEUE_BATCH_SIZE', 20)
+        app.config.setdefault('MAIL_QUEUE_MAX_ATTEMPTS', 6)
+        app.config.setdefault('MAIL_QUEUE_RETRY_DELAY', 30)
+        app.config.setdefault('MAIL_QUEUE_MAX_RETRY_DELAY', 3600)
+        app.config.setdefault('MAIL_QUEUE_IDLE_TIMEOUT', 30)
+        app.config.setdefault('MAIL_QUEUE_POLL_INTERVAL', 5)
+        app.config.setdefault('MAIL_QUEUE_LEASE', 120)
+        app.config.setdefault('MAIL_DIGEST_INTERVAL', 0)
+        app.config.setdefault('MAIL_DIGEST_MAX_ITEMS', 50)
+        self.app = app
+        self._mail = mail
+        app.extensions['mail_queue'] = self
+        app.before_request(self.resume)
+
+    @property
+    def mail(self):
+        """The Flask-Mail instance; created on first use unless one was given."""
+        if self._mail is None:
+            from flask_mail import Mail
+            self._mail = Mail(self.app)
+        return self._mail
+
+    def message(self, **fields):
+        """Build a ``flask_mail.Message``; its defaults come from the Mail state."""
+        from flask_mail import Message
+
+        self.mail  # noqa: B018  (make sure the state is registered)
+        return Message(**fields)
+
+    # -- storage -----------------------------------------------------------
+
+    @property
+    def path(self):
+        return self.app.config['MAIL_QUEUE_PATH']
+
+    def _db(self):
+        """Return this thread's connection, reopening it after a fork or a path change."""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid() or self._local.path != self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+            self._local.path = self.path
+        return db
+
+    def enqueue(self, messages):
+        """Spool one or more Flask-Mail messages and return their batch id.
+
+        Due messages are claimed in id order, up to MAIL_QUEUE_BATCH_SIZE
+        at a time, so an admin notification and its auto-reply usually
+        share one SMTP session; a batch may still span several claims.
+        """
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            batch = self._insert(db, messages, time.time())
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        self.ensure_started()
+        self._wakeup.set()
+        return batch
+
+    @staticmethod
+    def _insert(db, messages, now):
+        batch = uuid.uuid4().hex
+        db.executemany(
+            'INSERT INTO outbox (batch, payload, next_attempt, created) VALUES (?, ?, ?, ?)',
+            [(batch, json.dumps({f: getattr(msg, f, None) for f in MESSAGE_FIELDS}), now, now)
+             for msg in messages],
+        )
+        return batch
+
+    # -- digests -----------------------------------------------------------
+
+    @property
+    def digest_enabled(self):
+        return bool(self.app.config['MAIL_DIGEST_INTERVAL']) and self._digest_builder is not None
+
+    def digest(self, func):
+        """Register the digest builder. Can be used as a decorator.
+
+        ``func(items)`` runs in an app context on the sender thread and
+        returns the messages to send. Each item is a collected dict plus
+        ``count`` (how many identical copies arrived), ``first_seen`` and
+        ``last_seen`` (timestamps).
+        """
+        self._digest_builder = func
+        return func
+
+    def collect(self, item):
+        """Add a JSON-serialisable dict to the next digest."""
+        payload = json.dumps(item, sort_keys=True)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        now = time.time()
+        db = self._db()
+        db.execute(
+            'INSERT INTO digest (hash, payload, first_seen, last_seen) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (hash) DO UPDATE SET count = count + 1, last_seen = excluded.last_seen',
+            (digest, payload, now, now),
+        )
+        self.ensure_started()
+        total = db.execute('SELECT COALESCE(SUM(count), 0) FROM digest').fetchone()[0]
+        if total >= self.app.config['MAIL_DIGEST_MAX_ITEMS']:
+            self._wakeup.set()
+
+    def flush_digest(self, force=False):
+        """Queue the digest if it is due (or ``force``); return the items sent."""
+        if self._digest_builder is None:
+            return 0
+        config = self.app.config
+        now = time.time()
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            oldest, total = db.execute('SELECT MIN(first_seen), COALESCE(SUM(count), 0) FROM digest').fetchone()
+            if oldest is None or not (force or now - oldest >= config['MAIL_DIGEST_INTERVAL']
+                                      or total >= config['MAIL_DIGEST_MAX_ITEMS']):
+                db.execute('COMMIT')
+                return 0
+            rows = db.execute('SELECT payload, count, first_seen, last_seen FROM digest ORDER BY id').fetchall()
+            items = [dict(json.loads(payload), count=count, first_seen=first_seen, last_seen=last_seen)
+                     for payload, count, first_seen, last_seen in rows]
+            with self.app.app_context():
+                messages = self._digest_builder(items)
+            db.execute('DELETE FROM digest')
+            self._insert(db, messages, now)
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return len(items)
+
+    def _claim(self, now):
+        """Lease the next due messages to this sender."""
+        config = self.app.config
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = db.execute(
+                "SELECT id, payload, attempts FROM outbox "
+                "WHERE status = 'queued' AND next_attempt <= ? AND claimed_until <= ? "
+                "ORDER BY id LIMIT ?",
+                (now, now, config['MAIL_QUEUE_BATCH_SIZE']),
+            ).fetchall()
+            if rows:
+                db.executemany(
+                    'UPDATE outbox SET claimed_until = ? WHERE id = ?',
+                    [(now + config['MAIL_QUEUE_LEASE'], row[0]) for row in rows],
+                )
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return rows
+
+    def _mark_sent(self, message_id):
+        self._db().execute('DELETE FROM outbox WHERE id = ?', (message_id,))
+
+    def _mark_failed(self, message_id, attempts, error):
+        config = self.app.config
+        attempts += 1
+        if attempts >= config['MAIL_QUEUE_MAX_ATTEMPTS']:
+            status, next_attempt = 'failed', time.time()
+        else:
+            delay = min(config['MAIL_QUEUE_RETRY_DELAY'] * 2 ** (attempts - 1),
+                        config['MAIL_QUEUE_MAX_RETRY_DELAY'])
+            status, next_attempt = 'queued', time.time() + delay
+        self._db().execute(
+            'UPDATE outbox SET status = ?, attempts = ?, next_attempt = ?, claimed_until = 0, '
+            'last_error = ? WHERE id = ?',
+            (status, attempts, next_attempt, str(error)[:500], message_id),
+        )
+
+    def stats(self):
+        """Return message counts per status."""
+        rows = self._db().execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        return dict(rows)
+
+    # -- delivery ----------------------------------------------------------
+
+    def _timer(self, operation):
+        """Time ``operation`` with the metrics extension, if installed."""
+        metrics = self.app.extensions.get('metrics')
+        return metrics.timer(operation) if metrics else contextlib.nullcontext()
+
+    def _smtp(self):
+        """Return the pooled SMTP connection, opening it if needed."""
+        if self._connection is not None:
+            idle = time.time() - self._connection_used
+            if idle > self.app.config['MAIL_QUEUE_IDLE_TIMEOUT'] or not self._alive(self._connection):
+                self._close_smtp()
+        if self._connection is None:
+            with self._timer('smtp.connect'):
+                self._connection = self.mail.connect().__enter__()
+        self._connection_used = time.time()
+        return self._connection
+
+    @staticmethod
+    def _alive(connection):
+        if connection.host is None:
+            return True
+        try:
+            return connection.host.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _close_smtp(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def process_once(self):
+        """Deliver every due message once; return the number sent."""
+        if self.digest_enabled:
+            try:
+                self.flush_digest()
+            except Exception as e:
+                print(f"Error building mail digest: {str(e)}")
+        now = time.time()
+        rows = self._claim(now)
+        if not rows:
+            if (self._connection is not None
+                    and now - self._connection_used > self.app.config['MAIL_QUEUE_IDLE_TIMEOUT']):
+                self._close_smtp()
+            return 0
+
+        sent = 0
+        with self.app.app_context():
+            for message_id, payload, attempts in rows:
+                try:
+                    message = self.message(**json.loads(payload))
+                    connection = self._smtp()
+                    with self._timer('smtp.send'):
+                        connection.send(message)
+                except Exception as e:
+                    print(f"Error sending queued email {message_id}: {str(e)}")
+                    self._close_smtp()
+                    self._mark_failed(message_id, attempts, e)
+                else:
+                    self._mark_sent(message_id)
+                    sent += 1
+        return sent
+
+    def _run(self):
+        poll = self.app.config['MAIL_QUEUE_POLL_INTERVAL']
+        while not self._stop.is_set():
+            try:
+                if self.process_once():
+                    continue
+            except Exception as e:
+                print(f"Mail queue error: {str(e)}")
+            self._wakeup.wait(poll)
+            self._wakeup.clear()
+        self._close_smtp()
+
+    def ensure_started(self):
+        """Start the sender thread in this process if it is not running.
+
+        Passenger forks workers after importing the app, and threads do
+        not survive a fork, so the check is keyed on the current pid.
+        """
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._connection = None
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='mail-queue', daemon=True)
+            self._thread.start()
+
+    def resume(self):
+        """Start the sender if the spool holds mail left by an earlier process.
+
+        Runs once per process (on its first request), not at import, so a
+        preforking server does not start the thread before it forks.
+        """
+        if self._resumed == os.getpid():
+            return
+        self._resumed = os.getpid()
+        if not os.path.exists(self.path):
+            return
+        try:
+            pending = self._db().execute(
+                "SELECT EXISTS (SELECT 1 FROM outbox WHERE status = 'queued') "
+                "OR EXISTS (SELECT 1 FROM digest)"
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Could not check the mail spool: {str(e)}")
+            return
+        if pending:
+            self.ensure_started()
+
+    def stop(self, timeout=5):
+        """Stop the sender thread and close the pooled connection."""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,234 @@
+"""
+Request timing and hot-path instrumentation.
+
+Records, per process and in memory:
+
+* ``himma_request_duration_seconds``   per endpoint/method/status
+* ``himma_template_render_seconds``    per template (Flask render signals)
+* ``himma_operation_seconds``          named hot-path sections timed with
+                                       ``metrics.timer('name')`` (input
+                                       sanitizing, email validation, SMTP,
+                                       rate-limit checks, ...)
+
+and exposes them as Prometheus text at ``/metrics``. The endpoint needs
+``Authorization: Bearer <METRICS_TOKEN>`` (or ``?token=``); without a
+configured token it answers 403, except in debug mode. Methods outside
+``METHODS`` are recorded as ``other``, so clients cannot create new series.
+
+Observing a value is a bisect plus a counter update under a lock, so the
+layer is meant to stay on in production. Setting
+``METRICS_PROFILE_THRESHOLD`` (seconds) turns on sampled profiling: a
+``METRICS_PROFILE_SAMPLE_RATE`` fraction of requests run under cProfile
+and those slower than the threshold are dumped to ``METRICS_PROFILE_DIR``
+(newest ``METRICS_PROFILE_KEEP`` files are kept; open them with
+``python -m pstats``).
+"""
+
+import bisect
+import contextlib
+import cProfile
+import functools
+import hmac
+import os
+import random
+import threading
+import time
+
+from flask import before_render_template, current_app, g, request, template_rendered
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labelled series."""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * len(self.buckets), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labelvalues, counts, total in series:
+            labels = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, labelvalues))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_le(bound)}"}} {cumulative}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{self.name}_sum{suffix} {total}')
+            lines.append(f'{self.name}_count{suffix} {cumulative}')
+        return lines
+
+
+class Metrics:
+    """In-process latency histograms, a /metrics endpoint and sampled profiling."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.histograms = []
+        self.requests = self.histogram(
+            'himma_request_duration_seconds', 'Time spent handling a request.',
+            ('endpoint', 'method', 'status'))
+        self.templates = self.histogram(
+            'himma_template_render_seconds', 'Time spent rendering a template.', ('template',))
+        self.operations = self.histogram(
+            'himma_operation_seconds', 'Time spent in an instrumented operation.', ('operation',))
+        self._profile_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.config.setdefault('METRICS_PROFILE_THRESHOLD', 0)
+        app.config.setdefault('METRICS_PROFILE_SAMPLE_RATE', 0.1)
+        app.config.setdefault('METRICS_PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        app.config.setdefault('METRICS_PROFILE_KEEP', 50)
+        self.app = app
+        app.extensions['metrics'] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+        app.add_url_rule('/metrics', 'metrics', self.serve)
+
+    def histogram(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        """Create and register an extra histogram."""
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    @contextlib.contextmanager
+    def timer(self, operation):
+        """Time a block (or, as a decorator, a function) as ``operation``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.app is None or self.app.config['METRICS_ENABLED']:
+                self.operations.observe(time.perf_counter() - start, operation)
+
+    def instrument_limiter(self, limiter):
+        """Time Flask-Limiter's storage round trips as ``ratelimit.<method>``."""
+        strategy = limiter.limiter
+        for method in ('hit', 'test'):
+            original = getattr(strategy, method)
+            timed = functools.wraps(original)(self.timer('ratelimit.' + method)(original))
+            setattr(strategy, method, timed)
+
+    # -- request hooks -----------------------------------------------------
+
+    def _before_request(self):
+        if not current_app.config['METRICS_ENABLED']:
+            return
+        g._metrics_start = time.perf_counter()
+        threshold = current_app.config['METRICS_PROFILE_THRESHOLD']
+        if threshold and random.random() < current_app.config['METRICS_PROFILE_SAMPLE_RATE']:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # another profiler is active on this thread
+                return
+            g._metrics_profiler = profiler
+
+    def _finish(self, status):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'none'
+        method = request.method if request.method in METHODS else 'other'
+        self.requests.observe(elapsed, endpoint, method, status)
+        profiler = g.pop('_metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed >= current_app.config['METRICS_PROFILE_THRESHOLD']:
+                self._dump_profile(profiler, endpoint, elapsed)
+
+    def _after_request(self, response):
+        self._finish(str(response.status_code))
+        return response
+
+    def _teardown_request(self, exc):
+        # Only reached with a pending start when the request raised
+        self._finish('500')
+
+    def _template_started(self, sender, template, context, **extra):
+        if current_app.config['METRICS_ENABLED']:
+            g.setdefault('_metrics_templates', []).append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+        stack = g.get('_metrics_templates')
+        if stack:
+            self.templates.observe(time.perf_counter() - stack.pop(), template.name or 'string')
+
+    def _dump_profile(self, profiler, endpoint, elapsed):
+        folder = current_app.config['METRICS_PROFILE_DIR']
+        keep = current_app.config['METRICS_PROFILE_KEEP']
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{endpoint}-{elapsed * 1000:.0f}ms-{os.getpid()}.prof'
+        with self._profile_lock:
+            try:
+                os.makedirs(folder, exist_ok=True)
+                profiler.dump_stats(os.path.join(folder, name))
+                dumps = sorted((os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.prof')),
+                               key=os.path.getmtime)
+                for old in dumps[:-keep] if keep else []:
+                    os.remove(old)
+            except OSError as e:
+                print(f"Could not write profile {name}: {str(e)}")
+
+    # -- exposition ----------------------------------------------------------
+
+    def _authorized(self):
+        token = current_app.config['METRICS_TOKEN']
+        if not token:
+            return current_app.debug
+        header = request.headers.get('Authorization', '')
+        supplied = header[7:] if header.startswith('Bearer ') else request.args.get('token', '')
+        return hmac.compare_digest(supplied.encode(), token.encode())
+
+    def expose(self):
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.expose())
+        return '\n'.join(lines) + '\n'
+
+    def serve(self):
+        """View for /metrics (Prometheus text exposition format)."""
+        if not self._authorized():
+            return current_app.response_class('Forbidden\n', status=403, mimetype='text/plain')
+        response = current_app.response_class(self.expose())
+        response.headers['Content-Type'] = CONTENT_TYPE
+        response.headers['Cache-Control'] = 'no-store'
+        return response
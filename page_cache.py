@@ -0,0 +1,147 @@
+"""
+In-process cache of rendered pages.
+
+Cached views are rendered once per (endpoint, host, relevant query args)
+and served from memory afterwards with a strong ETag, so repeat visitors
+and crawlers revalidating with If-None-Match get a bodiless 304.
+
+Entries are tagged with a version built from the template files' mtimes
+plus any registered watchers (e.g. the site content), and are rebuilt
+as soon as that version changes.
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+class _Entry:
+    __slots__ = ('version', 'body', 'etag', 'mimetype')
+
+    def __init__(self, version, body, etag, mimetype):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+
+
+class PageCache:
+    """Bounded LRU of rendered responses keyed on route and query args."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._watchers = []
+        self._version = None
+        self._checked = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 256)
+        app.config.setdefault('PAGE_CACHE_CHECK_INTERVAL', 2.0)
+        self.app = app
+        app.extensions['page_cache'] = self
+
+    def watch(self, func):
+        """Register a callable whose return value is part of the cache version.
+
+        Can be used as a decorator. The callable runs at most once per
+        check interval and should return something cheap to stringify.
+        """
+        self._watchers.append(func)
+        self._checked = 0.0
+        return func
+
+    def _template_stamp(self):
+        stamp = []
+        folder = os.path.join(self.app.root_path, self.app.template_folder)
+        for dirpath, _, filenames in os.walk(folder):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stamp.append((path, os.stat(path).st_mtime_ns))
+                except OSError:
+                    continue
+        stamp.sort()
+        return stamp
+
+    def version(self):
+        """Return the current cache version, re-checking inputs when due."""
+        interval = 0 if self.app.debug else self.app.config['PAGE_CACHE_CHECK_INTERVAL']
+        now = time.monotonic()
+        if self._version is not None and now - self._checked < interval:
+            return self._version
+        digest = hashlib.sha256(repr(self._template_stamp()).encode())
+        for watcher in self._watchers:
+            digest.update(repr(watcher()).encode())
+        version = digest.hexdigest()[:16]
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+            self._version = version
+            self._checked = now
+        return version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def _get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, entry):
+        limit = self.app.config['PAGE_CACHE_MAX_ENTRIES']
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+
+    def cached(self, *query_args):
+        """Cache a GET view whose output depends only on ``query_args``.
+
+        Any other query parameters (tracking tags and the like) are
+        ignored, so they share the same cache entry.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**kwargs):
+                if not current_app.config['PAGE_CACHE_ENABLED']:
+                    return view(**kwargs)
+
+                key = (
+                    request.endpoint,
+                    request.host_url,
+                    tuple(sorted(kwargs.items())),
+                    tuple(request.args.get(name) for name in query_args),
+                )
+                version = self.version()
+                entry = self._get(key, version)
+                if entry is None:
+                    response = current_app.make_response(view(**kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    body = response.get_data()
+                    entry = _Entry(version, body, hashlib.sha256(body).hexdigest()[:32], response.mimetype)
+                    self._put(key, entry)
+
+                response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+                response.set_etag(entry.etag)
+                response.headers['Cache-Control'] = 'public, no-cache'
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
@@ -22,3 +22,8 @@ os.environ.setdefault('MAIL_USE_SSL', 'False')
 # os.environ.setdefault('MAIL_USERNAME', 'you@example.com')
 # os.environ.setdefault('MAIL_PASSWORD', 'app-password')
 # os.environ.setdefault('MAIL_DEFAULT_SENDER', 'info@yourdomain.com')
+
+# Compile templates and load manifests before this worker takes traffic;
+# the optional mail/validation modules are imported on a background thread
+if os.getenv('WARMUP', 'True') == 'True':
+    application.extensions['warmup'].run()
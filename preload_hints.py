@@ -0,0 +1,175 @@
+"""
+``Link: rel=preload`` headers (and 103 Early Hints) for each page's critical assets.
+
+The browser only discovers a page's stylesheets, fonts, scripts and hero
+images once it parses the HTML. The first time a route renders (and again
+whenever ``page_cache.version()`` -- templates, asset manifest, content --
+changes), its HTML is scanned for:
+
+* ``<link rel="preload">`` and ``<link rel="preconnect">`` tags (fonts,
+  async stylesheets, the slider images, third-party origins),
+* local stylesheets that block rendering and local classic scripts,
+* plain ``<img>`` tags in the site ``<header>`` (the logo) and any image
+  marked ``fetchpriority="high"``.
+
+The result is cached per endpoint and sent as a ``Link`` header on the
+route's HTML responses, at most ``PRELOAD_HINTS_MAX`` entries in document
+order. From then on, when the WSGI server offers an Early Hints callable
+in the environ (``PRELOAD_EARLY_HINTS_KEY``, ``wsgi.early_hints`` by
+default, called with a list of headers), the same header goes out as a
+``103 Early Hints`` response before the view runs (``serve.py
+--early-hints`` provides one); revalidations (``If-None-Match``) are
+skipped, as they usually end in a 304. CDNs such
+as Cloudflare also turn ``Link`` preload headers into Early Hints
+themselves.
+
+Register after Compression so the HTML is scanned before it is compressed.
+"""
+
+import threading
+from html.parser import HTMLParser
+
+from flask import request
+
+# Attributes copied from a <link rel=preload> into the Link header
+PRELOAD_PARAMS = ('as', 'type', 'crossorigin', 'media', 'fetchpriority', 'imagesrcset', 'imagesizes')
+
+
+class _AssetParser(HTMLParser):
+    """Collects (href, params) pairs for the Link header, in document order."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self._seen = set()
+        self._header = 0
+        self._picture = 0
+        self._noscript = 0
+
+    def add(self, href, params):
+        # Third-party assets are only preconnected
+        local = href.startswith('/') and not href.startswith('//')
+        if href and href not in self._seen and (local or params.get('rel') == 'preconnect'):
+            self._seen.add(href)
+            self.links.append((href, params))
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: ('' if value is None else value) for name, value in attrs}
+        if tag == 'noscript':
+            self._noscript += 1
+        elif tag == 'header':
+            self._header += 1
+        elif tag == 'picture':
+            self._picture += 1
+        if self._noscript:
+            return
+        rel = attrs.get('rel', '').lower()
+        if tag == 'link' and rel == 'preload' and attrs.get('as'):
+            params = {name: attrs[name] for name in PRELOAD_PARAMS if name in attrs}
+            self.add(attrs.get('href', ''), dict({'rel': 'preload'}, **params))
+        elif tag == 'link' and rel == 'preconnect':
+            params = {'rel': 'preconnect'}
+            if 'crossorigin' in attrs:
+                params['crossorigin'] = attrs['crossorigin']
+            self.add(attrs.get('href', ''), params)
+        elif tag == 'link' and rel == 'stylesheet' and attrs.get('media', 'all') != 'print':
+            self.add(attrs.get('href', ''), {'rel': 'preload', 'as': 'style'})
+        elif tag == 'script' and attrs.get('src') and attrs.get('type', 'text/javascript') == 'text/javascript':
+            self.add(attrs['src'], {'rel': 'preload', 'as': 'script'})
+        elif tag == 'img' and attrs.get('src') and not self._picture and not attrs.get('src').startswith('data:'):
+            # Inside <picture> the browser may pick another source than src
+            if self._header or attrs.get('fetchpriority') == 'high':
+                self.add(attrs['src'], {'rel': 'preload', 'as': 'image'})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in ('picture', 'header', 'noscript'):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag == 'noscript':
+            self._noscript = max(0, self._noscript - 1)
+        elif tag == 'header':
+            self._header = max(0, self._header - 1)
+        elif tag == 'picture':
+            self._picture = max(0, self._picture - 1)
+
+
+def _param(name, value):
+    if value == '':
+        return name
+    if all(c.isalnum() or c in '-/_.+' for c in value):
+        return f'{name}={value}'
+    return '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def link_header(links):
+    """Format [(href, params)] as a Link header value."""
+    return ', '.join(
+        '; '.join([f'<{href}>'] + [_param(name, value) for name, value in params.items()])
+        for href, params in links
+    )
+
+
+class PreloadHints:
+    """Per-endpoint cache of Link headers derived from the rendered page."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._headers = {}  # endpoint -> (version, Link header value or '')
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PRELOAD_HINTS_ENABLED', True)
+        app.config.setdefault('PRELOAD_HINTS_MAX', 12)
+        app.config.setdefault('PRELOAD_EARLY_HINTS_KEY', 'wsgi.early_hints')
+        self.app = app
+        app.extensions['preload_hints'] = self
+        app.before_request(self._early_hints)
+        app.after_request(self._after_request)
+
+    def version(self):
+        page_cache = self.app.extensions.get('page_cache')
+        return page_cache.version() if page_cache is not None else None
+
+    def scan(self, html):
+        """Link header value for a rendered page ('' if it needs nothing)."""
+        parser = _AssetParser()
+        parser.feed(html)
+        parser.close()
+        return link_header(parser.links[:self.app.config['PRELOAD_HINTS_MAX']])
+
+    def header(self, endpoint):
+        """The cached Link header for ``endpoint`` if it is current, else None."""
+        cached = self._headers.get(endpoint)
+        if cached is None or cached[0] != self.version():
+            return None
+        return cached[1]
+
+    def _early_hints(self):
+        if (not self.app.config['PRELOAD_HINTS_ENABLED'] or request.method != 'GET'
+                or request.if_none_match):
+            return
+        send = request.environ.get(self.app.config['PRELOAD_EARLY_HINTS_KEY'])
+        if send is None:
+            return
+        value = self.header(request.endpoint)
+        if value:
+            send([('Link', value)])
+
+    def _after_request(self, response):
+        if (not self.app.config['PRELOAD_HINTS_ENABLED'] or request.method != 'GET'
+                or response.status_code != 200 or response.mimetype != 'text/html'
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+        value = self.header(request.endpoint)
+        if value is None:
+            version = self.version()
+            value = self.scan(response.get_data(as_text=True))
+            with self._lock:
+                self._headers[request.endpoint] = (version, value)
+        if value:
+            response.headers['Link'] = value
+        return response
@@ -0,0 +1,118 @@
+"""
+SQLite-backed storage for Flask-Limiter shared by every worker process.
+
+Registering this module adds a ``sqlite`` storage scheme to the limits
+library. Counters live in one WAL-mode database file, so all Passenger
+workers on the host see the same counts and they survive respawns
+without an external service such as Redis or memcached.
+
+    storage_uri="sqlite:////home/user/himma/instance/ratelimit.sqlite3"
+
+Four slashes give an absolute path, three a path relative to the
+working directory (the same convention as SQLAlchemy).
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expiry REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS counters_expiry ON counters (expiry);
+"""
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a shared SQLite database."""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri=None, wrap_exceptions=False, compact_interval=60, **options):
+        self.path = (uri or 'sqlite:///ratelimit.sqlite3')[len('sqlite:///'):]
+        self.compact_interval = float(compact_interval)
+        self._local = threading.local()
+        self._compacted = time.time()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._db()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _db(self):
+        """Return this thread's connection, reopening it after a fork."""
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(SCHEMA)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        """Increment the counter for ``key`` and return the new value.
+
+        A counter whose window has passed starts over from ``amount``.
+        """
+        now = time.time()
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT count, expiry FROM counters WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                count = amount
+                db.execute('INSERT OR REPLACE INTO counters (key, count, expiry) VALUES (?, ?, ?)',
+                           (key, count, now + expiry))
+            else:
+                count = row[0] + amount
+                new_expiry = now + expiry if elastic_expiry else row[1]
+                db.execute('UPDATE counters SET count = ?, expiry = ? WHERE key = ?',
+                           (count, new_expiry, key))
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        if now - self._compacted > self.compact_interval:
+            self.compact()
+        return count
+
+    def get(self, key):
+        row = self._db().execute(
+            'SELECT count FROM counters WHERE key = ? AND expiry > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._db().execute('SELECT expiry FROM counters WHERE key = ?', (key,)).fetchone()
+        return row[0] if row and row[0] > time.time() else time.time()
+
+    def check(self):
+        try:
+            self._db().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._db().execute('DELETE FROM counters').rowcount
+
+    def clear(self, key):
+        self._db().execute('DELETE FROM counters WHERE key = ?', (key,))
+
+    def compact(self):
+        """Evict expired counters and checkpoint the WAL; return rows removed."""
+        self._compacted = time.time()
+        db = self._db()
+        removed = db.execute('DELETE FROM counters WHERE expiry <= ?', (self._compacted,)).rowcount
+        db.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        return removed
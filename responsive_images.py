@@ -0,0 +1,128 @@
+"""
+Template helper for responsive images.
+
+``picture('img/oven.jpg', 'Ovens', sizes='50vw', class='card-top-image')``
+renders a <picture> element with one <source> per format (AVIF, WebP)
+listing every width generated by tools/build_responsive_images.py, and
+the original file as the <img> fallback. Images without generated
+variants render as a plain <img>, so templates work before the build
+step has run. With image_index.py loaded, the <img> also gets the size
+and placeholder recorded by tools/build_image_index.py. Pass ``record=``
+to render from a record that is not in the index (e.g. a machines gallery
+manifest entry).
+"""
+
+import json
+import os
+import threading
+
+from flask import url_for
+from markupsafe import Markup, escape
+
+
+def render_attrs(attrs):
+    """Render an attribute dict; True gives a bare attribute, None/False is skipped."""
+    parts = []
+    for name, value in attrs.items():
+        if value is None or value is False:
+            continue
+        parts.append(name if value is True else f'{name}="{escape(value)}"')
+    return ' '.join(parts)
+
+
+class ResponsiveImages:
+    """Loads the variant index and exposes ``picture()`` to templates."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._index = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            'RESPONSIVE_IMAGES_INDEX',
+            os.path.join(app.static_folder, 'img', 'responsive', 'index.json'),
+        )
+        self.app = app
+        app.extensions['responsive_images'] = self
+        app.jinja_env.globals['picture'] = self.picture
+        app.jinja_env.globals['preload_image'] = self.preload
+
+    def version(self):
+        """Modification time of the index (None if it does not exist)."""
+        try:
+            return os.stat(self.app.config['RESPONSIVE_IMAGES_INDEX']).st_mtime_ns
+        except OSError:
+            return None
+
+    def index(self):
+        """Return the parsed index, re-reading it only when the file changes."""
+        mtime = self.version()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        with open(self.app.config['RESPONSIVE_IMAGES_INDEX'], encoding='utf-8') as f:
+                            self._index = json.load(f)
+                    except (OSError, ValueError):
+                        self._index = {}
+                    self._mtime = mtime
+        return self._index
+
+    @staticmethod
+    def _by_type(variants):
+        by_type = {}
+        for variant in variants:
+            by_type.setdefault(variant['type'], []).append(variant)
+        return by_type
+
+    def _srcset(self, variants):
+        return ', '.join(f"{url_for('static', filename=v['file'])} {v['width']}w" for v in variants)
+
+    def preload(self, filename, sizes='100vw', record=None, **attrs):
+        """Render a <link rel="preload"> matching ``picture()``'s first source.
+
+        Only the preferred format is preloaded (with its ``type``, so
+        browsers that cannot decode it skip the hint instead of fetching
+        two formats).
+        """
+        if record is None:
+            record = self.index().get(filename)
+        link = {'rel': 'preload', 'as': 'image'}
+        if record and record.get('variants'):
+            mime, variants = next(iter(self._by_type(record['variants']).items()))
+            link.update({'imagesrcset': self._srcset(variants), 'imagesizes': sizes, 'type': mime})
+        else:
+            link['href'] = url_for('static', filename=filename)
+        link.update(attrs)
+        return Markup(f'<link {render_attrs(link)} />')
+
+    def picture(self, filename, alt='', sizes='100vw', record=None, **attrs):
+        """Render <picture>/<img> markup for a file under static/."""
+        if record is None:
+            record = self.index().get(filename)
+        img = {'src': url_for('static', filename=filename), 'alt': alt}
+        image_index = self.app.extensions.get('image_index')
+        if image_index is not None:
+            # Size and loading placeholder from tools/build_image_index.py
+            img.update(image_index.attributes(filename, record, style=attrs.pop('style', None)))
+        elif record and record.get('width') and record.get('height'):
+            img['width'], img['height'] = record['width'], record['height']
+        img.update(attrs)
+        tag = Markup(f'<img {render_attrs(img)} />')
+        if not record or not record.get('variants'):
+            return tag
+
+        by_type = self._by_type(record['variants'])
+        sources = [
+            Markup('<source {}>').format(Markup(render_attrs({
+                'type': mime,
+                'srcset': self._srcset(variants),
+                'sizes': sizes,
+            })))
+            for mime, variants in by_type.items()
+        ]
+        return Markup('<picture>') + Markup('').join(sources) + tag + Markup('</picture>')
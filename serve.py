@@ -0,0 +1,367 @@
+"""
+Prefork server for self-hosted deployments (passenger_wsgi.py is for Passenger).
+
+Usage:
+  python serve.py [--bind 0.0.0.0:8000] [--workers 4] [--threads 8]
+                  [--max-requests 5000] [--max-requests-jitter 500]
+
+The master process binds the listening socket, imports app.py and runs
+``warmup.run()`` -- templates, URL map, manifests, site content, the
+static store (enabled here unless ``STATIC_STORE_ENABLED`` says otherwise)
+and the optional imports -- then freezes the garbage
+collector and forks the workers. Everything loaded up to that point is
+shared copy-on-write instead of being loaded once per worker.
+
+Each worker serves the shared socket with a pool of ``--threads`` threads
+and only accepts a connection when a thread is free, so busy workers leave
+new connections in the backlog for idle ones. After ``--max-requests``
+requests (plus a random share of ``--max-requests-jitter``, so workers do
+not all restart together) a worker stops accepting, finishes its in-flight
+requests (for at most ``--graceful-timeout`` seconds) and exits; the
+master forks a fresh one from the warm image. A connection that sends or
+reads nothing for ``--timeout`` seconds is closed, so idle clients cannot
+hold on to the threads.
+
+``GET /readyz`` (``--ready-path``) is answered by the worker itself with
+200 while it accepts traffic and 503 once it is draining. ``--early-hints``
+gives the app a ``wsgi.early_hints`` callable that writes ``103 Early
+Hints`` to HTTP/1.1 clients (see preload_hints.py); leave it off behind
+proxies that do not forward 1xx responses.
+
+Signals to the master: TERM/INT drain the workers and stop (workers that
+take longer than ``--graceful-timeout`` are killed), HUP replaces all
+workers gracefully. Code changes need a restart of the master. Every
+option also reads a ``SERVE_*`` environment variable (``SERVE_WORKERS``,
+``SERVE_THREADS``, ...). Linux/Unix only (uses fork).
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# A worker that dies sooner than this after being forked is not restarted
+# straight away, so a broken deploy does not fork in a tight loop
+MIN_WORKER_LIFETIME = 1.0
+
+
+class _Handler(WSGIRequestHandler):
+    """Request handler with optional access log and Early Hints."""
+
+    def log_request(self, code='-', size='-'):
+        if self.server.access_log:
+            super().log_request(code, size)
+
+    def make_environ(self):
+        environ = super().make_environ()
+        # 1xx responses are only defined for HTTP/1.1 clients
+        if self.server.early_hints_key and self.request_version == 'HTTP/1.1':
+            environ[self.server.early_hints_key] = self.send_early_hints
+        return environ
+
+    def send_early_hints(self, headers):
+        lines = [f'{self.protocol_version} 103 Early Hints\r\n']
+        lines += [f'{name}: {value}\r\n' for name, value in headers]
+        self.wfile.write((''.join(lines) + '\r\n').encode('latin-1'))
+
+
+class _WorkerServer(BaseWSGIServer):
+    """WSGI server on an inherited socket with a fixed pool of threads."""
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, fd, threads, master_pid,
+                 access_log=False, early_hints_key=None, timeout=30.0):
+        super().__init__(host, port, app, _Handler, fd=fd)
+        self.threads = threads
+        self.timeout = timeout
+        self.access_log = access_log
+        self.early_hints_key = early_hints_key
+        self.master_pid = master_pid
+        self.on_orphaned = None
+        self._slots = threading.BoundedSemaphore(threads)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='serve')
+
+    def get_request(self):
+        # Accept only with a free thread; otherwise another worker may take it
+        if not self._slots.acquire(timeout=0.05):
+            raise BlockingIOError('all threads busy')
+        try:
+            return super().get_request()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            # An idle or slow client must not hold a thread (or a drain) forever
+            request.settimeout(self.timeout)
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def service_actions(self):
+        if os.getppid() != self.master_pid and self.on_orphaned is not None:
+            self.on_orphaned()
+
+    def close(self, timeout):
+        """Close the socket and wait up to ``timeout`` seconds for in-flight requests.
+
+        Returns False if some were still running; they end with the process.
+        """
+        self.server_close()
+        self._pool.shutdown(wait=False)
+        deadline = time.monotonic() + timeout
+        # Every slot is free again once every request has finished
+        for _ in range(self.threads):
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                return False
+        return True
+
+
+class Worker:
+    """One forked process: serves until it is recycled or told to stop."""
+
+    def __init__(self, app, sock, options, master_pid):
+        self.app = app
+        self.options = options
+        self.max_requests = 0
+        if options.max_requests > 0:
+            self.max_requests = options.max_requests + random.randint(0, max(0, options.max_requests_jitter))
+        self.requests = 0
+        self.draining = False
+        self._lock = threading.Lock()
+        host, port = sock.getsockname()[:2]
+        early_hints_key = app.config.get('PRELOAD_EARLY_HINTS_KEY') if options.early_hints else None
+        self.server = _WorkerServer(
+            host, port, self, sock.fileno(), options.threads, master_pid,
+            access_log=options.access_log, early_hints_key=early_hints_key, timeout=options.timeout,
+        )
+        self.server.on_orphaned = lambda: self.drain('master exited')
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == self.options.ready_path:
+            return self.ready(start_response)
+        with self._lock:
+            self.requests += 1
+            recycle = self.max_requests and self.requests >= self.max_requests
+        if recycle:
+            self.drain(f'served {self.requests} requests')
+        return self.app(environ, start_response)
+
+    def ready(self, start_response):
+        status = '503 Service Unavailable' if self.draining else '200 OK'
+        body = json.dumps({
+            'status': 'draining' if self.draining else 'ready',
+            'pid': os.getpid(),
+            'requests': self.requests,
+            'max_requests': self.max_requests,
+        }).encode('utf-8')
+        start_response(status, [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Cache-Control', 'no-store'),
+        ])
+        return [body]
+
+    def drain(self, reason):
+        """Stop accepting; serve_forever returns and in-flight requests finish."""
+        with self._lock:
+            if self.draining:
+                return
+            self.draining = True
+        print(f"Worker {os.getpid()} draining: {reason}")
+        # shutdown() waits for serve_forever, so it cannot run on the serving thread
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self.drain('stop requested'))
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        if not self.options.preload:
+            self.app.extensions['warmup'].run()
+        try:
+            self.server.serve_forever(poll_interval=0.5)
+        finally:
+            if not self.server.close(self.options.graceful_timeout):
+                print(f"Worker {os.getpid()} exiting with requests still running "
+                      f"after {self.options.graceful_timeout:g}s")
+
+
+class Master:
+    """Binds the socket, warms the app once and keeps the workers running."""
+
+    def __init__(self, app, options):
+        self.app = app
+        self.options = options
+        self.sock = None
+        self.workers = {}     # pid -> fork time (monotonic)
+        self.retiring = set()  # pids sent SIGTERM by a reload
+        self.stopping = False
+        self.reloading = False
+        self.spawn_after = 0.0
+
+    def bind(self):
+        host, _, port = self.options.bind.rpartition(':')
+        host = host.strip('[]') or '0.0.0.0'
+        family = socket.AF_INET6 if ':' in host else socket.AF_INET
+        self.sock = socket.create_server((host, int(port)), family=family, backlog=self.options.backlog)
+        # Every worker polls the same socket; only one wins each accept
+        self.sock.setblocking(False)
+        return self.sock.getsockname()[:2]
+
+    def preload(self):
+        if self.options.preload:
+            # Loaded once here, the static store is shared by every worker
+            if not os.getenv('STATIC_STORE_ENABLED'):
+                self.app.config['STATIC_STORE_ENABLED'] = True
+            timings = self.app.extensions['warmup'].run(background_imports=False)
+            print(f"Warm-up in master: {sum(timings.values()) * 1000:.0f} ms")
+        # Keep the collector from touching (and so copying) the preloaded objects
+        gc.freeze()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+        code = 0
+        try:
+            Worker(self.app, self.sock, self.options, os.getppid()).run()
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def signal_workers(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if not pid:
+                return
+            started = self.workers.pop(pid, None)
+            self.retiring.discard(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if started is None:
+                continue
+            if code != 0:
+                print(f"Worker {pid} exited with status {code}")
+                if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                    self.spawn_after = time.monotonic() + MIN_WORKER_LIFETIME
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_reload(self, signum, frame):
+        self.reloading = True
+
+    def run(self):
+        host, port = self.bind()
+        self.preload()
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        print(f"Serving on http://{host}:{port} with {self.options.workers} workers "
+              f"x {self.options.threads} threads (master {os.getpid()})")
+        try:
+            while not self.stopping:
+                self.reap()
+                if self.reloading:
+                    self.reloading = False
+                    old = set(self.workers) - self.retiring
+                    for _ in old:
+                        self.spawn()
+                    self.retiring |= old
+                    self.signal_workers(old, signal.SIGTERM)
+                while (not self.stopping and time.monotonic() >= self.spawn_after
+                       and len(self.workers) - len(self.retiring) < self.options.workers):
+                    self.spawn()
+                time.sleep(0.1)
+        finally:
+            self.stop()
+
+    def stop(self):
+        print(f"Stopping {len(self.workers)} workers")
+        self.signal_workers(list(self.workers), signal.SIGTERM)
+        deadline = time.monotonic() + self.options.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        if self.workers:
+            print(f"Killing {len(self.workers)} workers after {self.options.graceful_timeout:g}s")
+            self.signal_workers(list(self.workers), signal.SIGKILL)
+            for pid in list(self.workers):
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+            self.workers.clear()
+        self.sock.close()
+
+
+def parse_args(argv=None):
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=env('SERVE_BIND', '0.0.0.0:8000'), help='host:port')
+    parser.add_argument('--workers', type=int, default=int(env('SERVE_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=int(env('SERVE_THREADS', 8)))
+    parser.add_argument('--max-requests', type=int, default=int(env('SERVE_MAX_REQUESTS', 5000)),
+                        help='recycle a worker after this many requests (0: never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=int(env('SERVE_MAX_REQUESTS_JITTER', 500)))
+    parser.add_argument('--timeout', type=float, default=float(env('SERVE_TIMEOUT', 30)),
+                        help='seconds a connection may stay idle while reading or writing')
+    parser.add_argument('--graceful-timeout', type=float, default=float(env('SERVE_GRACEFUL_TIMEOUT', 30)))
+    parser.add_argument('--backlog', type=int, default=int(env('SERVE_BACKLOG', 2048)))
+    parser.add_argument('--ready-path', default=env('SERVE_READY_PATH', '/readyz'))
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        default=env('SERVE_PRELOAD', 'True') == 'True',
+                        help='warm up in each worker instead of once in the master')
+    parser.add_argument('--early-hints', action='store_true', default=env('SERVE_EARLY_HINTS', 'False') == 'True')
+    parser.add_argument('--access-log', action='store_true', default=env('SERVE_ACCESS_LOG', 'False') == 'True')
+    return parser.parse_args(argv)
+
+
+def serve(app, options):
+    """Run ``app`` under the prefork master until it is told to stop."""
+    Master(app, options).run()
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    from app import app
+    serve(app, options)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Site content (name, contact details, embedded app links) from one file.
+
+content/site.json is the only copy of the content; editing it takes effect
+without a deploy. The file is parsed once and re-read only when its mtime
+changes (checked at most every ``SITE_CONTENT_CHECK_INTERVAL`` seconds).
+Each load produces a snapshot shared by everything that needs the content:
+
+* ``site_content.data()`` -- the parsed dict (treat it as read-only);
+* ``site_content.context()`` -- ``{'site', 'links'}`` for templates;
+* ``site_content.response()`` -- /api/config: the JSON serialized once per
+  load, with a strong ETag (If-None-Match gets a 304) and
+  ``Cache-Control: public, max-age=SITE_CONTENT_MAX_AGE``.
+
+A file that no longer parses is reported and the previous snapshot kept.
+``site_content.version`` is suitable for ``page_cache.watch``.
+tools/build_content.py writes content/data.js, the same content for the
+plain HTML pages.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import current_app, request
+
+EMPTY = {'site': {}, 'links': {}}
+
+
+class _Snapshot:
+    __slots__ = ('data', 'context', 'body', 'etag')
+
+    def __init__(self, data):
+        self.data = data
+        self.context = {'site': data.get('site', {}), 'links': data.get('links', {})}
+        self.body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+class SiteContent:
+    """mtime-keyed cache of content/site.json and its serialized forms."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._snapshot = _Snapshot(EMPTY)
+        self._mtime = False  # never loaded
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SITE_CONTENT', os.path.join(app.root_path, 'content', 'site.json'))
+        app.config.setdefault('SITE_CONTENT_CHECK_INTERVAL', 2.0)
+        app.config.setdefault('SITE_CONTENT_MAX_AGE', 60)
+        self.app = app
+        app.extensions['site_content'] = self
+
+    def version(self):
+        """Modification time of the content file (None if it does not exist)."""
+        try:
+            return os.stat(self.app.config['SITE_CONTENT']).st_mtime_ns
+        except OSError:
+            return None
+
+    def snapshot(self):
+        """Return the current snapshot, reloading the file when it changes."""
+        now = time.monotonic()
+        if now - self._checked < self.app.config['SITE_CONTENT_CHECK_INTERVAL']:
+            return self._snapshot
+        self._checked = now
+        mtime = self.version()
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._load()
+                    self._mtime = mtime
+        return self._snapshot
+
+    def _load(self):
+        path = self.app.config['SITE_CONTENT']
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError('expected a JSON object')
+        except (OSError, ValueError) as e:
+            print(f'Site content not loaded from {path}: {e}')
+            return
+        self._snapshot = _Snapshot(dict(EMPTY, **data))
+
+    def data(self):
+        return self.snapshot().data
+
+    def context(self):
+        return self.snapshot().context
+
+    def response(self):
+        """The content as JSON, conditional on If-None-Match."""
+        snapshot = self.snapshot()
+        response = current_app.response_class(snapshot.body, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        response.headers['Cache-Control'] = f"public, max-age={self.app.config['SITE_CONTENT_MAX_AGE']}"
+        return response.make_conditional(request)
@@ -0,0 +1,253 @@
+"""
+XML sitemap generated from the URL map.
+
+Every parameterless GET route (minus static files, the sitemap itself and
+``SITEMAP_EXCLUDE_PREFIXES`` such as ``/api/``) is listed. ``@sitemap.page``
+attaches a priority/changefreq and the template or files a page is built
+from; ``lastmod`` is the newest mtime among them, following
+``{% extends %}``/``{% include %}`` so a base.html edit bumps every page.
+``@sitemap.source`` registers callables yielding extra entries (content
+such as the machines gallery); entries sharing a ``loc`` are merged.
+
+The XML is rendered as a list of chunks, kept in memory per host with an
+ETag and Last-Modified, and re-rendered only when the entries change
+(checked at most every ``SITEMAP_CHECK_INTERVAL`` seconds). Only the
+``SITEMAP_MAX_HOSTS`` most recently used hosts are kept, so arbitrary
+Host headers cannot grow the cache. Above
+``SITEMAP_MAX_URLS`` URLs, /sitemap.xml becomes a sitemap index pointing
+at /sitemap-1.xml, /sitemap-2.xml, ...
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from flask import abort, current_app, request, url_for
+from jinja2 import meta
+
+URLSET_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    ' xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">\n'
+)
+INDEX_OPEN = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def w3c_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+class _Rendered:
+    __slots__ = ('version', 'documents')
+
+    def __init__(self, version, documents):
+        self.version = version
+        self.documents = documents  # [index or None, page 1, page 2, ...] as (chunks, etag, lastmod)
+
+
+class Sitemap:
+    """Builds, caches and serves /sitemap.xml."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pages = {}
+        self._sources = []
+        self._references = {}
+        self._rendered = OrderedDict()  # host -> (_Rendered, checked), least recent first
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SITEMAP_MAX_URLS', 50000)
+        app.config.setdefault('SITEMAP_EXCLUDE_PREFIXES', ('/api/',))
+        app.config.setdefault('SITEMAP_CHECK_INTERVAL', 2.0)
+        app.config.setdefault('SITEMAP_MAX_HOSTS', 4)
+        self.app = app
+        app.extensions['sitemap'] = self
+        app.add_url_rule('/sitemap.xml', 'sitemap', self.serve)
+        app.add_url_rule('/sitemap-<int:page>.xml', 'sitemap_page', self.serve)
+
+    def page(self, priority=None, changefreq=None, template=None, files=()):
+        """Decorator: sitemap metadata for a view.
+
+        ``template`` (plus everything it extends or includes) and ``files``
+        (paths relative to the app root) determine the page's lastmod.
+        """
+        def decorator(view):
+            self._pages[view.__name__] = {
+                'priority': priority,
+                'changefreq': changefreq,
+                'template': template,
+                'files': tuple(files),
+            }
+            return view
+        return decorator
+
+    def source(self, func):
+        """Register a callable yielding extra entries (dicts with ``loc``,
+        and optionally ``lastmod`` timestamp, ``priority``, ``changefreq``
+        and ``images`` URLs). Can be used as a decorator."""
+        self._sources.append(func)
+        self._rendered.clear()
+        return func
+
+    # Entries ----------------------------------------------------------
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _template_files(self, name, seen=None):
+        """Paths of ``name`` and every template it references."""
+        seen = set() if seen is None else seen
+        if name in seen:
+            return []
+        seen.add(name)
+        env = self.app.jinja_env
+        try:
+            source, path, _ = env.loader.get_source(env, name)
+        except Exception:
+            return []
+        mtime = self._mtime(path)
+        cached = self._references.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, [ref for ref in meta.find_referenced_templates(env.parse(source)) if ref])
+            self._references[path] = cached
+        files = [path]
+        for ref in cached[1]:
+            files.extend(self._template_files(ref, seen))
+        return files
+
+    def _lastmod(self, info):
+        paths = [os.path.join(self.app.root_path, f) for f in info['files']]
+        if info['template']:
+            paths.extend(self._template_files(info['template']))
+        mtimes = [m for m in map(self._mtime, paths) if m is not None]
+        return max(mtimes) if mtimes else None
+
+    def entries(self):
+        """All sitemap entries for the current host, ordered by priority."""
+        prefixes = tuple(self.app.config['SITEMAP_EXCLUDE_PREFIXES'])
+        found = {}
+        for rule in self.app.url_map.iter_rules():
+            if (
+                rule.arguments
+                or 'GET' not in rule.methods
+                or rule.endpoint in ('static', 'sitemap', 'sitemap_page')
+                or rule.rule.startswith(prefixes)
+            ):
+                continue
+            info = self._pages.get(rule.endpoint, {'priority': None, 'changefreq': None,
+                                                   'template': None, 'files': ()})
+            loc = url_for(rule.endpoint, _external=True)
+            found[loc] = {'loc': loc, 'lastmod': self._lastmod(info), 'priority': info['priority'],
+                          'changefreq': info['changefreq'], 'images': []}
+        for source in self._sources:
+            for extra in source():
+                entry = found.setdefault(extra['loc'], {'loc': extra['loc'], 'lastmod': None,
+                                                        'priority': None, 'changefreq': None,
+                                                        'images': []})
+                for key in ('priority', 'changefreq'):
+                    if extra.get(key) is not None:
+                        entry[key] = extra[key]
+                if extra.get('lastmod') is not None:
+                    entry['lastmod'] = max(entry['lastmod'] or 0, extra['lastmod'])
+                entry['images'].extend(extra.get('images', ()))
+        return sorted(found.values(), key=lambda e: (-(e['priority'] or 0.5), e['loc']))
+
+    # Rendering --------------------------------------------------------
+
+    def _urlset(self, entries):
+        yield URLSET_OPEN
+        for entry in entries:
+            parts = [f"  <url>\n    <loc>{escape(entry['loc'])}</loc>\n"]
+            if entry['lastmod'] is not None:
+                parts.append(f"    <lastmod>{w3c_datetime(entry['lastmod'])}</lastmod>\n")
+            if entry['changefreq']:
+                parts.append(f"    <changefreq>{entry['changefreq']}</changefreq>\n")
+            if entry['priority'] is not None:
+                parts.append(f"    <priority>{entry['priority']:.1f}</priority>\n")
+            for image in entry['images']:
+                parts.append(f"    <image:image><image:loc>{escape(image)}</image:loc></image:image>\n")
+            parts.append('  </url>\n')
+            yield ''.join(parts)
+        yield '</urlset>\n'
+
+    def _index(self, pages):
+        yield INDEX_OPEN
+        for number, lastmod in pages:
+            parts = [f"  <sitemap>\n    <loc>{escape(url_for('sitemap_page', page=number, _external=True))}</loc>\n"]
+            if lastmod is not None:
+                parts.append(f"    <lastmod>{w3c_datetime(lastmod)}</lastmod>\n")
+            parts.append('  </sitemap>\n')
+            yield ''.join(parts)
+        yield '</sitemapindex>\n'
+
+    def _document(self, chunks, lastmod):
+        encoded = [chunk.encode('utf-8') for chunk in chunks]
+        digest = hashlib.sha256()
+        for chunk in encoded:
+            digest.update(chunk)
+        return encoded, digest.hexdigest()[:32], lastmod
+
+    def _build(self, entries, version):
+        limit = self.app.config['SITEMAP_MAX_URLS']
+        pages = [entries[i:i + limit] for i in range(0, len(entries), limit)] or [[]]
+
+        def newest(group):
+            mtimes = [e['lastmod'] for e in group if e['lastmod'] is not None]
+            return max(mtimes) if mtimes else None
+
+        documents = [None] + [self._document(self._urlset(group), newest(group)) for group in pages]
+        if len(pages) > 1:
+            documents[0] = self._document(
+                self._index([(n, newest(group)) for n, group in enumerate(pages, 1)]), newest(entries))
+        return _Rendered(version, documents)
+
+    def rendered(self):
+        """Rendered documents for the current host, rebuilt when entries change."""
+        host = request.host_url
+        now = time.monotonic()
+        with self._lock:
+            current, checked = self._rendered.get(host, (None, 0.0))
+        interval = 0 if self.app.debug else self.app.config['SITEMAP_CHECK_INTERVAL']
+        if current is not None and now - checked < interval:
+            return current
+        entries = self.entries()
+        stamp = (self.app.config['SITEMAP_MAX_URLS'], entries)
+        version = hashlib.sha256(repr(stamp).encode()).hexdigest()[:16]
+        if current is None or current.version != version:
+            current = self._build(entries, version)
+        with self._lock:
+            self._rendered[host] = (current, now)
+            self._rendered.move_to_end(host)
+            while len(self._rendered) > self.app.config['SITEMAP_MAX_HOSTS']:
+                self._rendered.popitem(last=False)
+        return current
+
+    def serve(self, page=None):
+        """View for /sitemap.xml and /sitemap-<page>.xml."""
+        documents = self.rendered().documents
+        if page is None:
+            document = documents[0] or documents[1]
+        elif documents[0] is not None and 1 <= page < len(documents):
+            document = documents[page]
+        else:
+            abort(404)
+        chunks, etag, lastmod = document
+        response = current_app.response_class(chunks, mimetype='application/xml')
+        response.set_etag(etag)
+        if lastmod is not None:
+            response.last_modified = lastmod
+        response.headers['Cache-Control'] = 'public, no-cache'
+        return response.make_conditional(request)
@@ -501,22 +501,75 @@
   prev?.addEventListener('click', () => scrollByAmount(-1));
   next?.addEventListener('click', () => scrollByAmount(1));
 
-  // Load image list from manifest and inject slides
-  fetch('/static/img/machines-gallery/manifest.json', { cache: 'no-store' })
-    .then(r => r.ok ? r.json() : [])
-    .then(list => {
-      if (!Array.isArray(list)) list = [];
-      list.forEach((file) => {
-        const slide = document.createElement('div');
-        slide.className = 'carousel-slide gallery-item';
-        const img = document.createElement('img');
-        img.loading = 'lazy';
-        img.decoding = 'async';
-        img.src = `/static/img/machines-gallery/${file}`;
-        img.alt = 'Bakery equipment';
-        slide.appendChild(img);
-        track.appendChild(slide);
-      });
-    })
-    .catch(()=>{});
+  // Slides are 85% / 48% / 32% of the carousel width (see styles.css)
+  const SLIDE_SIZES = '(min-width: 1100px) 32vw, (min-width: 768px) 48vw, 85vw';
+
+  // Wrap an <img> in a <picture> with one srcset per format (AVIF, WebP) so
+  // the browser downloads the smallest variant that fills the slide
+  function responsivePicture(img, variants){
+    if (!Array.isArray(variants) || variants.length === 0) return img;
+    const picture = document.createElement('picture');
+    const byType = {};
+    variants.forEach(v => { (byType[v.type] = byType[v.type] || []).push(v); });
+    Object.keys(byType).forEach(type => {
+      const source = document.createElement('source');
+      source.type = type;
+      source.sizes = SLIDE_SIZES;
+      source.srcset = byType[type].map(v => `/static/${v.file} ${v.width}w`).join(', ');
+      picture.appendChild(source);
+    });
+    picture.appendChild(img);
+    return picture;
+  }
+
+  function addSlide(entry){
+    // Entries are metadata records ({file, width, height, ...}); older manifests list bare filenames
+    const item = typeof entry === 'string' ? { file: entry } : entry;
+    const slide = document.createElement('div');
+    slide.className = 'carousel-slide gallery-item';
+    const img = document.createElement('img');
+    img.loading = 'lazy';
+    img.decoding = 'async';
+    if (item.width && item.height) {
+      img.width = item.width;
+      img.height = item.height;
+    }
+    // Dominant colour and tiny preview from tools/build_image_index.py
+    if (item.color) {
+      img.style.background = item.lqip ? `${item.color} url(${item.lqip}) center/cover no-repeat` : item.color;
+    }
+    img.src = `/static/img/machines-gallery/${item.file}`;
+    img.alt = 'Bakery equipment';
+    slide.appendChild(responsivePicture(img, item.variants));
+    track.appendChild(slide);
+  }
+
+  // The first slides are rendered by the server; the rest of the manifest is
+  // fetched (HTTP-cached) once the carousel gets close to the viewport
+  const manifestUrl = carousel.dataset.manifest;
+  const rendered = parseInt(carousel.dataset.rendered || '0', 10);
+  const total = parseInt(carousel.dataset.total || '0', 10);
+  if (!manifestUrl || rendered >= total) return;
+
+  function loadRest(){
+    fetch(manifestUrl)
+      .then(r => r.ok ? r.json() : [])
+      .then(list => {
+        if (!Array.isArray(list)) return;
+        list.slice(rendered).forEach(addSlide);
+      })
+      .catch(()=>{});
+  }
+
+  if ('IntersectionObserver' in window) {
+    const io = new IntersectionObserver((entries) => {
+      if (entries.some(e => e.isIntersecting)) {
+        io.disconnect();
+        loadRest();
+      }
+    }, { rootMargin: '600px 0px' });
+    io.observe(carousel);
+  } else {
+    loadRest();
+  }
 })();
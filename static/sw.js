@@ -1,25 +1,71 @@
 // Service Worker for Himma Group Website
-// Bump CACHE_NAME to force clients to fetch updated icons/favicons
-const CACHE_NAME = 'himma-v4';
-const RUNTIME_CACHE = 'himma-runtime';
+// GENERATED by tools/fingerprint_static.py from tools/sw.template.js - edit the template, not static/sw.js.
+// CACHE_NAME is derived from the fingerprints of the precached assets, so it
+// changes (and old caches are dropped) whenever one of them changes.
+const CACHE_NAME = 'himma-d0fed52a65';
 
-// Assets to cache on install
+// Assets to cache on install (fingerprinted URLs from static/asset-manifest.json)
 const PRECACHE_ASSETS = [
-  '/',
-  '/static/css/styles.css',
-  '/static/js/main.js',
-  '/static/logo.png',
-  '/static/logo-192.png',
-  '/static/logo-512.png',
-  '/static/manifest.json',
-  // Hero slider images
-  '/static/img/slider-warehouse.jpg',
-  '/static/img/slider-roaster.jpg',
-  '/static/img/slider-kitchen.jpg',
-  // Machines gallery manifest (images are cached on demand)
-  '/static/img/machines-gallery/manifest.json'
+  "/",
+  "/static/css/fonts.45b662f17e.css",
+  "/static/css/styles.3d304d7d2b.css",
+  "/static/js/main.af2e39d1f5.js",
+  "/static/fonts/fa-solid-900.woff2",
+  "/static/fonts/fa-brands-400.woff2",
+  "/static/logo.d23bc9b8da.png",
+  "/static/logo-192.3c2eae7bf8.png",
+  "/static/logo-512.e05cc54677.png",
+  "/static/manifest.7bbc4f9d1d.json",
+  "/static/img/slider-warehouse.jpg",
+  "/static/img/slider-roaster.jpg",
+  "/static/img/slider-kitchen.jpg",
+  "/static/img/machines-gallery/manifest.json"
 ];
 
+// Runtime caching per request class (RUNTIME_ROUTES in tools/fingerprint_static.py).
+// The first matching route wins; unmatched requests go straight to the network.
+const ROUTES = [
+  {
+    "cache": "himma-pages",
+    "strategy": "networkFirst",
+    "pattern": "^/(?!api/|metrics$|static/)",
+    "navigate": true,
+    "maxEntries": 25,
+    "maxAge": 0,
+    "timeout": 3
+  },
+  {
+    "cache": "himma-images",
+    "strategy": "cacheFirst",
+    "pattern": "^/static/img/.+\\.(?:avif|webp|jpe?g|png|gif|svg)$",
+    "navigate": false,
+    "maxEntries": 60,
+    "maxAge": 2592000,
+    "timeout": 0
+  },
+  {
+    "cache": "himma-assets",
+    "strategy": "cacheFirst",
+    "pattern": "^/static/.+\\.[0-9a-f]{10}\\.[^/.]+$",
+    "navigate": false,
+    "maxEntries": 60,
+    "maxAge": 0,
+    "timeout": 0
+  },
+  {
+    "cache": "himma-static",
+    "strategy": "staleWhileRevalidate",
+    "pattern": "^/static/",
+    "navigate": false,
+    "maxEntries": 40,
+    "maxAge": 0,
+    "timeout": 0
+  }
+].map(route => Object.assign(route, { regex: new RegExp(route.pattern) }));
+
+// Set on every stored response; entries older than the route's maxAge are revalidated
+const CACHED_AT = 'X-SW-Cached-At';
+
 // Install event - cache core assets
 self.addEventListener('install', (event) => {
   event.waitUntil(
@@ -29,60 +75,155 @@ self.addEventListener('install', (event) => {
   );
 });
 
-// Activate event - clean up old caches
+// Activate event - drop caches that no longer belong to a route, enable navigation preload
 self.addEventListener('activate', (event) => {
+  const keep = new Set([CACHE_NAME, ...ROUTES.map(route => route.cache)]);
   event.waitUntil(
-    caches.keys().then(cacheNames => {
-      return Promise.all(
-        cacheNames
-          .filter(name => name !== CACHE_NAME && name !== RUNTIME_CACHE)
-          .map(name => caches.delete(name))
-      );
-    }).then(() => self.clients.claim())
+    Promise.all([
+      caches.keys().then(cacheNames => Promise.all(
+        cacheNames.filter(name => !keep.has(name)).map(name => caches.delete(name))
+      )),
+      self.registration.navigationPreload ? self.registration.navigationPreload.enable() : null
+    ]).then(() => self.clients.claim())
   );
 });
 
-// Fetch event - network first, then cache
+function findRoute(request) {
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return null;
+  const navigate = request.mode === 'navigate';
+  return ROUTES.find(route => route.navigate === navigate && route.regex.test(url.pathname)) || null;
+}
+
+function cacheable(response) {
+  return response && response.status === 200 && response.type === 'basic'
+    && !/no-store/.test(response.headers.get('Cache-Control') || '');
+}
+
+function fresh(route, response) {
+  const cachedAt = Number(response.headers.get(CACHED_AT) || 0);
+  return !route.maxAge || Date.now() - cachedAt < route.maxAge * 1000;
+}
+
+// Store a stamped copy, then evict the least recently used entries over the cap
+// (Cache API keys are kept in insertion order and put() moves a key to the end)
+async function store(route, request, response, stamp = true) {
+  const cache = await caches.open(route.cache);
+  if (stamp) {
+    const headers = new Headers(response.headers);
+    headers.set(CACHED_AT, String(Date.now()));
+    response = new Response(await response.blob(), {
+      status: response.status,
+      statusText: response.statusText,
+      headers
+    });
+  }
+  await cache.put(request, response);
+  const keys = await cache.keys();
+  await Promise.all(keys.slice(0, Math.max(0, keys.length - route.maxEntries)).map(key => cache.delete(key)));
+}
+
+// Fetch over the network; with a cached copy the request is conditional and a
+// 304 refreshes that copy instead of downloading the body again
+async function revalidate(route, request, cached) {
+  const etag = cached && cached.headers.get('ETag');
+  const modified = cached && cached.headers.get('Last-Modified');
+  let networkRequest = request;
+  if (etag || modified) {
+    const headers = new Headers(request.headers);
+    if (etag) headers.set('If-None-Match', etag);
+    if (modified) headers.set('If-Modified-Since', modified);
+    networkRequest = new Request(request.url, {
+      headers,
+      credentials: 'same-origin',
+      // Navigations must not be answered with a followed redirect
+      redirect: request.mode === 'navigate' ? 'manual' : request.redirect
+    });
+  }
+  const response = await fetch(networkRequest);
+  if (response.status === 304 && cached) {
+    await store(route, request, cached.clone());
+    return cached;
+  }
+  if (cacheable(response)) {
+    await store(route, request, response.clone());
+  }
+  return response;
+}
+
+function offline(request) {
+  // Precached home page for navigations
+  return request.mode === 'navigate'
+    ? caches.match('/', { cacheName: CACHE_NAME }).then(page => page || Response.error())
+    : Response.error();
+}
+
+// HTML: the network (navigation preload when available) wins if it answers within
+// route.timeout seconds; otherwise the cached copy is served and updated in the background
+async function networkFirst(route, event) {
+  const request = event.request;
+  const cached = await caches.match(request, { cacheName: route.cache });
+  const network = (async () => {
+    const preloaded = await event.preloadResponse;
+    if (!preloaded) {
+      return revalidate(route, request, cached && cached.clone());
+    }
+    if (cacheable(preloaded)) {
+      await store(route, request, preloaded.clone());
+    }
+    return preloaded;
+  })();
+  event.waitUntil(network.catch(() => {}));
+  if (!cached) {
+    return network.catch(() => offline(request));
+  }
+  const timeout = new Promise(resolve => {
+    if (route.timeout) setTimeout(() => resolve(cached), route.timeout * 1000);
+  });
+  return Promise.race([network, timeout]).catch(() => cached);
+}
+
+// Fingerprinted assets and images: served from cache while fresh; a hit moves
+// the entry to the end of the LRU order
+async function cacheFirst(route, event) {
+  const request = event.request;
+  const precached = await caches.match(request, { cacheName: CACHE_NAME });
+  if (precached) return precached;
+  const cached = await caches.match(request, { cacheName: route.cache });
+  if (cached && fresh(route, cached)) {
+    event.waitUntil(store(route, request, cached.clone(), false));
+    return cached;
+  }
+  try {
+    return await revalidate(route, request, cached);
+  } catch (error) {
+    return cached || offline(request);
+  }
+}
+
+// Stable-name static files: served from cache, revalidated in the background
+async function staleWhileRevalidate(route, event) {
+  const request = event.request;
+  const cached = await caches.match(request, { cacheName: route.cache })
+    || await caches.match(request, { cacheName: CACHE_NAME });
+  const network = revalidate(route, request, cached && cached.clone());
+  if (!cached) {
+    return network.catch(() => offline(request));
+  }
+  event.waitUntil(network.catch(() => {}));
+  return cached;
+}
+
+const STRATEGIES = { networkFirst, cacheFirst, staleWhileRevalidate };
+
+// Fetch event - dispatch to the route's strategy
 self.addEventListener('fetch', (event) => {
-  // Skip non-GET requests
   if (event.request.method !== 'GET') return;
 
-  // Skip chrome extensions
-  if (event.request.url.startsWith('chrome-extension://')) return;
-
-  event.respondWith(
-    caches.match(event.request).then(cachedResponse => {
-      // Return cached response if available
-      if (cachedResponse) {
-        // Update cache in background
-        fetch(event.request).then(response => {
-          if (response && response.status === 200) {
-            caches.open(RUNTIME_CACHE).then(cache => {
-              cache.put(event.request, response);
-            });
-          }
-        }).catch(() => {});
-        return cachedResponse;
-      }
-
-      // Otherwise fetch from network
-      return fetch(event.request).then(response => {
-        // Cache successful responses
-        if (response && response.status === 200) {
-          const responseClone = response.clone();
-          caches.open(RUNTIME_CACHE).then(cache => {
-            cache.put(event.request, responseClone);
-          });
-        }
-        return response;
-      }).catch(() => {
-        // Return offline page for navigation requests
-        if (event.request.mode === 'navigate') {
-          return caches.match('/');
-        }
-      });
-    })
-  );
+  const route = findRoute(event.request);
+  if (!route) return;
+
+  event.respondWith(STRATEGIES[route.strategy](route, event));
 });
 
 // Handle messages from clients
@@ -0,0 +1,336 @@
+"""
+In-memory store for hot static files; mapped, range-aware serving for large ones.
+
+Wraps the static view (after AssetManifest and Compression):
+
+* Files up to ``STATIC_STORE_MAX_FILE_SIZE`` are read into memory by
+  ``static_store.load()`` (a warm-up task) -- stylesheets, scripts, fonts
+  and icons first, then images from smallest up -- until
+  ``STATIC_STORE_MEMORY_BUDGET`` bytes are used. Each entry keeps its
+  bytes, a strong content ETag and its compressed variants: the
+  ``.br``/``.gz`` siblings tools/fingerprint_static.py writes or, for
+  compressible types without one, bodies compressed once at load. Hits
+  do no stat, open or read and no compression.
+* Larger files (and whatever does not fit the budget) are served from
+  disk: full responses through ``wsgi.file_wrapper`` (sendfile on servers
+  that support it), Range requests from a shared ``mmap`` of the file that
+  is seeked to the start of the range instead of reading up to it.
+  Range and If-Range are evaluated by werkzeug's ``make_conditional``
+  against the file's ETag, which is the same for full and partial
+  responses.
+
+Each entry is re-checked against its file at most every
+``STATIC_STORE_CHECK_INTERVAL`` seconds and reloaded (or dropped) when it
+changed. The asset manifest is checked on the same interval, and the store
+is rebuilt when it changes, which picks up new files. Mappings of the
+``STATIC_STORE_MAX_MAPPINGS`` most recently range-requested files are kept.
+
+Off unless ``STATIC_STORE_ENABLED`` is set: every process holds its own
+copy of up to ``STATIC_STORE_MEMORY_BUDGET`` bytes, so under Passenger
+each worker pays for it. serve.py turns it on, as its workers share the
+copy loaded in the master. Always off in debug mode.
+"""
+
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+from asset_manifest import IMMUTABLE
+from compression import SUFFIXES
+
+# Loaded first: what every page needs before it can render
+HOT_TYPES = ('.css', '.js', '.woff2', '.woff', '.svg', '.ico', '.json', '.webmanifest')
+CHUNK_SIZE = 256 * 1024
+
+
+class _Entry:
+    __slots__ = ('path', 'mtime', 'size', 'mimetype', 'etag', 'body', 'variants', 'checked')
+
+    def __init__(self, path, mtime, size, mimetype, etag, body=None, variants=None):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.mimetype = mimetype
+        self.etag = etag
+        self.body = body          # None for files served from disk
+        self.variants = variants or {}  # encoding -> compressed bytes
+        self.checked = time.monotonic()
+
+    @property
+    def memory(self):
+        return len(self.body or b'') + sum(len(v) for v in self.variants.values())
+
+
+class _MappedFile:
+    """Iterates a file through a shared mmap; seekable, so ranges skip ahead."""
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.position >= len(self.mapping):
+            raise StopIteration
+        chunk = self.mapping[self.position:self.position + CHUNK_SIZE]
+        self.position += len(chunk)
+        return chunk
+
+    def seekable(self):
+        return True
+
+    def seek(self, position):
+        self.position = position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        pass  # the mapping is shared; it is closed when the file changes
+
+
+class StaticStore:
+    """Serves static files from memory, or mapped from disk, with ranges."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._entries = {}   # static-relative name -> _Entry
+        self._mappings = OrderedDict()  # path -> ((mtime, size), mmap), least recent first
+        self._used = 0
+        self._manifest_version = None
+        self._manifest_checked = 0.0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._static_view = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATIC_STORE_ENABLED', False)
+        app.config.setdefault('STATIC_STORE_MEMORY_BUDGET', 32 * 1024 * 1024)
+        app.config.setdefault('STATIC_STORE_MAX_FILE_SIZE', 256 * 1024)
+        app.config.setdefault('STATIC_STORE_CHECK_INTERVAL', 2.0)
+        app.config.setdefault('STATIC_STORE_MAX_MAPPINGS', 16)
+        self.app = app
+        app.extensions['static_store'] = self
+        # Wrap whichever static view is registered (Compression's, if any)
+        self._static_view = app.view_functions['static']
+        app.view_functions['static'] = self.send_static_file
+
+    @property
+    def enabled(self):
+        return self.app.config['STATIC_STORE_ENABLED'] and not self.app.debug
+
+    @property
+    def memory_used(self):
+        return self._used
+
+    def _manifest(self):
+        manifest = self.app.extensions.get('asset_manifest')
+        return manifest.version() if manifest is not None else None
+
+    def _candidates(self):
+        """Static files in load order: hot types first, then by size."""
+        found = []
+        for dirpath, _, filenames in os.walk(self.app.static_folder):
+            for name in filenames:
+                if name.endswith(tuple(SUFFIXES.values())):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    size = os.stat(path).st_size
+                except OSError:
+                    continue
+                rel = os.path.relpath(path, self.app.static_folder).replace(os.sep, '/')
+                found.append((not name.lower().endswith(HOT_TYPES), size, rel))
+        found.sort()
+        return [(rel, size) for _, size, rel in found]
+
+    def load(self):
+        """(Re)load the hot files into memory; returns the number loaded."""
+        if not self.enabled:
+            return 0
+        config = self.app.config
+        entries, used = {}, 0
+        for rel, size in self._candidates():
+            if size > config['STATIC_STORE_MAX_FILE_SIZE'] or used + size > config['STATIC_STORE_MEMORY_BUDGET']:
+                continue
+            entry = self._read(rel)
+            if entry is None or used + entry.memory > config['STATIC_STORE_MEMORY_BUDGET']:
+                continue
+            entries[rel] = entry
+            used += entry.memory
+        with self._lock:
+            self._entries, self._used = entries, used
+            self._manifest_version = self._manifest()
+            self._manifest_checked = time.monotonic()
+            self._mappings.clear()
+            self._loaded = True
+        return len(entries)
+
+    def _read(self, rel):
+        path = safe_join(self.app.static_folder, rel)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+            with open(path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        mimetype = mimetypes.guess_type(rel)[0] or 'application/octet-stream'
+        return _Entry(path, st.st_mtime_ns, len(body), mimetype,
+                      hashlib.sha256(body).hexdigest()[:32], body, self._variants(path, st, body, mimetype))
+
+    def _variants(self, path, st, body, mimetype):
+        compression = self.app.extensions.get('compression')
+        config = self.app.config
+        if compression is None or not config['COMPRESS_ENABLED']:
+            return {}
+        variants = {}
+        for encoding in compression.encodings:
+            sibling = path + SUFFIXES[encoding]
+            try:
+                if config['COMPRESS_PRECOMPRESSED'] and os.stat(sibling).st_mtime_ns >= st.st_mtime_ns:
+                    with open(sibling, 'rb') as f:
+                        variants[encoding] = f.read()
+                    continue
+            except OSError:
+                pass
+            if mimetype in config['COMPRESS_MIMETYPES'] and len(body) >= config['COMPRESS_MIN_SIZE']:
+                variants[encoding] = compression.compress(body, encoding)
+        # Keep a variant only where it is actually smaller
+        return {e: data for e, data in variants.items() if len(data) < len(body)}
+
+    def _fresh(self, rel, entry):
+        """``entry``, its reloaded replacement, or None if the file is gone."""
+        now = time.monotonic()
+        if now - entry.checked < self.app.config['STATIC_STORE_CHECK_INTERVAL']:
+            return entry
+        try:
+            st = os.stat(entry.path)
+        except OSError:
+            st = None
+        if st is not None and st.st_mtime_ns == entry.mtime and st.st_size == entry.size:
+            entry.checked = now
+            return entry
+        config = self.app.config
+        replacement = self._read(rel) if st is not None else None
+        with self._lock:
+            self._used -= entry.memory
+            if (replacement is not None and replacement.size <= config['STATIC_STORE_MAX_FILE_SIZE']
+                    and self._used + replacement.memory <= config['STATIC_STORE_MEMORY_BUDGET']):
+                self._entries[rel] = replacement
+                self._used += replacement.memory
+            else:
+                self._entries.pop(rel, None)
+                replacement = None
+        return replacement
+
+    def _lookup(self, rel):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._manifest_checked >= self.app.config['STATIC_STORE_CHECK_INTERVAL']:
+            self._manifest_checked = time.monotonic()
+            if self._manifest() != self._manifest_version:
+                self.load()
+        entry = self._entries.get(rel)
+        return self._fresh(rel, entry) if entry is not None else None
+
+    def send_static_file(self, filename):
+        """Static view: hot files from memory, other files mapped or file-wrapped."""
+        if not self.enabled:
+            return self._static_view(filename)
+        manifest = self.app.extensions.get('asset_manifest')
+        original = manifest.original(filename) if manifest else filename
+        entry = self._lookup(original)
+        response = self._from_memory(entry) if entry is not None else self._from_disk(original)
+        if response is None:
+            # Missing files, and compressible ones that may have .br/.gz siblings
+            return self._static_view(filename)
+        if original != filename:
+            response.headers['Cache-Control'] = IMMUTABLE
+        else:
+            # Same policy as send_file: revalidate unless a max age is configured
+            max_age = self.app.get_send_file_max_age(original)
+            if max_age:
+                response.cache_control.public = True
+                response.cache_control.max_age = max_age
+            else:
+                response.cache_control.no_cache = True
+        return response
+
+    def _from_memory(self, entry):
+        compression = self.app.extensions.get('compression')
+        encoding = None
+        if entry.variants and request.range is None and compression is not None:
+            encoding = compression.negotiate()
+            if encoding not in entry.variants:
+                encoding = request.accept_encodings.best_match(list(entry.variants))
+        body = entry.variants[encoding] if encoding else entry.body
+        response = self.app.response_class(body, mimetype=entry.mimetype)
+        response.last_modified = entry.mtime / 1e9
+        if entry.variants:
+            response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(entry.etag, weak=True)
+            return response.make_conditional(request)
+        response.set_etag(entry.etag)
+        return response.make_conditional(request, accept_ranges=True, complete_length=entry.size)
+
+    def _mapping(self, path, st):
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._mappings.get(path)
+            if cached is not None and cached[0] == stamp:
+                self._mappings.move_to_end(path)
+                return cached[1]
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Dropped mappings are closed once in-flight responses release them (GC)
+        with self._lock:
+            self._mappings[path] = (stamp, mapping)
+            self._mappings.move_to_end(path)
+            while len(self._mappings) > self.app.config['STATIC_STORE_MAX_MAPPINGS']:
+                self._mappings.popitem(last=False)
+        return mapping
+
+    def _from_disk(self, rel):
+        """Full responses via wsgi.file_wrapper, ranges from an mmap; None to defer."""
+        mimetype = mimetypes.guess_type(rel)[0] or 'application/octet-stream'
+        if request.range is None and mimetype in self.app.config['COMPRESS_MIMETYPES']:
+            return None
+        path = safe_join(self.app.static_folder, rel)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+            if st.st_size == 0 or not os.path.isfile(path):
+                return None
+            if request.range is not None:
+                body = _MappedFile(self._mapping(path, st))
+            else:
+                body = wrap_file(request.environ, open(path, 'rb'))
+        except (OSError, ValueError):
+            return None
+        response = self.app.response_class(body, mimetype=mimetype, direct_passthrough=True)
+        response.last_modified = st.st_mtime_ns / 1e9
+        response.set_etag(file_etag(st))
+        response.content_length = st.st_size
+        return response.make_conditional(request, accept_ranges=True, complete_length=st.st_size)
+
+
+def file_etag(st):
+    """ETag of a file served from disk, identical for full and partial responses."""
+    return f'{st.st_mtime_ns:x}-{st.st_size:x}'
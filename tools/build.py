@@ -0,0 +1,397 @@
+"""
+Build every generated asset, running only the steps whose inputs changed.
+
+Usage:
+  python tools/build.py [STEP ...] [--jobs N] [--force] [--list]
+                        [--gallery-source DIR] [--font-source DIR] [--export]
+
+The build is a graph of steps, each declaring the files it reads (inputs),
+the files it writes (outputs) and the steps that must finish first:
+
+  content                content/data.js from content/site.json
+  logo, icons, favicon   static/img/logo.png, logo-192/512.png, logo-16/32.png
+                         and favicon.ico from static/logo.png
+  gallery                tools/build_machines_gallery.py (--gallery-source)
+  responsive             tools/build_responsive_images.py
+  image-index            tools/build_image_index.py
+  fonts                  tools/build_fonts.py (--font-source)
+  critical               tools/build_critical_css.py
+  fingerprint            tools/fingerprint_static.py
+  export                 tools/export_static.py (--export)
+
+Steps whose dependencies are done run in parallel (--jobs threads; the image
+steps also start --jobs worker processes of their own). A step is skipped
+when the hash of its inputs matches the last successful run and its outputs
+are still what that run left behind. Hashes are kept in
+.build-cache/build-state.json, and a file is only re-read when its size or
+mtime changed. Source images several steps share -- the logo -- are decoded
+once per build.
+
+A step whose sources cannot be obtained (the fonts step without network or
+--font-source) keeps its committed outputs and is reported as stale; the
+steps after it still run.
+
+Naming steps builds them and their dependencies only. --force runs every
+selected step; --list prints the steps and whether they would run.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parents[1]
+STATE_FILE = ROOT / '.build-cache' / 'build-state.json'
+GALLERY_IMAGES = ('static/img/machines-gallery/*.jpg', 'static/img/machines-gallery/*.png')
+# fingerprint writes these next to other steps' files; they never count as another step's input or output
+PRECOMPRESSED = ('*.gz', '*.br')
+
+
+class Stale(Exception):
+    """Raised by a step that could not run but left its previous outputs intact."""
+
+
+class Context:
+    """Options and shared, decoded sources for the steps of one build."""
+
+    def __init__(self, jobs: int, force: bool, gallery_source: Path | None = None,
+                 font_source: Path | None = None, export: bool = False):
+        self.jobs = jobs
+        self.force = force
+        self.export = export
+        self.gallery_source = gallery_source
+        self.font_source = font_source
+        self._images: dict[str, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def image(self, rel: str) -> Image.Image:
+        """``rel`` decoded once per build; steps must not modify it in place."""
+        with self._lock:
+            if rel not in self._images:
+                path = ROOT / rel
+                if not path.exists():
+                    raise SystemExit(f'Source image not found: {path}')
+                with Image.open(path) as im:
+                    im.load()
+                    self._images[rel] = im
+            return self._images[rel]
+
+
+@dataclass
+class Step:
+    name: str
+    run: Callable[[Context], None]
+    # Glob patterns relative to the project root (or a function of the context)
+    inputs: tuple[str, ...] | Callable[[Context], tuple[str, ...]]
+    outputs: tuple[str, ...] = ()
+    deps: tuple[str, ...] = ()
+    # fnmatch patterns removed from the inputs, e.g. files the step writes itself
+    exclude: tuple[str, ...] = ()
+    enabled: Callable[[Context], bool] = lambda ctx: True
+
+    def input_patterns(self, ctx: Context) -> tuple[str, ...]:
+        return self.inputs(ctx) if callable(self.inputs) else self.inputs
+
+
+def run_content(ctx: Context) -> None:
+    import build_content
+    build_content.build()
+
+
+def run_logo(ctx: Context) -> None:
+    from copy_logo import copy_logo
+    copy_logo()
+
+
+def run_icons(ctx: Context) -> None:
+    from generate_icons import SIZES, make_icon
+    logo = ctx.image('static/logo.png')
+    for size in SIZES:
+        make_icon(logo, size)
+
+
+def run_favicon(ctx: Context) -> None:
+    from generate_favicon import write_favicons
+    write_favicons(ctx.image('static/logo.png'), str(ROOT / 'static'))
+
+
+def run_gallery(ctx: Context) -> None:
+    import build_machines_gallery
+    build_machines_gallery.build(ctx.gallery_source, ctx.jobs, ctx.force)
+
+
+def run_responsive(ctx: Context) -> None:
+    import build_responsive_images
+    build_responsive_images.build(ctx.jobs, ctx.force)
+
+
+def run_image_index(ctx: Context) -> None:
+    import build_image_index
+    build_image_index.build(ctx.jobs, ctx.force)
+
+
+def run_fonts(ctx: Context) -> None:
+    import build_fonts
+    try:
+        build_fonts.build(ctx.font_source, ctx.force)
+    except build_fonts.SourcesUnavailable as e:
+        raise Stale(f'{e}; kept the committed fonts') from e
+
+
+def run_critical(ctx: Context) -> None:
+    import build_critical_css
+    build_critical_css.build(ctx.jobs)
+
+
+def run_fingerprint(ctx: Context) -> None:
+    import fingerprint_static
+    fingerprint_static.main()
+
+
+def run_export(ctx: Context) -> None:
+    import export_static
+    export_static.export_pages(ctx.jobs)
+
+
+def gallery_inputs(ctx: Context) -> tuple[str, ...]:
+    return (str(ctx.gallery_source / '*'), 'tools/build_machines_gallery.py')
+
+
+def font_inputs(ctx: Context) -> tuple[str, ...]:
+    patterns = ('templates/**/*.html', 'static/js/**/*.js', 'content/*', 'static/css/styles.css',
+                'tools/build_fonts.py', 'tools/css_subset.py')
+    return patterns + ((str(ctx.font_source / '**' / '*'),) if ctx.font_source else ())
+
+
+STEPS = [
+    Step('content', run_content, ('content/site.json', 'tools/build_content.py'), ('content/data.js',)),
+    Step('logo', run_logo, ('static/logo.png', 'tools/copy_logo.py'), ('static/img/logo.png',)),
+    Step('icons', run_icons, ('static/logo.png', 'tools/generate_icons.py'),
+         ('static/logo-192.png', 'static/logo-512.png')),
+    Step('favicon', run_favicon, ('static/logo.png', 'tools/generate_favicon.py'),
+         ('static/logo-16.png', 'static/logo-32.png', 'static/favicon.ico')),
+    # The gallery manifest is not an output: gallery, responsive and image-index all write it
+    Step('gallery', run_gallery, gallery_inputs, GALLERY_IMAGES,
+         enabled=lambda ctx: ctx.gallery_source is not None),
+    Step('responsive', run_responsive,
+         ('static/img/*.jpg', 'static/img/*.jpeg', 'static/img/*.png', *GALLERY_IMAGES,
+          'tools/build_responsive_images.py'),
+         ('static/img/responsive/**/*', 'static/img/machines-gallery/variants/**/*'),
+         deps=('logo', 'gallery')),
+    Step('image-index', run_image_index,
+         ('static/img/**/*', 'static/*.png', 'static/*.jpg', 'tools/build_image_index.py'),
+         ('static/img/image-index.json',),
+         deps=('logo', 'icons', 'favicon', 'gallery', 'responsive'),
+         exclude=('static/img/responsive/*', 'static/img/machines-gallery/variants/*', '*.json',
+                  *PRECOMPRESSED)),
+    Step('fonts', run_fonts, font_inputs,
+         ('static/fonts/*', 'static/css/fonts.css', 'templates/critical/_fonts.html'),
+         deps=('content',),
+         exclude=('templates/critical/*',)),
+    Step('fingerprint', run_fingerprint,
+         ('static/**/*', 'tools/sw.template.js', 'tools/fingerprint_static.py'),
+         ('static/asset-manifest.json', 'static/sw.js'),
+         deps=('logo', 'icons', 'favicon', 'gallery', 'responsive', 'image-index', 'fonts'),
+         exclude=('static/asset-manifest.json', 'static/sw.js', *PRECOMPRESSED)),
+    Step('critical', run_critical,
+         ('templates/**/*.html', 'static/css/*.css', '*.py', 'content/*', 'static/img/image-index.json',
+          'static/img/responsive/index.json', 'static/img/machines-gallery/manifest.json',
+          'tools/build_critical_css.py', 'tools/css_subset.py', 'tools/export_static.py'),
+         ('templates/critical/[!_]*.html',),
+         # After fingerprint too: rendering reads the asset manifest it rewrites
+         deps=('fonts', 'image-index', 'responsive', 'fingerprint'),
+         exclude=('templates/critical/[!_]*.html',)),
+    Step('export', run_export,
+         ('*.py', 'templates/**/*', 'static/**/*', 'content/*', 'tools/export_static.py'),
+         ('dist/**/*',),
+         deps=('fingerprint', 'critical'),
+         exclude=PRECOMPRESSED,
+         enabled=lambda ctx: ctx.export),
+]
+
+
+class Hasher:
+    """SHA-256 of sets of files, memoised by each file's size and mtime."""
+
+    def __init__(self, memo: dict[str, list]):
+        self.memo = memo
+        self._lock = threading.Lock()
+
+    def file(self, rel: str) -> str:
+        st = os.stat(ROOT / rel)
+        with self._lock:
+            cached = self.memo.get(rel)
+        if cached and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(ROOT / rel, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        with self._lock:
+            self.memo[rel] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def files(self, patterns: tuple[str, ...], exclude: tuple[str, ...] = ()) -> str:
+        found = set()
+        for pattern in patterns:
+            for rel in glob.glob(pattern, root_dir=ROOT, recursive=True):
+                rel = Path(rel).as_posix()
+                if (ROOT / rel).is_file() and not any(fnmatch(rel, p) for p in exclude):
+                    found.add(rel)
+        h = hashlib.sha256()
+        for rel in sorted(found):
+            h.update(f'{rel}\0{self.file(rel)}\n'.encode('utf-8'))
+        return h.hexdigest()
+
+
+def load_state() -> dict:
+    try:
+        with open(STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def select_steps(names: list[str], ctx: Context) -> dict[str, Step]:
+    """The steps to consider: ``names`` and their dependencies, or every enabled step."""
+    by_name = {step.name: step for step in STEPS}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise SystemExit(f"Unknown step(s): {', '.join(unknown)}. Steps: {', '.join(by_name)}")
+    if not names:
+        return {step.name: step for step in STEPS if step.enabled(ctx)}
+    selected, todo = {}, list(names)
+    while todo:
+        step = by_name[todo.pop()]
+        if step.name not in selected:
+            selected[step.name] = step
+            todo.extend(step.deps)
+    # Keep declaration order, which is also a valid dependency order
+    return {step.name: step for step in STEPS if step.name in selected}
+
+
+class Builder:
+    def __init__(self, steps: dict[str, Step], ctx: Context):
+        self.steps = steps
+        self.ctx = ctx
+        self.state = load_state()
+        self.hasher = Hasher(self.state.setdefault('files', {}))
+        self.records = self.state.setdefault('steps', {})
+        self._lock = threading.Lock()
+
+    def is_current(self, step: Step) -> bool:
+        record = self.records.get(step.name)
+        return (not self.ctx.force and record is not None
+                and record['inputs'] == self.hasher.files(step.input_patterns(self.ctx), step.exclude)
+                and record['outputs'] == self.hasher.files(step.outputs, PRECOMPRESSED))
+
+    def execute(self, step: Step) -> str:
+        """Run ``step`` unless it is current; returns 'built', 'skipped' or 'stale'."""
+        if not step.enabled(self.ctx):
+            return 'skipped'
+        if self.is_current(step):
+            print(f'[{step.name}] up to date')
+            return 'skipped'
+        started = time.perf_counter()
+        print(f'[{step.name}] running')
+        try:
+            step.run(self.ctx)
+        except Stale as e:
+            # No record, so the step is tried again next build
+            print(f'[{step.name}] stale: {e}')
+            return 'stale'
+        # Hash after the run, so files the step rewrites itself do not retrigger it
+        record = {'inputs': self.hasher.files(step.input_patterns(self.ctx), step.exclude),
+                  'outputs': self.hasher.files(step.outputs, PRECOMPRESSED)}
+        with self._lock:
+            self.records[step.name] = record
+        print(f'[{step.name}] done in {time.perf_counter() - started:.2f} s')
+        return 'built'
+
+    def run(self) -> dict[str, str]:
+        """Run the steps as their dependencies complete; returns name -> result."""
+        results: dict[str, str] = {}
+        pending = dict(self.steps)
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(1, self.ctx.jobs)) as pool:
+            while pending or running:
+                for name, step in list(pending.items()):
+                    deps = [d for d in step.deps if d in self.steps]
+                    if any(results.get(d) in ('failed', 'blocked') for d in deps):
+                        results[name] = 'blocked'
+                        del pending[name]
+                    elif all(d in results for d in deps):
+                        running[pool.submit(self.execute, step)] = name
+                        del pending[name]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except (Exception, SystemExit) as e:
+                        print(f'[{name}] failed: {e}')
+                        results[name] = 'failed'
+        save_state(self.state)
+        return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('steps', nargs='*', help='steps to build (default: all)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help='parallel steps / worker processes')
+    parser.add_argument('--force', action='store_true', help='run every selected step and ignore tool caches')
+    parser.add_argument('--list', action='store_true', help='show the steps and whether they would run')
+    parser.add_argument('--gallery-source', type=Path, help='folder with supplier photos for the gallery step')
+    parser.add_argument('--font-source', type=Path, help='local font files for the fonts step')
+    parser.add_argument('--export', action='store_true', help='also export the site to dist/')
+    args = parser.parse_args()
+
+    # build_machines_gallery.py works with paths relative to the project root
+    os.chdir(ROOT)
+    export = args.export or 'export' in args.steps
+    ctx = Context(args.jobs, args.force, args.gallery_source, args.font_source, export)
+    if 'gallery' in args.steps and ctx.gallery_source is None:
+        raise SystemExit('The gallery step needs --gallery-source DIR.')
+    names = args.steps + (['export'] if args.steps and export and 'export' not in args.steps else [])
+    steps = select_steps(names, ctx)
+
+    builder = Builder(steps, ctx)
+    if args.list:
+        for step in steps.values():
+            status = ('disabled' if not step.enabled(ctx)
+                      else 'up to date' if builder.is_current(step) else 'would run')
+            deps = f" (after {', '.join(step.deps)})" if step.deps else ''
+            print(f'{step.name:<12} {status}{deps}')
+        return 0
+
+    started = time.perf_counter()
+    results = builder.run()
+    kinds = ('built', 'skipped', 'stale', 'failed', 'blocked')
+    counts = {kind: sum(r == kind for r in results.values()) for kind in kinds}
+    print(f"\nbuilt: {counts['built']}  skipped: {counts['skipped']}  stale: {counts['stale']}  "
+          f"failed: {counts['failed']}  blocked: {counts['blocked']}  in {time.perf_counter() - started:.2f} s")
+    return 1 if counts['failed'] or counts['blocked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Write content/data.js from content/site.json.
+
+Usage:
+  python tools/build_content.py
+
+content/site.json is the single source of the site name, contact details
+and embedded app links: the Flask app reads it directly (site_content.py),
+and the plain HTML pages (index.html, company/*.html) read the same values
+from content/data.js, which this tool generates. Edit the JSON, then run
+this (or tools/build.py).
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SOURCE = ROOT / 'content' / 'site.json'
+OUT = ROOT / 'content' / 'data.js'
+GENERATED = 'Generated from content/site.json by tools/build_content.py - edit that file instead.'
+
+
+def render(data: dict) -> str:
+    lines = [f'// {GENERATED}', 'window.HIMMA_CONTENT = window.HIMMA_CONTENT || {};']
+    for key, value in data.items():
+        literal = json.dumps(value, ensure_ascii=False, indent=2)
+        lines.append(f'window.HIMMA_CONTENT.{key} = Object.assign({{}}, '
+                     f'window.HIMMA_CONTENT.{key} || {{}}, {literal});')
+    return '\n'.join(lines) + '\n'
+
+
+def build() -> None:
+    with open(SOURCE, encoding='utf-8') as f:
+        data = json.load(f)
+    text = render(data)
+    if not OUT.exists() or OUT.read_text(encoding='utf-8') != text:
+        OUT.write_text(text, encoding='utf-8')
+        print(f'Wrote {OUT.relative_to(ROOT)}')
+    else:
+        print(f'{OUT.relative_to(ROOT)} is up to date')
+
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,135 @@
+"""
+Inline each page's above-the-fold CSS and load the full stylesheets async.
+
+Usage:
+  python tools/build_critical_css.py [--jobs N]
+
+Every page route that tools/export_static.py exports is rendered, and the
+rules of its local stylesheets (css/fonts.css and css/styles.css, read
+from the page's own <link>s) that apply to the first screen are written
+to templates/critical/<endpoint>.html. The first screen is:
+
+  * the site header,
+  * the first section of <main> (the hero/cover),
+  * any element marked ``data-critical`` (the fixed theme and WhatsApp
+    buttons),
+
+plus their ancestors. base.html includes that file: a <style> block with
+the rules, then critical/_async.html, which fetches the full stylesheets
+without blocking rendering. Pages without a file (a route added since the
+last run) include critical/_blocking.html and load them as before.
+
+Rules are kept when they could apply in some state -- pseudo-classes,
+the dark theme, classes main.js adds such as ``active`` or ``open`` -- so
+the inlined CSS errs towards too much rather than a flash of unstyled
+content. Run after tools/build_fonts.py and whenever styles.css or the
+top of a page changes, then run tools/fingerprint_static.py.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from css_subset import Element, Matcher, parse_css, parse_html, render, select
+from export_static import app, discover_routes
+from export_static import render as render_page
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT_DIR = ROOT / 'templates' / 'critical'
+GENERATED = 'Generated by tools/build_critical_css.py - do not edit; rerun the tool instead.'
+
+# Elements that never start the visible part of <main>
+NON_VISUAL = {'link', 'meta', 'script', 'style', 'noscript', 'template'}
+# Classes and attributes main.js sets at runtime
+SCRIPT_CLASSES = ('active', 'open', 'webp', 'no-webp', 'animate-on-scroll', 'animate-in', 'lazy-loaded')
+SCRIPT_ATTRS = ('data-theme',)
+# Roughly what arrives in the first round trip (10 TCP segments)
+FIRST_FLIGHT = 14 * 1024
+
+
+def first_screen(root: Element) -> list[Element]:
+    """The elements visible on first paint and all their ancestors."""
+    picks = []
+    for element in root.iter():
+        if element.tag == 'header' and not any(p.tag == 'header' for p in picks):
+            picks.append(element)
+        elif element.tag == 'main':
+            first = next((c for c in element.children if c.tag not in NON_VISUAL), None)
+            if first is not None:
+                picks.append(first)
+        elif 'data-critical' in element.attrs:
+            picks.append(element)
+    elements = {}
+    for pick in picks:
+        for element in [*pick.iter(), *pick.ancestors()]:
+            elements[id(element)] = element
+    return list(elements.values())
+
+
+def stylesheets(root: Element) -> list[str]:
+    """Logical static names of the page's stylesheets, in document order."""
+    manifest = app.extensions['asset_manifest']
+    names = []
+    for element in root.iter():
+        rel, href = element.attrs.get('rel'), element.attrs.get('href', '')
+        is_style = rel == 'stylesheet' or (rel == 'preload' and element.attrs.get('as') == 'style')
+        if is_style and href.startswith('/static/'):
+            name = manifest.original(href[len('/static/'):])
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def critical_css(html: bytes, matcher: Matcher) -> tuple[list[str], str]:
+    root, _ = parse_html(html.decode('utf-8'))
+    names = stylesheets(root)
+    nodes = []
+    for name in names:
+        nodes += parse_css((Path(app.static_folder) / name).read_text(encoding='utf-8'))
+    return names, render(select(nodes, first_screen(root), matcher))
+
+
+def write_partial(endpoint: str, names: list[str], css: str) -> Path:
+    path = OUT_DIR / f'{endpoint}.html'
+    text = (f"{{# {GENERATED} Sources: {', '.join(names)} #}}\n"
+            f'<style>{{% raw %}}{css}{{% endraw %}}</style>\n'
+            "{% include 'critical/_async.html' %}\n")
+    if not path.exists() or path.read_text(encoding='utf-8') != text:
+        path.write_text(text, encoding='utf-8')
+    return path
+
+
+def build(jobs: int = os.cpu_count() or 4) -> None:
+    routes = list(discover_routes())
+    adapter = app.url_map.bind('localhost')
+    matcher = Matcher(SCRIPT_CLASSES, SCRIPT_ATTRS)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pages = dict(zip(routes, pool.map(render_page, routes)))
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    for route, html in pages.items():
+        if not html.lstrip().lower().startswith(b'<!doctype html'):
+            continue  # sitemap.xml, robots.txt, ...
+        endpoint, _ = adapter.match(route)
+        names, css = critical_css(html, matcher)
+        if not names:
+            continue
+        total = sum((Path(app.static_folder) / name).stat().st_size for name in names)
+        path = write_partial(endpoint, names, css)
+        note = '  (over the first round trip)' if len(css) > FIRST_FLIGHT else ''
+        print(f'✓ {route} -> {path.relative_to(ROOT)}: {len(css):,} of {total:,} bytes inlined{note}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help='render threads')
+    args = parser.parse_args()
+    build(args.jobs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+Self-host the site's web fonts, subsetted to what the templates use.
+
+Usage:
+  python tools/build_fonts.py [--source DIR] [--force]
+
+Writes:
+  static/fonts/fa-<style>.woff2     Font Awesome faces with only the icons
+                                    referenced from templates/, static/js/
+                                    and content/ (e.g. the toast icons that
+                                    only appear in JavaScript strings)
+  static/fonts/poppins-<weight>.woff2
+                                    Poppins in the weights the site loads
+                                    (POPPINS_WEIGHTS, 300-700; heavier rules
+                                    use 700), cut down to Latin-1 plus any other
+                                    character found in those sources
+  static/css/fonts.css              the matching @font-face rules and the
+                                    Font Awesome rules for those icons only
+  templates/critical/_fonts.html    font preloads included by base.html
+
+Sources are downloaded once into .build-cache/fonts/ (Font Awesome from
+cdnjs, Poppins through the Google Fonts CSS API). --source DIR uses local
+copies instead: a Font Awesome distribution (css/all.min.css and
+webfonts/) and/or Poppins-<Style>.ttf files anywhere below DIR. When
+Poppins cannot be obtained, _fonts.html loads it from Google Fonts
+without blocking rendering and everything else is still self-hosted.
+
+Subsets are built into a scratch directory and moved into static/fonts/
+only once every face succeeded. When a source cannot be downloaded (or
+Poppins was vendored before and is now unavailable) nothing is written:
+build() raises SourcesUnavailable and the committed files stay in place.
+
+Run tools/build_critical_css.py afterwards (fonts.css is one of its
+inputs), then tools/fingerprint_static.py.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from urllib.request import Request, urlopen
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+from css_subset import Element, Matcher, Node, font_families, parse_css, parse_html, render, select
+
+ROOT = Path(__file__).resolve().parents[1]
+STATIC = ROOT / 'static'
+FONTS_OUT = STATIC / 'fonts'
+CSS_OUT = STATIC / 'css' / 'fonts.css'
+PARTIAL_OUT = ROOT / 'templates' / 'critical' / '_fonts.html'
+CACHE_DIR = ROOT / '.build-cache' / 'fonts'
+SCANNED = [ROOT / 'templates', STATIC / 'js', ROOT / 'content']
+SCANNED_EXTS = {'.html', '.js', '.txt', '.json'}
+
+FA_VERSION = '6.4.2'
+FA_URL = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FA_VERSION}'
+# Style classes -> webfont file; an icon without one is drawn from the solid face
+FA_STYLES = {
+    'fa-solid-900': ('fa-solid', 'fas', 'fa'),
+    'fa-regular-400': ('fa-regular', 'far'),
+    'fa-brands-400': ('fa-brands', 'fab'),
+}
+
+POPPINS_CSS_URL = 'https://fonts.googleapis.com/css2?family=Poppins:wght@{weights}&display=swap'
+POPPINS_STYLES = {300: 'Light', 400: 'Regular', 500: 'Medium', 600: 'SemiBold', 700: 'Bold', 800: 'ExtraBold'}
+# The family the site has always requested from Google Fonts
+POPPINS_WEIGHTS = (300, 400, 500, 600, 700)
+# Body text and headings; the other weights are discovered by the browser
+PRELOAD_WEIGHTS = (400, 700)
+# Google serves woff2 split by script to browsers it recognises
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0 Safari/537.36')
+
+# Always kept in Poppins: Latin-1 (form input echoes, names) and common punctuation
+BASE_CHARS = set(range(0x20, 0x7f)) | set(range(0xa0, 0x100)) | {
+    0x2013, 0x2014, 0x2018, 0x2019, 0x201c, 0x201d, 0x2022, 0x2026, 0x20ac, 0x2122,
+}
+
+ICON_CLASSES = re.compile(r"""["']([\w\s-]*\bfa-[\w-]+[\w\s-]*)["']""")
+FA_ICON_RULE = re.compile(r'^\.fa-([\w-]+)::?before$')
+CONTENT = re.compile(r'content\s*:\s*"((?:[^"\\]|\\.)*)"')
+CSS_ESCAPE = re.compile(r'\\([0-9a-fA-F]{1,6})\s?|\\(.)')
+FONT_URL = re.compile(r'url\(([^)]+)\)\s*format\(["\']?(\w+)["\']?\)')
+LATIN_BLOCK = re.compile(r'/\*\s*latin\s*\*/\s*(@font-face\s*\{[^}]*\})')
+FONT_WEIGHT = re.compile(r'font-weight\s*:\s*(\d{3})')
+GENERATED = 'Generated by tools/build_fonts.py - do not edit; rerun the tool instead.'
+# Files in static/fonts/ this tool owns; anything else there is left alone
+OWNED = ('fa-*.woff2', 'poppins-*.woff2')
+
+
+class SourcesUnavailable(Exception):
+    """A font source could not be obtained; the existing outputs are kept."""
+
+
+def fetch(url: str, dest: Path, force: bool = False) -> Path:
+    """Download ``url`` into the build cache unless it is already there."""
+    if force or not dest.exists():
+        request = Request(url, headers={'User-Agent': USER_AGENT})
+        with urlopen(request, timeout=30) as response:
+            data = response.read()
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+        print(f'↓ {url}')
+    return dest
+
+
+def unescape(value: str) -> str:
+    return CSS_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)) if m.group(1) else m.group(2), value)
+
+
+def scan_sources() -> tuple[list[str], set[int]]:
+    """Class lists naming Font Awesome icons, and every character in the sources."""
+    class_lists, chars = set(), set()
+    for folder in SCANNED:
+        for path in folder.rglob('*'):
+            if path.suffix not in SCANNED_EXTS or not path.is_file():
+                continue
+            text = path.read_text(encoding='utf-8', errors='ignore')
+            chars.update(map(ord, text))
+            class_lists.update(' '.join(m.split()) for m in ICON_CLASSES.findall(text))
+    return sorted(class_lists), chars
+
+
+def icon_document(class_lists: list[str]) -> list[Element]:
+    """A document with one <i> per class list, as the pages would contain it."""
+    markup = ''.join(f'<i class="{classes}"></i>' for classes in class_lists)
+    root, _ = parse_html(f'<html><body>{markup}</body></html>')
+    return list(root.iter())
+
+
+def font_style(classes: set[str]) -> str:
+    for style, names in FA_STYLES.items():
+        if classes & set(names[:2]):
+            return style
+    return 'fa-solid-900'
+
+
+def icon_codepoints(nodes: list[Node], elements: list[Element]) -> dict[str, set[int]]:
+    """Codepoints each Font Awesome face must keep."""
+    glyphs = {}
+    for node in nodes:
+        if node.body is None or node.children is not None:
+            continue
+        content = CONTENT.search(node.body)
+        if not content:
+            continue
+        for selector in node.prelude.split(','):
+            match = FA_ICON_RULE.match(selector.strip())
+            if match:
+                glyphs[match.group(1)] = {ord(c) for c in unescape(content.group(1))}
+    needed = {}
+    for element in elements:
+        classes = element.classes
+        for name in (c[3:] for c in classes if c.startswith('fa-')):
+            if name in glyphs:
+                needed.setdefault(font_style(classes), set()).update(glyphs[name])
+    return needed
+
+
+def subset_font(src: Path, dest: Path, codepoints: set[int]) -> int:
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    # Keep head.modified from the source so unchanged inputs give identical files
+    font = TTFont(src, recalcTimestamp=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    font.flavor = 'woff2'
+    font.save(dest)
+    return dest.stat().st_size
+
+
+def font_face_src(node: Node, url: str) -> Node:
+    """``node`` with its src replaced by a single self-hosted woff2."""
+    body = re.sub(r'src\s*:[^;]+', f'src:url({url}) format("woff2")', node.body)
+    return Node(node.prelude, body)
+
+
+def face_file(node: Node) -> str:
+    match = FONT_URL.search(node.body or '')
+    return Path(match.group(1).strip('\'"')).stem if match else ''
+
+
+# Font Awesome ---------------------------------------------------------------
+
+def font_awesome_sources(source_dir: Path | None, force: bool) -> Path:
+    """Directory with css/all.min.css and webfonts/*.woff2."""
+    if source_dir:
+        css = next(source_dir.rglob('all.min.css'), None)
+        if css is None:
+            raise SystemExit(f'No Font Awesome css/all.min.css below {source_dir}')
+        return css.parent.parent
+    base = CACHE_DIR / f'fontawesome-{FA_VERSION}'
+    try:
+        fetch(f'{FA_URL}/css/all.min.css', base / 'css' / 'all.min.css', force)
+        for style in FA_STYLES:
+            fetch(f'{FA_URL}/webfonts/{style}.woff2', base / 'webfonts' / f'{style}.woff2', force)
+    except OSError as e:
+        raise SourcesUnavailable(f'Font Awesome could not be downloaded ({e})') from e
+    return base
+
+
+def build_font_awesome(source_dir: Path | None, force: bool, out_dir: Path) -> tuple[list[Node], list[str]]:
+    """Font Awesome rules for the icons in use; returns (rules, font files written to ``out_dir``)."""
+    base = font_awesome_sources(source_dir, force)
+    nodes = parse_css((base / 'css' / 'all.min.css').read_text(encoding='utf-8'))
+    class_lists, _ = scan_sources()
+    elements = icon_document(class_lists)
+    needed = icon_codepoints(nodes, elements)
+    kept = select(nodes, elements, Matcher(), keep_font_face=lambda node, families: (
+        face_file(node) in needed and font_families(node.body) & families))
+
+    written, rules = [], []
+    for node in kept:
+        style = face_file(node) if node.at_keyword == '@font-face' else ''
+        if style:
+            size = subset_font(base / 'webfonts' / f'{style}.woff2', out_dir / f'{style}.woff2', needed[style])
+            print(f'✓ fonts/{style}.woff2: {len(needed[style])} icons, {size:,} bytes')
+            written.append(f'{style}.woff2')
+            node = font_face_src(node, f'/static/fonts/{style}.woff2')
+        rules.append(node)
+    print(f'✓ Font Awesome: {len(class_lists)} icon class lists, {len(kept)} rules kept of {len(nodes)}')
+    return rules, written
+
+
+# Poppins ----------------------------------------------------------------------
+
+def poppins_weights() -> list[int]:
+    return list(POPPINS_WEIGHTS)
+
+
+def poppins_sources(weights: list[int], source_dir: Path | None, force: bool) -> dict[int, Path]:
+    """Font file per weight, or {} when Poppins is not available offline or online."""
+    if source_dir:
+        local = {p.stem.split('-', 1)[-1]: p for p in source_dir.rglob('Poppins-*.[ot]tf')}
+        found = {w: local[POPPINS_STYLES[w]] for w in weights if POPPINS_STYLES[w] in local}
+        if len(found) == len(weights):
+            return found
+    try:
+        css_path = fetch(POPPINS_CSS_URL.format(weights=';'.join(map(str, weights))),
+                         CACHE_DIR / 'poppins' / f"poppins-{'-'.join(map(str, weights))}.css", force)
+        sources = {}
+        for block in LATIN_BLOCK.findall(css_path.read_text(encoding='utf-8')):
+            weight = int(FONT_WEIGHT.search(block).group(1))
+            url = FONT_URL.search(block).group(1).strip('\'"')
+            sources[weight] = fetch(url, CACHE_DIR / 'poppins' / f'poppins-{weight}.woff2', force)
+        return sources
+    except OSError as e:
+        print(f"Poppins not vendored ({e}); pages load it from Google Fonts without blocking")
+        return {}
+
+
+def build_poppins(source_dir: Path | None, force: bool, out_dir: Path) -> tuple[list[int], list[Node]]:
+    """Returns (weights in use, @font-face rules for the self-hosted ones written to ``out_dir``)."""
+    weights = poppins_weights()
+    sources = poppins_sources(weights, source_dir, force)
+    if not sources and any(FONTS_OUT.glob('poppins-*.woff2')):
+        # Falling back to Google Fonts would drop the faces that are already vendored
+        raise SourcesUnavailable('Poppins is vendored but its sources are unavailable')
+    _, chars = scan_sources()
+    codepoints = BASE_CHARS | {c for c in chars if c >= 0x20}
+    rules = []
+    for weight, src in sorted(sources.items()):
+        name = f'poppins-{weight}.woff2'
+        size = subset_font(src, out_dir / name, codepoints)
+        print(f'✓ fonts/{name}: {size:,} bytes')
+        rules.append(Node('@font-face', f"font-family:'Poppins';font-style:normal;font-weight:{weight};"
+                                        f'font-display:swap;src:url(/static/fonts/{name}) format("woff2")'))
+    return weights, rules
+
+
+# Outputs ----------------------------------------------------------------------
+
+def fonts_partial(weights: list[int], poppins: list[Node], icon_fonts: list[str]) -> str:
+    lines = [f'{{# {GENERATED} #}}']
+    if poppins:
+        for weight in PRELOAD_WEIGHTS:
+            if weight in weights:
+                lines.append(f'<link rel="preload" href="{{{{ url_for(\'static\', filename=\'fonts/poppins-{weight}.woff2\') }}}}" '
+                             'as="font" type="font/woff2" crossorigin>')
+    else:
+        url = POPPINS_CSS_URL.format(weights=';'.join(map(str, weights)))
+        lines += [
+            '<link rel="preconnect" href="https://fonts.googleapis.com">',
+            '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>',
+            f'<link rel="stylesheet" href="{url}" media="print" onload="this.media=\'all\'">',
+            f'<noscript><link rel="stylesheet" href="{url}"></noscript>',
+        ]
+    # The WhatsApp button is on screen from the first paint
+    if 'fa-brands-400.woff2' in icon_fonts:
+        lines.append('<link rel="preload" href="{{ url_for(\'static\', filename=\'fonts/fa-brands-400.woff2\') }}" '
+                     'as="font" type="font/woff2" crossorigin>')
+    return '\n'.join(lines) + '\n'
+
+
+def write_if_changed(path: Path, text: str) -> None:
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    print(f'✓ Wrote {path.relative_to(ROOT)}')
+
+
+def same_font(a: Path, b: Path) -> bool:
+    """True when two fonts differ at most in head.modified and the checksum covering it."""
+    fonts = TTFont(a), TTFont(b)
+    tags = [sorted(font.reader.keys()) for font in fonts]
+    if tags[0] != tags[1]:
+        return False
+    for tag in tags[0]:
+        data = [bytearray(font.reader[tag]) for font in fonts]
+        if tag == 'head':
+            for head in data:
+                head[8:12] = bytes(4)  # checkSumAdjustment
+                head[28:36] = bytes(8)  # modified
+        if data[0] != data[1]:
+            return False
+    return True
+
+
+def replace_fonts(built: Path) -> None:
+    """Move the subsets in ``built`` into static/fonts/ and drop owned files no longer built."""
+    FONTS_OUT.mkdir(parents=True, exist_ok=True)
+    names = {path.name for path in built.iterdir()}
+    for pattern in OWNED:
+        for path in FONTS_OUT.glob(pattern):
+            if path.name not in names:
+                path.unlink()
+                print(f'✓ Removed {path.relative_to(ROOT)}')
+    for name in sorted(names):
+        dest = FONTS_OUT / name
+        # A rebuild from the same source that differs only in its timestamp is not a change
+        if dest.exists() and same_font(dest, built / name):
+            continue
+        shutil.move(built / name, dest)
+
+
+def build(source: Path | None = None, force: bool = False) -> None:
+    """Rebuild every output; raises SourcesUnavailable, writing nothing, when a source is missing."""
+    logging.getLogger('fontTools').setLevel(logging.ERROR)  # table padding warnings
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=CACHE_DIR) as scratch:
+        weights, poppins = build_poppins(source, force, Path(scratch))
+        icons, icon_fonts = build_font_awesome(source, force, Path(scratch))
+        replace_fonts(Path(scratch))
+    write_if_changed(CSS_OUT, f'/* {GENERATED} */\n{render(poppins)}\n{render(icons)}\n')
+    write_if_changed(PARTIAL_OUT, fonts_partial(weights, poppins, icon_fonts))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', type=Path, help='local Font Awesome / Poppins files instead of downloading')
+    parser.add_argument('--force', action='store_true', help='download the sources again')
+    args = parser.parse_args()
+    try:
+        build(args.source, args.force)
+    except SourcesUnavailable as e:
+        print(f'{e}; kept the existing fonts')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Record the size and a placeholder for every image the site serves.
+
+Usage:
+  python tools/build_image_index.py [--jobs N] [--force]
+
+Scans static/img/ (the machines gallery included, generated variants
+excluded) and the images directly under static/ (logos) and writes
+static/img/image-index.json:
+
+  {"img/oven.jpg": {"width": 1024, "height": 683, "color": "#8a6f58",
+                    "lqip": "data:image/webp;base64,...", "hash": "..."}, ...}
+
+  width, height  intrinsic size (SVGs: their width/height or viewBox)
+  color          dominant colour, shown while the image loads
+  lqip           a ~16px WebP preview, stretched over the reserved box
+
+Images with transparency get no colour or preview (they would show
+through once the image is drawn). The ``img()``/``picture()`` template
+helpers (image_index.py, responsive_images.py) read the index to emit
+width/height and the placeholder style. Gallery manifest entries get
+``color`` and ``lqip`` too, for the slides main.js appends.
+
+Unchanged files are skipped (content-hash cache in .build-cache/).
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+ROOT = Path(__file__).resolve().parents[1]
+STATIC = ROOT / 'static'
+IMG_DIR = STATIC / 'img'
+INDEX = IMG_DIR / 'image-index.json'
+GALLERY_MANIFEST = IMG_DIR / 'machines-gallery' / 'manifest.json'
+BUILD_CACHE = ROOT / '.build-cache' / 'image-index.json'
+
+RASTER_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+# Generated by tools/build_responsive_images.py from images that are indexed themselves
+SKIP_DIRS = {IMG_DIR / 'responsive', IMG_DIR / 'machines-gallery' / 'variants'}
+LQIP_SIZE = 16
+LQIP_QUALITY = 40
+SVG_TAG = re.compile(r'<svg\b[^>]*>', re.I)
+SVG_ATTR = re.compile(r'''([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')''')
+SVG_LENGTH = re.compile(r'^\s*([\d.]+)\s*(px)?\s*$')
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def sources() -> list[Path]:
+    found = [p for p in STATIC.iterdir() if p.is_file() and p.suffix.lower() in RASTER_EXTS]
+    for path in IMG_DIR.rglob('*'):
+        if not path.is_file() or any(d in path.parents for d in SKIP_DIRS):
+            continue
+        if path.suffix.lower() in RASTER_EXTS | {'.svg'}:
+            found.append(path)
+    return sorted(found)
+
+
+def svg_record(path: Path) -> dict:
+    # Only the root tag is read; some of our SVGs are not well-formed XML
+    tag = SVG_TAG.search(path.read_text(encoding='utf-8', errors='ignore'))
+    attrs = dict((k, v2 or v1) for k, v1, v2 in SVG_ATTR.findall(tag.group(0))) if tag else {}
+    width, height = (SVG_LENGTH.match(attrs.get(a, '')) for a in ('width', 'height'))
+    if width and height:
+        return {'width': round(float(width.group(1))), 'height': round(float(height.group(1)))}
+    box = attrs.get('viewBox', '').replace(',', ' ').split()
+    if len(box) == 4:
+        return {'width': round(float(box[2])), 'height': round(float(box[3]))}
+    return {}
+
+
+def has_alpha(im: Image.Image) -> bool:
+    if im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info):
+        return im.convert('RGBA').getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def dominant_color(im: Image.Image) -> str:
+    """Most common colour of a 5-colour reduction of a thumbnail."""
+    small = im.convert('RGB').resize((64, 64), Image.Resampling.BOX)
+    quantized = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    return f'#{r:02x}{g:02x}{b:02x}'
+
+
+def lqip(im: Image.Image) -> str:
+    preview = im.convert('RGB')
+    preview.thumbnail((LQIP_SIZE, LQIP_SIZE), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    preview.save(buffer, format='WEBP', quality=LQIP_QUALITY, method=6)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def image_record(path: str) -> dict:
+    path = Path(path)
+    if path.suffix.lower() == '.svg':
+        return svg_record(path)
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im)
+        record = {'width': im.width, 'height': im.height}
+        if not has_alpha(im):
+            record.update(color=dominant_color(im), lqip=lqip(im))
+    return record
+
+
+def load_json(path: Path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def update_gallery(index: dict) -> None:
+    gallery = load_json(GALLERY_MANIFEST, [])
+    folder = GALLERY_MANIFEST.parent.relative_to(STATIC).as_posix()
+    upgraded = []
+    for item in gallery:
+        item = {'file': item} if isinstance(item, str) else dict(item)
+        record = index.get(f"{folder}/{item['file']}", {})
+        for key in ('color', 'lqip'):
+            if key in record:
+                item[key] = record[key]
+            else:
+                item.pop(key, None)
+        upgraded.append(item)
+    if upgraded != gallery:
+        write_json(GALLERY_MANIFEST, upgraded)
+
+
+def build(jobs: int, force: bool = False) -> None:
+    started = time.perf_counter()
+    cache = {} if force else load_json(BUILD_CACHE, {})
+    index, todo = {}, []
+    for path in sources():
+        name = path.relative_to(STATIC).as_posix()
+        digest = file_hash(path)
+        cached = cache.get(name)
+        if cached and cached.get('hash') == digest:
+            index[name] = cached
+        else:
+            todo.append((name, path, digest))
+
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(image_record, str(path)) for _, path, _ in todo]
+        for (name, path, digest), future in zip(todo, futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                print('Failed:', name, '->', e)
+                continue
+            index[name] = dict(record, hash=digest)
+            print(f"Indexed: {name} ({record.get('width')}x{record.get('height')}"
+                  f"{', ' + record['color'] if 'color' in record else ''})")
+
+    index = dict(sorted(index.items()))
+    write_json(INDEX, index)
+    write_json(BUILD_CACHE, index)
+    update_gallery(index)
+    placeholders = sum('lqip' in r for r in index.values())
+    print(f'\nimages: {len(index)}  with placeholders: {placeholders}  indexed: {len(todo)}  '
+          f'in {time.perf_counter() - started:.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the image size/placeholder index.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--force', action='store_true', help='ignore the build cache')
+    args = parser.parse_args()
+    build(args.jobs, args.force)
+
+
+if __name__ == '__main__':
+    main()
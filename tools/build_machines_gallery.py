@@ -1,24 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from PIL import Image, ImageOps
 
+from build_responsive_images import make_variants
+
 """
 Usage (Windows PowerShell):
 
 # Activate your venv if needed, then run:
 python tools/build_machines_gallery.py "C:/Users/Beto/Music/personal_filll/himma group/photos (9)/bakery matchine import"
 
+Options:
+  --jobs N   number of worker processes (default: all cores)
+  --force    ignore the build cache and re-encode every source image
+
 What it does:
 - Copies all images (jpg/jpeg/png/webp) from the source folder into static/img/machines-gallery/
 - Normalizes filenames to safe, lowercase, hyphenated names
 - Converts to JPEG when appropriate and resizes to max 1920px (keeps quality)
-- Writes/updates manifest.json with the resulting filenames
+- Processes images in parallel on all cores and skips sources whose content
+  hash is unchanged since the last run (cache in .build-cache/)
+- Writes WebP (and AVIF where Pillow supports it) variants at several widths
+  into variants/ for srcset (see tools/build_responsive_images.py)
+- Updates manifest.json incrementally with per-image metadata
+  (file, width, height, bytes, hash, variants)
 """
 
 VALID_EXTS = {'.jpg', '.jpeg', '.png', '.webp'}
 DEST_DIR = Path('static/img/machines-gallery')
 MANIFEST = DEST_DIR / 'manifest.json'
+BUILD_CACHE = Path('.build-cache/machines-gallery.json')
+MAX_SIDE = 1920
 
 
 def safe_name(name: str) -> str:
@@ -29,6 +49,27 @@ def safe_name(name: str) -> str:
     return s
 
 
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_info(path: Path) -> dict:
+    """Manifest metadata for an output image (reads only the header)."""
+    with Image.open(path) as im:
+        width, height = im.size
+    return {
+        'file': path.name,
+        'width': width,
+        'height': height,
+        'bytes': path.stat().st_size,
+        'hash': file_hash(path)[:16],
+    }
+
+
 def process_image(src: Path, dest_dir: Path) -> str:
     dest_dir.mkdir(parents=True, exist_ok=True)
     name = safe_name(src.stem) + src.suffix.lower()
@@ -37,7 +78,7 @@ def process_image(src: Path, dest_dir: Path) -> str:
     with Image.open(src) as im:
         im = ImageOps.exif_transpose(im)
         # Resize if too large
-        max_side = 1920
+        max_side = MAX_SIDE
         w, h = im.size
         scale = min(1.0, max_side / max(w, h))
         if scale < 1.0:
@@ -51,7 +92,7 @@ def process_image(src: Path, dest_dir: Path) -> str:
             out_path = dest_dir / out_name
             im.save(out_path)
         else:
-            if im.mode in ('RGBA', 'LA'):
+            if im.mode not in ('RGB', 'L'):
                 im = im.convert('RGB')
             out_name = safe_name(src.stem) + '.jpg'
             out_path = dest_dir / out_name
@@ -60,38 +101,126 @@ def process_image(src: Path, dest_dir: Path) -> str:
     return out_path.name
 
 
+def build_one(src: Path, dest_dir: Path, cached: dict | None) -> dict:
+    """Worker task: hash the source, then re-encode it unless the cache is current."""
+    started = time.perf_counter()
+    source_hash = file_hash(src)
+    if cached and cached.get('source_hash') == source_hash and (dest_dir / cached['file']).exists():
+        return {'src': str(src), 'skipped': True, 'source_hash': source_hash,
+                'info': cached['info'], 'file': cached['file'],
+                'seconds': time.perf_counter() - started}
+
+    out = process_image(src, dest_dir)
+    info = image_info(dest_dir / out)
+    info['variants'] = make_variants(dest_dir / out, dest_dir / 'variants',
+                                     static_root=dest_dir.parent.parent)['variants']
+    return {'src': str(src), 'skipped': False, 'source_hash': source_hash,
+            'info': info, 'file': out,
+            'seconds': time.perf_counter() - started}
+
+
+def load_json(path: Path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def update_manifest(results: list[dict]) -> list[dict]:
+    """Merge new results into manifest.json, dropping files that no longer exist.
+
+    Older manifests listed bare filenames; those entries are upgraded to
+    full metadata records here.
+    """
+    entries = {}
+    for item in load_json(MANIFEST, []):
+        if isinstance(item, str):
+            item = {'file': item}
+        entries[item['file']] = item
+    for result in results:
+        entries[result['file']] = result['info']
+
+    manifest = []
+    for name in sorted(entries):
+        path = DEST_DIR / name
+        if not path.exists():
+            continue
+        item = entries[name]
+        if 'hash' not in item or item.get('bytes') != path.stat().st_size:
+            item = {**item, **image_info(path)}
+        manifest.append(item)
+
+    with open(MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def source_files(src_dir: Path) -> list[Path]:
+    return sorted(p for p in src_dir.iterdir() if p.suffix.lower() in VALID_EXTS)
+
+
+def build(src_dir: Path, jobs: int, force: bool = False) -> None:
+    files = source_files(src_dir)
+    if not files:
+        print('No supported image files found in the source directory.')
+        return
+
+    DEST_DIR.mkdir(parents=True, exist_ok=True)
+    BUILD_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    cache = {} if force else load_json(BUILD_CACHE, {})
+
+    started = time.perf_counter()
+    results, failed = [], 0
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(build_one, fp, DEST_DIR, cache.get(str(fp))): fp for fp in files}
+        for future in as_completed(futures):
+            fp = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print('Failed:', fp, '->', e)
+                continue
+            results.append(result)
+            cache[result['src']] = {'source_hash': result['source_hash'],
+                                    'file': result['file'], 'info': result['info']}
+            if not result['skipped']:
+                print(f"Added: {result['file']} ({result['seconds'] * 1000:.0f} ms)")
+
+    with open(BUILD_CACHE, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+    manifest = update_manifest(results)
+    wall = time.perf_counter() - started
+
+    built = [r for r in results if not r['skipped']]
+    busy = sum(r['seconds'] for r in results)
+    print(f'\nWrote manifest with {len(manifest)} images at {MANIFEST}')
+    print(f'Sources: {len(files)}  built: {len(built)}  unchanged: {len(results) - len(built)}  failed: {failed}')
+    print(f'Time: {wall:.2f} s wall, {busy:.2f} s in workers ({jobs} jobs, '
+          f'{busy / wall if wall else 0:.1f}x parallelism)')
+    if built:
+        print(f'Per built image: {sum(r["seconds"] for r in built) / len(built) * 1000:.0f} ms avg')
+
+
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Build the machines gallery from a folder of photos.')
+    parser.add_argument('source', nargs='?', help='folder with supplier photos')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--force', action='store_true', help='ignore the build cache')
+    args = parser.parse_args()
+
+    if not args.source:
         print('Please provide a source folder path with images.')
         print('Example: python tools/build_machines_gallery.py "C:/path/to/bakery matchine import"')
         sys.exit(1)
 
-    src_dir = Path(sys.argv[1])
+    src_dir = Path(args.source)
     if not src_dir.exists() or not src_dir.is_dir():
         print(f'Source not found: {src_dir}')
         sys.exit(1)
 
-    files = [p for p in src_dir.iterdir() if p.suffix.lower() in VALID_EXTS]
-    if not files:
-        print('No supported image files found in the source directory.')
-        sys.exit(0)
-
-    DEST_DIR.mkdir(parents=True, exist_ok=True)
-
-    result = []
-    for fp in files:
-        try:
-            out = process_image(fp, DEST_DIR)
-            result.append(out)
-            print('Added:', out)
-        except Exception as e:
-            print('Failed:', fp, '->', e)
-
-    # Write manifest
-    import json
-    with open(MANIFEST, 'w', encoding='utf-8') as f:
-        json.dump(sorted(result), f, ensure_ascii=False, indent=2)
-    print('\nWrote manifest with', len(result), 'images at', MANIFEST)
+    build(src_dir, args.jobs, args.force)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+"""
+Generate responsive WebP/AVIF variants for the site's raster images.
+
+Usage:
+  python tools/build_responsive_images.py [--jobs N] [--force]
+
+For every JPEG/PNG directly under static/img/ it writes
+static/img/responsive/<name>-<ext>-<width>.<webp|avif> at each width in
+WIDTHS that is smaller than the original (plus one full-width copy); the
+source extension keeps foo.jpg and foo.png from sharing outputs. It records
+them in static/img/responsive/index.json, which the `picture()` template
+helper reads to emit <picture>/srcset markup.
+
+The machines gallery is handled the same way: variants go to
+static/img/machines-gallery/variants/ and are recorded on each entry of
+the gallery's manifest.json, which main.js uses to build srcset.
+
+AVIF is produced only when the installed Pillow can encode it.
+Unchanged sources are skipped (content-hash cache in .build-cache/).
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+ROOT = Path(__file__).resolve().parents[1]
+IMG_DIR = ROOT / 'static' / 'img'
+OUT_DIR = IMG_DIR / 'responsive'
+INDEX = OUT_DIR / 'index.json'
+GALLERY_DIR = IMG_DIR / 'machines-gallery'
+GALLERY_MANIFEST = GALLERY_DIR / 'manifest.json'
+GALLERY_OUT_DIR = GALLERY_DIR / 'variants'
+BUILD_CACHE = ROOT / '.build-cache' / 'responsive-images.json'
+
+SOURCE_EXTS = {'.jpg', '.jpeg', '.png'}
+WIDTHS = (480, 960, 1440)
+QUALITY = {'webp': 80, 'avif': 55}
+MIME = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def available_formats() -> tuple[str, ...]:
+    formats = ['webp'] if features.check('webp') else []
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+    return tuple(formats)
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def target_widths(width: int) -> list[int]:
+    """Widths to generate for an image; never upscales."""
+    return [w for w in WIDTHS if w < width] + [width]
+
+
+def variant_stem(src: Path) -> str:
+    """``foo.jpg`` -> ``foo-jpg``, so sources differing only in extension get distinct variants."""
+    return f'{src.stem}-{src.suffix[1:].lower()}'
+
+
+def make_variants(src: Path, out_dir: Path, formats: tuple[str, ...] | None = None,
+                  static_root: Path = ROOT / 'static') -> dict:
+    """Write every width/format variant of ``src`` into ``out_dir``.
+
+    Returns the index record: intrinsic size plus one entry per variant
+    with its path relative to ``static_root``, width, MIME type and byte size.
+    """
+    formats = available_formats() if formats is None else formats
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_dir, static_root = out_dir.resolve(), static_root.resolve()
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA' if 'transparency' in im.info or im.mode in ('LA', 'PA') else 'RGB')
+        width, height = im.size
+        variants = []
+        for w in target_widths(width):
+            resized = im if w == width else im.resize((w, round(height * w / width)), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                out = out_dir / f'{variant_stem(src)}-{w}.{fmt}'
+                options = {'quality': QUALITY[fmt]}
+                if fmt == 'webp':
+                    options['method'] = 6
+                resized.save(out, format=fmt.upper(), **options)
+                variants.append({
+                    'file': out.relative_to(static_root).as_posix(),
+                    'width': w,
+                    'type': MIME[fmt],
+                    'bytes': out.stat().st_size,
+                })
+    return {'width': width, 'height': height, 'variants': variants}
+
+
+def _job(src: str, out_dir: str, formats: tuple[str, ...]) -> tuple[str, dict, float]:
+    started = time.perf_counter()
+    record = make_variants(Path(src), Path(out_dir), formats)
+    return src, record, time.perf_counter() - started
+
+
+def load_json(path: Path, default):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def build(jobs: int, force: bool = False) -> None:
+    formats = available_formats()
+    if not formats:
+        raise SystemExit('Pillow was built without WebP support; cannot generate variants.')
+
+    cache = {} if force else load_json(BUILD_CACHE, {})
+    tasks = {}  # source path -> output directory
+    for path in sorted(IMG_DIR.iterdir()):
+        if path.is_file() and path.suffix.lower() in SOURCE_EXTS:
+            tasks[path] = OUT_DIR
+    gallery = load_json(GALLERY_MANIFEST, [])
+    for item in gallery:
+        name = item if isinstance(item, str) else item['file']
+        tasks[GALLERY_DIR / name] = GALLERY_OUT_DIR
+
+    started = time.perf_counter()
+    records, todo, built = {}, [], 0
+    for src, out_dir in tasks.items():
+        key = src.relative_to(ROOT).as_posix()
+        digest = file_hash(src)
+        cached = cache.get(key)
+        if (cached and cached['hash'] == digest and cached['formats'] == list(formats)
+                and all((ROOT / 'static' / v['file']).exists() for v in cached['record']['variants'])):
+            records[src] = cached['record']
+        else:
+            todo.append((src, out_dir, digest))
+
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(_job, str(src), str(out_dir), formats) for src, out_dir, _ in todo]
+        for (src, _, digest), future in zip(todo, futures):
+            try:
+                _, record, seconds = future.result()
+            except Exception as e:
+                print('Failed:', src.relative_to(ROOT), '->', e)
+                continue
+            records[src] = record
+            built += 1
+            cache[src.relative_to(ROOT).as_posix()] = {'hash': digest, 'formats': list(formats), 'record': record}
+            print(f'Built: {src.relative_to(ROOT)} ({len(record["variants"])} variants, {seconds * 1000:.0f} ms)')
+
+    index = {
+        src.relative_to(ROOT / 'static').as_posix(): record
+        for src, record in sorted(records.items())
+        if tasks[src] == OUT_DIR
+    }
+    write_json(INDEX, index)
+
+    upgraded = []
+    for item in gallery:
+        item = {'file': item} if isinstance(item, str) else dict(item)
+        record = records.get(GALLERY_DIR / item['file'])
+        if record:
+            item['variants'] = record['variants']
+        upgraded.append(item)
+    write_json(GALLERY_MANIFEST, upgraded)
+    write_json(BUILD_CACHE, cache)
+
+    print(f'\nFormats: {", ".join(formats)}  images: {len(records)}  built: {built}  '
+          f'in {time.perf_counter() - started:.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate responsive image variants.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--force', action='store_true', help='ignore the build cache')
+    args = parser.parse_args()
+    build(args.jobs, args.force)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,10 +6,16 @@ src = ROOT / 'static' / 'logo.png'
 dst_dir = ROOT / 'static' / 'img'
 dst = dst_dir / 'logo.png'
 
-if not src.exists():
-    print(f"Source logo not found: {src}")
-    raise SystemExit(1)
 
-dst_dir.mkdir(parents=True, exist_ok=True)
-shutil.copy2(src, dst)
-print(f"Copied {src} -> {dst}")
+def copy_logo():
+    if not src.exists():
+        print(f"Source logo not found: {src}")
+        raise SystemExit(1)
+
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(src, dst)
+    print(f"Copied {src} -> {dst}")
+
+
+if __name__ == '__main__':
+    copy_logo()
@@ -0,0 +1,333 @@
+"""
+Select the CSS rules a set of HTML elements actually needs.
+
+Shared by tools/build_fonts.py (which Font Awesome rules and glyphs the
+templates use) and tools/build_critical_css.py (which styles.css rules
+the above-the-fold part of each page uses).
+
+The parser understands what our stylesheets contain: plain rules,
+@media/@supports blocks, @font-face, @keyframes and @import. Selector
+matching handles type, class, id and attribute selectors with the
+descendant, child and sibling combinators. Pseudo-classes and pseudo-
+elements are ignored, so a rule is kept if it could apply in some state
+(hover, open menu, ...). Selection therefore errs on the side of keeping
+a rule.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+GROUPING_AT_RULES = ('@media', '@supports')
+
+COMMENT = re.compile(r'/\*.*?\*/', re.S)
+PSEUDO = re.compile(r'::?[a-zA-Z-]+(?:\((?:[^()]|\([^()]*\))*\))?')
+COMBINATOR = re.compile(r'\s*([>+~])\s*|\s+')
+SIMPLE = re.compile(r'(\*|[a-zA-Z][\w-]*)|#([\w-]+)|\.([\w-]+)|\[\s*([\w-]+)[^\]]*\]')
+FONT_FAMILY = re.compile(r'font-family\s*:\s*([^;}]+)')
+QUOTED = re.compile(r'"([^"]+)"|\'([^\']+)\'')
+ANIMATION = re.compile(r'animation(?:-name)?\s*:\s*([^;}]+)')
+
+
+# HTML ---------------------------------------------------------------------
+
+@dataclass(eq=False)
+class Element:
+    tag: str
+    attrs: dict = field(default_factory=dict)
+    parent: Element | None = None
+    children: list = field(default_factory=list)
+
+    @property
+    def classes(self) -> set[str]:
+        return set((self.attrs.get('class') or '').split())
+
+    def iter(self):
+        yield self
+        for child in self.children:
+            yield from child.iter()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def previous_siblings(self):
+        if self.parent is None:
+            return []
+        siblings = self.parent.children
+        return siblings[:siblings.index(self)][::-1]
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element('#document')
+        self.stack = [self.root]
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, {name: value or '' for name, value in attrs}, self.stack[-1])
+        self.stack[-1].children.append(element)
+        if tag not in VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        # Close up to the matching open element (tolerates unclosed <p>/<li>)
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].tag == tag:
+                del self.stack[i:]
+                break
+
+    def handle_data(self, data):
+        if self.stack[-1].tag not in ('script', 'style'):
+            self.text.append(data)
+
+
+def parse_html(html: str) -> tuple[Element, str]:
+    """Return the document tree and its visible text."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root, ''.join(builder.text)
+
+
+# CSS ----------------------------------------------------------------------
+
+@dataclass
+class Node:
+    prelude: str              # selector list or at-rule prelude
+    body: str | None = None   # declarations (None for @import-style statements)
+    children: list | None = None  # nested nodes for @media/@supports
+
+    @property
+    def at_keyword(self) -> str:
+        return self.prelude.split(None, 1)[0].lower() if self.prelude.startswith('@') else ''
+
+    def render(self) -> str:
+        if self.children is not None:
+            return f"{self.prelude}{{{''.join(child.render() for child in self.children)}}}"
+        if self.body is None:
+            return self.prelude + ';'
+        return f'{self.prelude}{{{self.body}}}'
+
+
+def _block_end(css: str, start: int) -> int:
+    """Index of the brace closing the block opened at ``start``."""
+    depth, quote, i = 0, None, start
+    while i < len(css):
+        ch = css[i]
+        if quote:
+            if ch == '\\':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in '"\'':
+            quote = ch
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError('unbalanced braces in stylesheet')
+
+
+def _squash(text: str) -> str:
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def parse_css(css: str) -> list[Node]:
+    css = COMMENT.sub('', css)
+    nodes, i = [], 0
+    while i < len(css):
+        brace, semicolon = css.find('{', i), css.find(';', i)
+        if brace == -1 and semicolon == -1:
+            break
+        if css[i:].lstrip().startswith('@') and semicolon != -1 and (brace == -1 or semicolon < brace):
+            nodes.append(Node(_squash(css[i:semicolon])))
+            i = semicolon + 1
+            continue
+        if brace == -1:
+            break
+        end = _block_end(css, brace)
+        prelude, body = _squash(css[i:brace]), css[brace + 1:end]
+        if prelude.lower().startswith(GROUPING_AT_RULES):
+            nodes.append(Node(prelude, children=parse_css(body)))
+        else:
+            nodes.append(Node(prelude, _squash(body)))
+        i = end + 1
+    return nodes
+
+
+def split_selectors(prelude: str) -> list[str]:
+    """Split a selector list on top-level commas."""
+    parts, depth, current = [], 0, []
+    for ch in prelude:
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(ch)
+    parts.append(''.join(current).strip())
+    return [p for p in parts if p]
+
+
+def font_families(body: str) -> set[str]:
+    """Family names in ``font-family`` declarations (including var() fallbacks)."""
+    families = set()
+    for value in FONT_FAMILY.findall(body):
+        families.update(a or b for a, b in QUOTED.findall(value))
+        families.update(name.strip() for name in value.split(',')
+                        if name.strip() and not re.search(r'["\'()]', name))
+    return families
+
+
+# Selector matching ----------------------------------------------------------
+
+@dataclass
+class Compound:
+    tag: str | None
+    ids: tuple
+    classes: tuple
+    attrs: tuple
+
+
+def _compound(text: str) -> Compound:
+    tag, ids, classes, attrs = None, [], [], []
+    for t, i, c, a in SIMPLE.findall(text):
+        if t:
+            tag = None if t == '*' else t.lower()
+        elif i:
+            ids.append(i)
+        elif c:
+            classes.append(c)
+        elif a:
+            attrs.append(a.lower())
+    return Compound(tag, tuple(ids), tuple(classes), tuple(attrs))
+
+
+def parse_selector(selector: str) -> list[tuple[str, Compound]]:
+    """``[(combinator, compound), ...]`` left to right; the first combinator is ''."""
+    selector = re.sub(r':root\b', 'html', selector)
+    selector = re.sub(r':host\b', '', selector)
+    selector = PSEUDO.sub('', selector).strip()
+    if not selector:
+        selector = '*'
+    parts, combinator, pos = [], '', 0
+    for match in COMBINATOR.finditer(selector):
+        if match.start() > pos:
+            parts.append((combinator, _compound(selector[pos:match.start()])))
+            combinator = (match.group(1) or ' ')
+        elif match.group(1):
+            combinator = match.group(1)
+        pos = match.end()
+    if pos < len(selector):
+        parts.append((combinator, _compound(selector[pos:])))
+    return parts or [('', Compound(None, (), (), ()))]
+
+
+class Matcher:
+    """Matches selectors against elements.
+
+    ``assume_classes``/``assume_attrs`` name classes and attributes that
+    scripts add at runtime; compounds requiring them still match.
+    """
+
+    def __init__(self, assume_classes=(), assume_attrs=()):
+        self.assume_classes = set(assume_classes)
+        self.assume_attrs = set(assume_attrs)
+        self._parsed = {}
+
+    def _compound_matches(self, element: Element, compound: Compound) -> bool:
+        if element.tag.startswith('#'):
+            return False
+        if compound.tag and compound.tag != element.tag:
+            return False
+        if any(element.attrs.get('id') != i for i in compound.ids):
+            return False
+        classes = element.classes
+        if any(c not in classes and c not in self.assume_classes for c in compound.classes):
+            return False
+        return all(a in element.attrs or a in self.assume_attrs for a in compound.attrs)
+
+    def _matches_at(self, element: Element, parts, index: int) -> bool:
+        combinator, compound = parts[index]
+        if not self._compound_matches(element, compound):
+            return False
+        if index == 0:
+            return True
+        if combinator == '>':
+            return element.parent is not None and self._matches_at(element.parent, parts, index - 1)
+        if combinator == '+':
+            siblings = element.previous_siblings()
+            return bool(siblings) and self._matches_at(siblings[0], parts, index - 1)
+        if combinator == '~':
+            return any(self._matches_at(s, parts, index - 1) for s in element.previous_siblings())
+        return any(self._matches_at(a, parts, index - 1) for a in element.ancestors())
+
+    def matches(self, element: Element, selector: str) -> bool:
+        parts = self._parsed.get(selector)
+        if parts is None:
+            parts = self._parsed[selector] = parse_selector(selector)
+        return self._matches_at(element, parts, len(parts) - 1)
+
+    def any_match(self, elements, selector: str) -> bool:
+        return any(self.matches(element, selector) for element in elements)
+
+
+def select(nodes: list[Node], elements: list[Element], matcher: Matcher,
+           keep_font_face=None) -> list[Node]:
+    """Rules (and the @font-face/@keyframes they use) matching ``elements``.
+
+    ``keep_font_face(node, families)`` decides on @font-face rules; by
+    default one is kept when a kept rule names its font family.
+    """
+    def rules(items):
+        kept = []
+        for node in items:
+            if node.children is not None:
+                children = rules(node.children)
+                if children:
+                    kept.append(Node(node.prelude, children=children))
+            elif node.at_keyword:
+                continue
+            else:
+                selectors = [s for s in split_selectors(node.prelude) if matcher.any_match(elements, s)]
+                if selectors:
+                    kept.append(Node(','.join(selectors), node.body))
+        return kept
+
+    kept = rules(nodes)
+    bodies = ' '.join(n.render() for n in kept)
+    families = font_families(bodies)
+    animations = set(re.findall(r'[\w-]+', ' '.join(ANIMATION.findall(bodies))))
+    extras = []
+    for node in nodes:
+        keyword = node.at_keyword
+        if keyword == '@font-face':
+            node_families = font_families(node.body or '')
+            if keep_font_face(node, families) if keep_font_face else node_families & families:
+                extras.append(node)
+        elif keyword == '@keyframes' or keyword.endswith('-keyframes'):
+            if node.prelude.split(None, 1)[-1].strip() in animations:
+                extras.append(node)
+    return extras + kept
+
+
+def render(nodes: list[Node]) -> str:
+    return ''.join(node.render() for node in nodes)
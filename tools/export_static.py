@@ -3,21 +3,39 @@ Export Flask-rendered pages to a static site (dist/ folder).
 
 Usage (Windows PowerShell):
   # Activate your venv first if needed
-  # python tools/export_static.py
+  # python tools/export_static.py [--jobs N] [--clean]
 
-It will create:
+It will create one file per parameterless GET route in app.url_map (minus
+SITEMAP_EXCLUDE_PREFIXES such as /api/ and /metrics), e.g.:
   dist/index.html
   dist/company/machines.html
   dist/company/materials.html
   dist/company/coffee.html
-and copy the /static folder to dist/static.
+  dist/sitemap.xml
+and mirror the /static and /assets folders into dist/ (including the
+fingerprinted names from static/asset-manifest.json).
+
+The export is incremental: pages are rendered concurrently and only
+rewritten when their bytes change; static files are hard-linked (or
+copied, across filesystems) only when their size/mtime or content hash
+changed, and files that no longer exist in the source are deleted.
+Text assets get precompressed .gz (and .br, if the brotli package is
+installed) siblings. State is kept in dist/.export-state.json; pass
+--clean to start from scratch.
 
 Upload the contents of dist/ to your hosting document root to
 serve the same pages you see locally from Flask.
 """
 from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
 import os
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import sys
@@ -27,48 +45,199 @@ if str(BASE_DIR) not in sys.path:
 
 from app import app  # reuse the Flask app and templates
 
-DIST = Path('dist')
-ROUTES = {
-    '/': 'index.html',
-    '/company/machines': 'company/machines.html',
-    '/company/materials': 'company/materials.html',
-    '/company/coffee': 'company/coffee.html',
-}
+try:
+    import brotli
+except ImportError:  # optional: .br siblings are skipped without it
+    brotli = None
+
+DIST = BASE_DIR / 'dist'
+STATE_FILE = DIST / '.export-state.json'
+COMPRESSIBLE = {'.html', '.css', '.js', '.json', '.xml', '.svg', '.txt', '.ico', '.md'}
+MIN_COMPRESS_SIZE = 512
 
 
 def ensure_parent(path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def export_pages() -> None:
-    # Clean dist folder
-    if DIST.exists():
+def discover_routes() -> dict[str, str]:
+    """Map every parameterless GET page route to its output file."""
+    routes = {}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static' or rule.arguments or 'GET' not in rule.methods:
+            continue
+        if rule.rule.startswith(tuple(app.config['SITEMAP_EXCLUDE_PREFIXES'])):
+            continue
+        path = rule.rule.strip('/')
+        if not path:
+            out_rel = 'index.html'
+        elif Path(path).suffix:
+            out_rel = path
+        else:
+            out_rel = path + '.html'
+        routes[rule.rule] = out_rel
+    return dict(sorted(routes.items()))
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def render(route: str) -> bytes:
+    # One test client per task; rendering runs concurrently in threads
+    with app.test_client() as client:
+        resp = client.get(route)
+        if resp.status_code != 200:
+            raise RuntimeError(f"Route {route} returned {resp.status_code}")
+        return resp.data
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except OSError:
+        pass
+    ensure_parent(path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    ensure_parent(dst)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def compressed_siblings(path: Path, data: bytes) -> dict[Path, bytes]:
+    out = {path.with_name(path.name + '.gz'): gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out[path.with_name(path.name + '.br')] = brotli.compress(data, quality=11)
+    return out
+
+
+def static_sources() -> dict[str, Path]:
+    """dist-relative name -> source file for static/, its fingerprinted aliases and assets/."""
+    sources = {}
+    static_root = Path(app.static_folder)
+    for path in static_root.rglob('*'):
+        # Precompressed siblings in static/ are regenerated below
+        if path.is_file() and path.suffix not in ('.gz', '.br'):
+            sources['static/' + path.relative_to(static_root).as_posix()] = path
+    manifest = static_root / 'asset-manifest.json'
+    if manifest.exists():
+        assets = json.loads(manifest.read_text(encoding='utf-8')).get('assets', {})
+        for name, hashed in assets.items():
+            if 'static/' + name in sources:
+                sources['static/' + hashed] = sources['static/' + name]
+    assets_root = BASE_DIR / 'assets'
+    if assets_root.exists():
+        for path in assets_root.rglob('*'):
+            if path.is_file():
+                sources['assets/' + path.relative_to(assets_root).as_posix()] = path
+    return sources
+
+
+def export_pages(jobs: int = os.cpu_count() or 4, clean: bool = False) -> None:
+    started = time.perf_counter()
+    if clean and DIST.exists():
         shutil.rmtree(DIST)
     DIST.mkdir(parents=True, exist_ok=True)
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        state = {}
 
-    # Use Flask test client to render full pages (with correct url_for paths)
-    with app.test_client() as client:
-        for route, out_rel in ROUTES.items():
-            resp = client.get(route)
-            if resp.status_code != 200:
-                raise RuntimeError(f"Route {route} returned {resp.status_code}")
-            out_path = DIST / out_rel
-            ensure_parent(out_path)
-            out_path.write_bytes(resp.data)
+    expected = {STATE_FILE}
+    to_compress: list[tuple[Path, bytes | None]] = []
+    stats = {'rendered': 0, 'linked': 0, 'unchanged': 0, 'deleted': 0, 'compressed': 0}
+
+    # Render pages concurrently; write only those whose bytes changed
+    routes = discover_routes()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pages = dict(zip(routes, pool.map(render, routes)))
+    for route, out_rel in routes.items():
+        out_path = DIST / out_rel
+        expected.add(out_path)
+        if write_if_changed(out_path, pages[route]):
+            stats['rendered'] += 1
             print(f"✓ Exported {route} -> {out_rel}")
+            to_compress.append((out_path, pages[route]))
+
+    # Mirror static/ and assets/: link files whose size/mtime and hash changed
+    new_state = {}
+    for rel, src in static_sources().items():
+        dst = DIST / rel
+        expected.add(dst)
+        st = src.stat()
+        old = state.get(rel)
+        if old and old[0] == st.st_size and old[1] == st.st_mtime_ns and dst.exists():
+            new_state[rel] = old
+            stats['unchanged'] += 1
+            continue
+        digest = file_hash(src)
+        new_state[rel] = [st.st_size, st.st_mtime_ns, digest]
+        if old and old[2] == digest and dst.exists():
+            stats['unchanged'] += 1
+            continue
+        link_or_copy(src, dst)
+        stats['linked'] += 1
+        to_compress.append((dst, None))
+
+    # Precompressed siblings for text assets (new, changed or missing)
+    for path in list(expected):
+        if (path.suffix in COMPRESSIBLE and path != STATE_FILE
+                and path.stat().st_size >= MIN_COMPRESS_SIZE):
+            siblings = [path.with_name(path.name + ext) for ext in ('.gz', '.br')]
+            if brotli is None:
+                siblings = siblings[:1]
+            expected.update(siblings)
+            if any(not s.exists() for s in siblings) and (path, None) not in to_compress:
+                to_compress.append((path, None))
+
+    def compress(item: tuple[Path, bytes | None]) -> int:
+        path, data = item
+        if path.suffix not in COMPRESSIBLE:
+            return 0
+        data = path.read_bytes() if data is None else data
+        if len(data) < MIN_COMPRESS_SIZE:
+            return 0
+        for sibling, body in compressed_siblings(path, data).items():
+            write_if_changed(sibling, body)
+        return 1
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        stats['compressed'] = sum(pool.map(compress, to_compress))
 
-    # Copy static assets
-    src_static = Path(app.static_folder)
-    dst_static = DIST / 'static'
-    shutil.copytree(src_static, dst_static)
-    print(f"✓ Copied static -> {dst_static}")
+    # Delete anything in dist/ that is no longer produced
+    for path in sorted(DIST.rglob('*'), reverse=True):
+        if path.is_file() and path not in expected:
+            path.unlink()
+            stats['deleted'] += 1
+        elif path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
 
-    # Optionally copy assets/ if you want to keep the alternative static site
-    if Path('assets').exists():
-        shutil.copytree('assets', DIST / 'assets', dirs_exist_ok=True)
-        print("✓ Copied assets -> dist/assets")
+    STATE_FILE.write_text(json.dumps(new_state), encoding='utf-8')
+    print(f"✓ {len(routes)} pages ({stats['rendered']} changed), "
+          f"{stats['linked']} files linked, {stats['unchanged']} unchanged, "
+          f"{stats['deleted']} deleted, {stats['compressed']} compressed "
+          f"in {time.perf_counter() - started:.2f} s")
 
 
 if __name__ == '__main__':
-    export_pages()
+    parser = argparse.ArgumentParser(description='Export the Flask site to dist/.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help='worker threads')
+    parser.add_argument('--clean', action='store_true', help='delete dist/ and export from scratch')
+    args = parser.parse_args()
+    export_pages(args.jobs, args.clean)
     print("\nStatic export complete. Upload the 'dist' folder contents to your host.")
@@ -0,0 +1,211 @@
+"""
+Fingerprint every file under static/ and regenerate the service worker.
+
+Usage:
+  python tools/fingerprint_static.py
+
+Writes:
+  static/asset-manifest.json   {"assets": {"css/styles.css": "css/styles.<hash>.css", ...}}
+  static/sw.js                 rendered from tools/sw.template.js
+  static/**/<name>.gz, .br     precompressed text assets (.br needs brotli)
+
+The app (asset_manifest.py) resolves url_for('static', ...) through the
+manifest and serves fingerprinted names from the original files with an
+immutable, one-year Cache-Control, so no copies are written here.
+The service worker's PRECACHE_ASSETS and CACHE_NAME come from the same
+manifest, and its runtime caching from RUNTIME_ROUTES below. compression.py
+sends the .gz/.br siblings to clients that accept them. Run this after
+changing anything under static/.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from jinja2 import Template
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written
+    brotli = None
+
+ROOT = Path(__file__).resolve().parents[1]
+STATIC = ROOT / 'static'
+MANIFEST = STATIC / 'asset-manifest.json'
+SW_TEMPLATE = ROOT / 'tools' / 'sw.template.js'
+SW_OUT = STATIC / 'sw.js'
+HASH_LEN = 10
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.txt', '.xml', '.html', '.ico'}
+MIN_COMPRESS_SIZE = 512
+
+# Files that must keep a stable URL (fetched by name, not through url_for)
+UNHASHED = {
+    'asset-manifest.json',
+    'sw.js',
+    'img/machines-gallery/manifest.json',
+}
+
+# url(/static/...) references inside stylesheets; these stay unhashed so that
+# template preloads and the CSS request the same URL
+CSS_URL = re.compile(r"""url\(\s*['"]?/static/([^'")?#]+)""")
+
+# Precached on service worker install (logical names under static/)
+PRECACHE = [
+    'css/fonts.css',
+    'css/styles.css',
+    'js/main.js',
+    # Self-hosted icon fonts (tools/build_fonts.py)
+    'fonts/fa-solid-900.woff2',
+    'fonts/fa-brands-400.woff2',
+    'logo.png',
+    'logo-192.png',
+    'logo-512.png',
+    'manifest.json',
+    # Hero slider images
+    'img/slider-warehouse.jpg',
+    'img/slider-roaster.jpg',
+    'img/slider-kitchen.jpg',
+    # Machines gallery manifest (images are cached on demand)
+    'img/machines-gallery/manifest.json',
+]
+
+STRATEGIES = ('networkFirst', 'cacheFirst', 'staleWhileRevalidate')
+
+
+@dataclass(frozen=True)
+class CacheRoute:
+    """A class of same-origin GET requests and how the service worker caches it."""
+
+    name: str                 # runtime cache is 'himma-<name>'
+    strategy: str             # one of STRATEGIES
+    pattern: str              # regex matched against the URL path
+    navigate: bool = False    # match page navigations only
+    max_entries: int = 50     # least recently used entries are evicted first
+    max_age: int = 0          # seconds before a cached entry is revalidated (0 = never)
+    timeout: float = 0        # networkFirst: seconds to wait before using the cache
+
+    def to_js(self) -> dict:
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f'{self.name}: unknown strategy {self.strategy!r}')
+        return {
+            'cache': f'himma-{self.name}',
+            'strategy': self.strategy,
+            'pattern': self.pattern,
+            'navigate': self.navigate,
+            'maxEntries': self.max_entries,
+            'maxAge': self.max_age,
+            'timeout': self.timeout,
+        }
+
+
+# Runtime caching, first match wins; anything else (the API, /metrics,
+# other origins) is left to the browser. Revalidation uses conditional
+# requests, so an unchanged resource costs a 304 and no body.
+RUNTIME_ROUTES = [
+    # HTML: fresh when the network answers in time, cached copy (or the
+    # precached home page) otherwise
+    CacheRoute('pages', 'networkFirst', r'^/(?!api/|metrics$|static/)', navigate=True,
+               max_entries=25, timeout=3),
+    # Gallery and other images: capped so they cannot fill the device
+    CacheRoute('images', 'cacheFirst', r'^/static/img/.+\.(?:avif|webp|jpe?g|png|gif|svg)$',
+               max_entries=60, max_age=30 * 24 * 3600),
+    # Fingerprinted assets never change under the same URL
+    CacheRoute('assets', 'cacheFirst', rf'^/static/.+\.[0-9a-f]{{{HASH_LEN}}}\.[^/.]+$',
+               max_entries=60),
+    # Everything else under /static/ keeps a stable name (gallery manifest,
+    # app manifest, files referenced from CSS)
+    CacheRoute('static', 'staleWhileRevalidate', r'^/static/', max_entries=40),
+]
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    path = Path(name)
+    return path.with_name(f'{path.stem}.{digest[:HASH_LEN]}{path.suffix}').as_posix()
+
+
+def css_references() -> set[str]:
+    names = set()
+    for css in STATIC.rglob('*.css'):
+        names.update(CSS_URL.findall(css.read_text(encoding='utf-8', errors='replace')))
+    return names
+
+
+def build_manifest() -> dict[str, str]:
+    assets = {}
+    unhashed = UNHASHED | css_references()
+    for path in sorted(STATIC.rglob('*')):
+        if not path.is_file():
+            continue
+        name = path.relative_to(STATIC).as_posix()
+        if name in unhashed or name.startswith('.') or path.suffix in ('.gz', '.br'):
+            continue
+        assets[name] = fingerprinted_name(name, file_hash(path))
+    return assets
+
+
+def precache_urls(assets: dict[str, str]) -> list[str]:
+    return ['/'] + [f'/static/{assets.get(name, name)}' for name in PRECACHE]
+
+
+def write_service_worker(assets: dict[str, str]) -> str:
+    urls = precache_urls(assets)
+    cache_name = 'himma-' + hashlib.sha256('\n'.join(urls).encode()).hexdigest()[:10]
+    template = Template(SW_TEMPLATE.read_text(encoding='utf-8'), keep_trailing_newline=True)
+    SW_OUT.write_text(
+        template.render(
+            cache_name=cache_name,
+            precache_assets=json.dumps(urls, indent=2),
+            routes=json.dumps([route.to_js() for route in RUNTIME_ROUTES], indent=2),
+        ),
+        encoding='utf-8',
+    )
+    return cache_name
+
+
+def precompress() -> int:
+    """Write .gz/.br siblings for text assets, skipping up-to-date ones."""
+    written = 0
+    for path in sorted(STATIC.rglob('*')):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE:
+            continue
+        st = path.stat()
+        siblings = {'.gz': lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            siblings['.br'] = lambda data: brotli.compress(data, quality=11)
+        for suffix, compress in siblings.items():
+            out = path.with_name(path.name + suffix)
+            if st.st_size < MIN_COMPRESS_SIZE:
+                out.unlink(missing_ok=True)
+                continue
+            if out.exists() and out.stat().st_mtime_ns >= st.st_mtime_ns:
+                continue
+            out.write_bytes(compress(path.read_bytes()))
+            written += 1
+    return written
+
+
+def main() -> None:
+    assets = build_manifest()
+    with open(MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump({'assets': assets}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print(f'Wrote {MANIFEST.relative_to(ROOT)} ({len(assets)} files)')
+    cache_name = write_service_worker(assets)
+    print(f'Wrote {SW_OUT.relative_to(ROOT)} (CACHE_NAME {cache_name})')
+    written = precompress()
+    print(f'Precompressed {written} files' + ('' if brotli else ' (gzip only; install brotli for .br)'))
+
+
+if __name__ == '__main__':
+    main()
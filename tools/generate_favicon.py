@@ -1,20 +1,29 @@
 from PIL import Image
 
-def generate_favicons(input_path, output_dir):
+from image_output import save_if_changed
+
+def write_favicons(img, output_dir):
+    """Write logo-32/16.png and favicon.ico from an already decoded image.
+
+    Files that already hold the same pixels are left as they are.
+    """
     sizes = [(32, 32), (16, 16)]
-    
-    # Open the input image
-    with Image.open(input_path) as img:
-        for size in sizes:
-            output_path = f"{output_dir}/logo-{size[0]}.png"
-            img.resize(size, Image.Resampling.LANCZOS).save(output_path)
+
+    for size in sizes:
+        output_path = f"{output_dir}/logo-{size[0]}.png"
+        if save_if_changed(img.resize(size, Image.Resampling.LANCZOS), output_path, format='PNG'):
             print(f"Generated: {output_path}")
 
-        # Generate favicon.ico
-        ico_path = f"{output_dir}/favicon.ico"
-        img.save(ico_path, format='ICO', sizes=[(32, 32), (16, 16)])
+    # Generate favicon.ico
+    ico_path = f"{output_dir}/favicon.ico"
+    if save_if_changed(img, ico_path, format='ICO', sizes=[(32, 32), (16, 16)]):
         print(f"Generated: {ico_path}")
 
+def generate_favicons(input_path, output_dir):
+    # Open the input image
+    with Image.open(input_path) as img:
+        write_favicons(img, output_dir)
+
 if __name__ == "__main__":
     import os
 
@@ -24,4 +33,4 @@ if __name__ == "__main__":
     if not os.path.exists(input_logo):
         print(f"Input logo not found: {input_logo}")
     else:
-        generate_favicons(input_logo, output_directory)
\ No newline at end of file
+        generate_favicons(input_logo, output_directory)
@@ -4,41 +4,50 @@ Creates:
   - static/logo-192.png
   - static/logo-512.png
 
-Uses Pillow (PIL). Run with the project's venv python.
+Uses Pillow (PIL). Run with the project's venv python. tools/build.py
+calls make_icon() with the logo it has already decoded. Icons whose
+pixels did not change are not rewritten.
 """
 from pathlib import Path
 from PIL import Image
 
+from image_output import save_if_changed
+
 ROOT = Path(__file__).resolve().parents[1]
 src = ROOT / 'static' / 'logo.png'
-if not src.exists():
-    raise SystemExit(f"Source logo not found: {src}")
-
 out_dir = ROOT / 'static'
-out_dir.mkdir(parents=True, exist_ok=True)
+SIZES = (192, 512)
 
-def make_icon(size):
-    out = out_dir / f'logo-{size}.png'
+def load_logo():
+    if not src.exists():
+        raise SystemExit(f"Source logo not found: {src}")
     with Image.open(src) as im:
-        im = im.convert('RGBA')
-        # Fit image into a square canvas while preserving aspect ratio
-        canvas = Image.new('RGBA', (size, size), (255, 255, 255, 0))
-        w, h = im.size
-        if w == 0 or h == 0:
-            raise SystemExit('Source image has zero dimension')
-        ratio = min(size / w, size / h)
-        new_w = int(w * ratio)
-        new_h = int(h * ratio)
-        resized = im.resize((new_w, new_h), Image.LANCZOS)
-        paste_x = (size - new_w) // 2
-        paste_y = (size - new_h) // 2
-        canvas.paste(resized, (paste_x, paste_y), resized)
-        canvas.save(out, format='PNG', optimize=True)
-    print(f'Wrote {out}')
+        im.load()
+        return im
+
+def make_icon(im, size):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = out_dir / f'logo-{size}.png'
+    im = im.convert('RGBA')
+    # Fit image into a square canvas while preserving aspect ratio
+    canvas = Image.new('RGBA', (size, size), (255, 255, 255, 0))
+    w, h = im.size
+    if w == 0 or h == 0:
+        raise SystemExit('Source image has zero dimension')
+    ratio = min(size / w, size / h)
+    new_w = int(w * ratio)
+    new_h = int(h * ratio)
+    resized = im.resize((new_w, new_h), Image.LANCZOS)
+    paste_x = (size - new_w) // 2
+    paste_y = (size - new_h) // 2
+    canvas.paste(resized, (paste_x, paste_y), resized)
+    if save_if_changed(canvas, out, format='PNG', optimize=True):
+        print(f'Wrote {out}')
 
 def main():
-    for s in (192, 512):
-        make_icon(s)
+    im = load_logo()
+    for s in SIZES:
+        make_icon(im, s)
 
 if __name__ == '__main__':
     main()
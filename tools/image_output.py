@@ -0,0 +1,41 @@
+"""
+Write generated images only when their pixels change.
+
+PNG and ICO encoders differ between Pillow and zlib versions, so encoding
+the same pixels on another machine gives different bytes. save_if_changed()
+encodes into memory and leaves the existing file alone when it decodes to
+the same frames, which keeps a build from a fresh clone from rewriting
+committed files whose sources did not change.
+"""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from PIL import Image
+
+
+def frames(source) -> list[tuple[tuple[int, int], bytes]]:
+    """Size and RGBA pixels of every frame (each size of an ICO)."""
+    with Image.open(source) as im:
+        if im.format == 'ICO':
+            images = [im.ico.getimage(size) for size in sorted(im.ico.sizes())]
+        else:
+            images = [im]
+        return [(frame.size, frame.convert('RGBA').tobytes()) for frame in images]
+
+
+def save_if_changed(image: Image.Image, path: str | Path, **params) -> bool:
+    """Save ``image`` to ``path`` (``params`` as for Image.save, format included)
+    unless the file already holds the same pixels; returns whether it was written."""
+    buffer = io.BytesIO()
+    image.save(buffer, **params)
+    path = Path(path)
+    if path.exists():
+        try:
+            if frames(path) == frames(io.BytesIO(buffer.getvalue())):
+                return False
+        except OSError:  # unreadable: overwrite it
+            pass
+    path.write_bytes(buffer.getvalue())
+    return True
@@ -0,0 +1,182 @@
+// Service Worker for Himma Group Website
+// GENERATED by tools/fingerprint_static.py from tools/sw.template.js - edit the template, not static/sw.js.
+// CACHE_NAME is derived from the fingerprints of the precached assets, so it
+// changes (and old caches are dropped) whenever one of them changes.
+const CACHE_NAME = '{{ cache_name }}';
+
+// Assets to cache on install (fingerprinted URLs from static/asset-manifest.json)
+const PRECACHE_ASSETS = {{ precache_assets }};
+
+// Runtime caching per request class (RUNTIME_ROUTES in tools/fingerprint_static.py).
+// The first matching route wins; unmatched requests go straight to the network.
+const ROUTES = {{ routes }}.map(route => Object.assign(route, { regex: new RegExp(route.pattern) }));
+
+// Set on every stored response; entries older than the route's maxAge are revalidated
+const CACHED_AT = 'X-SW-Cached-At';
+
+// Install event - cache core assets
+self.addEventListener('install', (event) => {
+  event.waitUntil(
+    caches.open(CACHE_NAME)
+      .then(cache => cache.addAll(PRECACHE_ASSETS))
+      .then(() => self.skipWaiting())
+  );
+});
+
+// Activate event - drop caches that no longer belong to a route, enable navigation preload
+self.addEventListener('activate', (event) => {
+  const keep = new Set([CACHE_NAME, ...ROUTES.map(route => route.cache)]);
+  event.waitUntil(
+    Promise.all([
+      caches.keys().then(cacheNames => Promise.all(
+        cacheNames.filter(name => !keep.has(name)).map(name => caches.delete(name))
+      )),
+      self.registration.navigationPreload ? self.registration.navigationPreload.enable() : null
+    ]).then(() => self.clients.claim())
+  );
+});
+
+function findRoute(request) {
+  const url = new URL(request.url);
+  if (url.origin !== self.location.origin) return null;
+  const navigate = request.mode === 'navigate';
+  return ROUTES.find(route => route.navigate === navigate && route.regex.test(url.pathname)) || null;
+}
+
+function cacheable(response) {
+  return response && response.status === 200 && response.type === 'basic'
+    && !/no-store/.test(response.headers.get('Cache-Control') || '');
+}
+
+function fresh(route, response) {
+  const cachedAt = Number(response.headers.get(CACHED_AT) || 0);
+  return !route.maxAge || Date.now() - cachedAt < route.maxAge * 1000;
+}
+
+// Store a stamped copy, then evict the least recently used entries over the cap
+// (Cache API keys are kept in insertion order and put() moves a key to the end)
+async function store(route, request, response, stamp = true) {
+  const cache = await caches.open(route.cache);
+  if (stamp) {
+    const headers = new Headers(response.headers);
+    headers.set(CACHED_AT, String(Date.now()));
+    response = new Response(await response.blob(), {
+      status: response.status,
+      statusText: response.statusText,
+      headers
+    });
+  }
+  await cache.put(request, response);
+  const keys = await cache.keys();
+  await Promise.all(keys.slice(0, Math.max(0, keys.length - route.maxEntries)).map(key => cache.delete(key)));
+}
+
+// Fetch over the network; with a cached copy the request is conditional and a
+// 304 refreshes that copy instead of downloading the body again
+async function revalidate(route, request, cached) {
+  const etag = cached && cached.headers.get('ETag');
+  const modified = cached && cached.headers.get('Last-Modified');
+  let networkRequest = request;
+  if (etag || modified) {
+    const headers = new Headers(request.headers);
+    if (etag) headers.set('If-None-Match', etag);
+    if (modified) headers.set('If-Modified-Since', modified);
+    networkRequest = new Request(request.url, {
+      headers,
+      credentials: 'same-origin',
+      // Navigations must not be answered with a followed redirect
+      redirect: request.mode === 'navigate' ? 'manual' : request.redirect
+    });
+  }
+  const response = await fetch(networkRequest);
+  if (response.status === 304 && cached) {
+    await store(route, request, cached.clone());
+    return cached;
+  }
+  if (cacheable(response)) {
+    await store(route, request, response.clone());
+  }
+  return response;
+}
+
+function offline(request) {
+  // Precached home page for navigations
+  return request.mode === 'navigate'
+    ? caches.match('/', { cacheName: CACHE_NAME }).then(page => page || Response.error())
+    : Response.error();
+}
+
+// HTML: the network (navigation preload when available) wins if it answers within
+// route.timeout seconds; otherwise the cached copy is served and updated in the background
+async function networkFirst(route, event) {
+  const request = event.request;
+  const cached = await caches.match(request, { cacheName: route.cache });
+  const network = (async () => {
+    const preloaded = await event.preloadResponse;
+    if (!preloaded) {
+      return revalidate(route, request, cached && cached.clone());
+    }
+    if (cacheable(preloaded)) {
+      await store(route, request, preloaded.clone());
+    }
+    return preloaded;
+  })();
+  event.waitUntil(network.catch(() => {}));
+  if (!cached) {
+    return network.catch(() => offline(request));
+  }
+  const timeout = new Promise(resolve => {
+    if (route.timeout) setTimeout(() => resolve(cached), route.timeout * 1000);
+  });
+  return Promise.race([network, timeout]).catch(() => cached);
+}
+
+// Fingerprinted assets and images: served from cache while fresh; a hit moves
+// the entry to the end of the LRU order
+async function cacheFirst(route, event) {
+  const request = event.request;
+  const precached = await caches.match(request, { cacheName: CACHE_NAME });
+  if (precached) return precached;
+  const cached = await caches.match(request, { cacheName: route.cache });
+  if (cached && fresh(route, cached)) {
+    event.waitUntil(store(route, request, cached.clone(), false));
+    return cached;
+  }
+  try {
+    return await revalidate(route, request, cached);
+  } catch (error) {
+    return cached || offline(request);
+  }
+}
+
+// Stable-name static files: served from cache, revalidated in the background
+async function staleWhileRevalidate(route, event) {
+  const request = event.request;
+  const cached = await caches.match(request, { cacheName: route.cache })
+    || await caches.match(request, { cacheName: CACHE_NAME });
+  const network = revalidate(route, request, cached && cached.clone());
+  if (!cached) {
+    return network.catch(() => offline(request));
+  }
+  event.waitUntil(network.catch(() => {}));
+  return cached;
+}
+
+const STRATEGIES = { networkFirst, cacheFirst, staleWhileRevalidate };
+
+// Fetch event - dispatch to the route's strategy
+self.addEventListener('fetch', (event) => {
+  if (event.request.method !== 'GET') return;
+
+  const route = findRoute(event.request);
+  if (!route) return;
+
+  event.respondWith(STRATEGIES[route.strategy](route, event));
+});
+
+// Handle messages from clients
+self.addEventListener('message', (event) => {
+  if (event.data && event.data.type === 'SKIP_WAITING') {
+    self.skipWaiting();
+  }
+});
@@ -0,0 +1,101 @@
+"""
+Warm-start preloading for freshly spawned worker processes.
+
+Passenger spawns application processes on demand, and each new process
+used to make its first visitor wait for template compilation, manifest
+parsing and URL map compilation. ``warmup.run()`` (called from
+passenger_wsgi.py before the worker takes traffic) does that work up
+front:
+
+* every template is compiled into the Jinja cache. Compiled templates are
+  also kept on disk (``WARMUP_BYTECODE_CACHE``) so the next process skips
+  the parse/compile step entirely;
+* the URL map is compiled;
+* registered tasks (``warmup.task(func)``, e.g. manifest loaders) run
+  inside a request context;
+* ``WARMUP_IMPORTS`` -- optional dependencies app.py only imports on first
+  use (mail, bleach, email validation) -- are imported on a background
+  thread, so the first page is not delayed by them but the first contact
+  form submission usually finds them loaded.
+
+Every step is timed; failures are logged and skipped.
+"""
+
+import importlib
+import os
+import threading
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+DEFAULT_IMPORTS = (
+    'flask_mail',
+    'bleach',
+    'email_validator',
+    'email_validator.deliverability',
+)
+
+
+class Warmup:
+    """Runs preload steps for a new worker and records how long they took."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._tasks = []
+        self.timings = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('WARMUP_TEMPLATES', True)
+        app.config.setdefault('WARMUP_BYTECODE_CACHE', os.path.join(app.instance_path, 'jinja-cache'))
+        app.config.setdefault('WARMUP_IMPORTS', DEFAULT_IMPORTS)
+        self.app = app
+        app.extensions['warmup'] = self
+        folder = app.config['WARMUP_BYTECODE_CACHE']
+        if folder:
+            try:
+                os.makedirs(folder, exist_ok=True)
+                app.jinja_env.bytecode_cache = FileSystemBytecodeCache(folder)
+            except OSError as e:
+                print(f"Template bytecode cache disabled: {str(e)}")
+
+    def task(self, func):
+        """Register a callable to run during warm-up. Can be used as a decorator."""
+        self._tasks.append(func)
+        return func
+
+    def _step(self, name, func, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {str(e)}")
+        self.timings[name] = time.perf_counter() - start
+
+    def compile_templates(self):
+        env = self.app.jinja_env
+        for name in env.list_templates():
+            env.get_template(name)
+
+    def import_modules(self, names=None):
+        for name in self.app.config['WARMUP_IMPORTS'] if names is None else names:
+            self._step('import ' + name, importlib.import_module, name)
+
+    def run(self, background_imports=True):
+        """Warm this process; returns ``{step: seconds}``.
+
+        With ``background_imports`` the optional modules are imported on a
+        daemon thread and their timings appear once it finishes.
+        """
+        if self.app.config['WARMUP_TEMPLATES']:
+            self._step('templates', self.compile_templates)
+        self._step('url_map', self.app.url_map.bind('localhost').match, '/')
+        with self.app.test_request_context('/'):
+            for func in self._tasks:
+                self._step(func.__qualname__, func)
+        if background_imports:
+            threading.Thread(target=self.import_modules, name='warmup-imports', daemon=True).start()
+        else:
+            self.import_modules()
+        return self.timings